@@ -0,0 +1,10 @@
+"""
+Suíte de benchmarks da API.
+
+Roda em processo, com o ``django.test.Client``, contra um banco de teste
+criado na hora (SQLite ou PostgreSQL local, conforme ``DATABASES``) e
+populado por ``benchmarks.seed``. Uso::
+
+    python -m benchmarks.run --professionals 500 --consultations 5000 \\
+        --output report.json --baseline baseline.json
+"""
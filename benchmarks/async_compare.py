@@ -0,0 +1,126 @@
+"""
+Compara as leituras síncronas (ViewSets do DRF) com as assíncronas de
+``/api/async/`` sob ASGI, com várias requisições simultâneas.
+
+Cada rota é chamada ``--requests`` vezes com até ``--concurrency`` em voo ao
+mesmo tempo, pelo ``AsyncClient`` (que passa pelo ``ASGIHandler`` completo).
+O relatório traz latência, vazão e o pico de threads do processo: as views
+síncronas ocupam uma thread por requisição em andamento. Uso::
+
+    python -m benchmarks.async_compare --concurrency 50 --requests 500
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+
+from .run import percentile, test_database
+
+# rota síncrona -> rota assíncrona equivalente, e o parâmetro da URL
+PAIRS = {
+    "professional-list": ("async-professional-list", None),
+    "professional-detail": ("async-professional-detail", "professional"),
+    "consultation-list": ("async-consultation-list", None),
+    "consultation-detail": ("async-consultation-detail", "consultation"),
+    "consultation-by_professional": (
+        "async-consultation-by_professional",
+        "professional",
+    ),
+}
+
+
+async def _sample_threads(peak, stop):
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.005)
+
+
+async def hammer(client, path, headers, total, concurrency):
+    from django.core.cache import cache
+
+    await cache.aclear()
+    semaphore = asyncio.Semaphore(concurrency)
+    timings, statuses = [], set()
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            timings.append((time.perf_counter() - started) * 1000)
+            statuses.add(response.status_code)
+
+    peak, stop = [threading.active_count()], asyncio.Event()
+    sampler = asyncio.create_task(_sample_threads(peak, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    return {
+        "path": path,
+        "status": sorted(statuses),
+        "requests": total,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "rps": round(total / elapsed, 1),
+        "peak_threads": peak[0],
+    }
+
+
+def compare_paths(professionals, consultations, total, concurrency):
+    from asgiref.sync import async_to_sync
+    from django.contrib.auth import get_user_model
+    from django.test import AsyncClient
+    from django.urls import reverse
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from .seed import seed
+
+    pros, objs = seed(professionals, consultations)
+    user = get_user_model().objects.create_user("benchmark", password="benchmark")
+    headers = {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+    sources = {"professional": pros[0].pk, "consultation": objs[0].pk}
+    client = AsyncClient(raise_request_exception=False)
+
+    results = {}
+    for sync_name, (async_name, source) in PAIRS.items():
+        args = [sources[source]] if source else []
+        results[sync_name] = {
+            mode: async_to_sync(hammer)(
+                client, reverse(name, args=args), headers, total, concurrency
+            )
+            for mode, name in (("sync", sync_name), ("async", async_name))
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--professionals", type=int, default=500)
+    parser.add_argument("--consultations", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--output", help="Arquivo para gravar o relatório JSON.")
+    args = parser.parse_args(argv)
+
+    with test_database():
+        report = compare_paths(
+            args.professionals, args.consultations, args.requests, args.concurrency
+        )
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
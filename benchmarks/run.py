@@ -0,0 +1,308 @@
+"""
+Mede latência (p50/p95/p99), vazão e consultas SQL por requisição de cada
+rota nomeada de ``core/urls.py`` e imprime um relatório JSON comparável.
+
+Com ``--baseline`` o relatório é comparado a um anterior: qualquer aumento no
+número de consultas, ou um p95 acima da tolerância, é listado como regressão
+e o processo termina com código 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+# Benchmarks não gravam o log de API nem dependem de variáveis de produção
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("API_LOG_ENABLED", "False")
+
+import django  # noqa: E402
+
+# Rotas com parâmetros: de onde vem o valor de cada um
+PARAMS = {
+    "professional-detail": {"pk": "professional"},
+    "consultation-detail": {"pk": "consultation"},
+    "consultation-by_professional": {"professional_id": "professional"},
+    "consultation-calendar": {"professional_id": "professional"},
+    "async-professional-detail": {"pk": "professional"},
+    "async-consultation-detail": {"pk": "consultation"},
+    "async-consultation-by_professional": {"professional_id": "professional"},
+}
+
+# Rotas de escrita ficam de fora para que todas as iterações meçam o mesmo estado
+SKIP = {
+    "professional-import": "rota de escrita",
+    "consultation-bulk": "rota de escrita",
+}
+
+
+def build_cases(context):
+    """Monta os casos de medição: uma entrada por rota, mais variações úteis."""
+    from django.urls import reverse
+
+    tomorrow = (context["now"] + timedelta(days=1)).date().isoformat()
+    cases, skipped = {}, {}
+
+    for name, params in discover_routes():
+        if name in SKIP:
+            skipped[name] = SKIP[name]
+            continue
+        sources = PARAMS.get(name, {})
+        if set(params) - set(sources):
+            skipped[name] = f"parâmetros desconhecidos: {sorted(params)}"
+            continue
+        kwargs = {param: context[sources[param]] for param in params}
+        cases[name] = {"method": "get", "path": reverse(name, kwargs=kwargs)}
+
+    cases["token_obtain_pair"] = {
+        "method": "post",
+        "path": reverse("token_obtain_pair"),
+        "data": {"username": context["username"], "password": context["password"]},
+    }
+    cases["token_refresh"] = {
+        "method": "post",
+        "path": reverse("token_refresh"),
+        "data": {"refresh": context["refresh"]},
+    }
+    cases["professional-list:search"] = {
+        "method": "get",
+        "path": reverse("professional-list"),
+        "data": {"search": "psic"},
+    }
+    cases["consultation-list:projected"] = {
+        "method": "get",
+        "path": reverse("consultation-list"),
+        "data": {"exclude": "notes"},
+    }
+    cases["consultation-list:filtered"] = {
+        "method": "get",
+        "path": reverse("consultation-list"),
+        "data": {"when": "upcoming", "profession": "Psicólogo"},
+    }
+    cases["professional-export"]["data"] = {"type": "ndjson"}
+    cases["consultation-stats"]["data"] = {
+        "start": context["now"].date().isoformat(),
+        "end": tomorrow,
+        "group_by": "profession",
+    }
+    cases["consultation-availability"]["data"] = {
+        "professional": context["professional"],
+        "start": tomorrow,
+        "end": tomorrow,
+    }
+    return cases, skipped
+
+
+def discover_routes():
+    """``(nome, parâmetros)`` de cada rota nomeada, sem sufixos de formato."""
+    from django.urls import URLResolver, get_resolver
+
+    seen = set()
+
+    def walk(patterns, namespaced=False):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns, namespaced or pattern.namespace)
+                continue
+            name = pattern.name
+            if not name or namespaced or name in seen:
+                continue
+            params = list(getattr(pattern.pattern, "regex").groupindex)
+            if "format" in params:
+                continue
+            seen.add(name)
+            yield name, params
+
+    yield from walk(get_resolver().url_patterns)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(client, case, iterations, warmup):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def call():
+        method = getattr(client, case["method"])
+        if case["method"] == "get":
+            response = method(case["path"], case.get("data"))
+        else:
+            response = method(
+                case["path"], case.get("data"), content_type="application/json"
+            )
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    cache.clear()
+    for _ in range(warmup):
+        call()
+
+    timings, queries, statuses = [], [], set()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            t0 = time.perf_counter()
+            response = call()
+            timings.append((time.perf_counter() - t0) * 1000)
+        queries.append(len(ctx.captured_queries))
+        statuses.add(response.status_code)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "method": case["method"].upper(),
+        "path": case["path"],
+        "status": sorted(statuses),
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "rps": round(iterations / elapsed, 1),
+        "queries": max(queries),
+    }
+
+
+def compare(report, baseline, tolerance=0.2, floor_ms=1.0):
+    """
+    Regressões em relação a ``baseline``: mais consultas SQL em uma rota, ou
+    p95 acima de ``tolerance`` (e de ``floor_ms``, para ignorar ruído).
+    """
+    regressions = []
+    for name, current in report["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if previous is None:
+            continue
+        if current["queries"] > previous["queries"]:
+            regressions.append(
+                f"{name}: consultas {previous['queries']} -> {current['queries']}"
+            )
+        limit = previous["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > limit and current["p95_ms"] - previous["p95_ms"] > (
+            floor_ms
+        ):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"
+            )
+    return regressions
+
+
+def run(professionals, consultations, iterations, warmup, only=None):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.utils import timezone
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from .seed import seed
+
+    pros, objs = seed(professionals, consultations)
+    username, password = "benchmark", "benchmark"
+    user = get_user_model().objects.create_superuser(username, password=password)
+    refresh = RefreshToken.for_user(user)
+
+    context = {
+        "now": timezone.now(),
+        "username": username,
+        "password": password,
+        "refresh": str(refresh),
+        "professional": pros[0].pk,
+        "consultation": objs[0].pk,
+    }
+    cases, skipped = build_cases(context)
+    # Uma rota quebrada aparece no relatório com status 500, sem abortar a suíte
+    client = Client(
+        raise_request_exception=False,
+        HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}",
+    )
+
+    routes = {
+        name: measure(client, case, iterations, warmup)
+        for name, case in sorted(cases.items())
+        if not only or name in only
+    }
+    return {
+        "meta": {
+            "generated_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "professionals": professionals,
+            "consultations": consultations,
+            "iterations": iterations,
+            "warmup": warmup,
+        },
+        "routes": routes,
+        "skipped": skipped,
+    }
+
+
+@contextmanager
+def test_database():
+    """Banco de teste descartável: nunca toca os dados do banco configurado."""
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--professionals", type=int, default=500)
+    parser.add_argument("--consultations", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--route", action="append", help="Mede só estas rotas.")
+    parser.add_argument("--output", help="Arquivo para gravar o relatório JSON.")
+    parser.add_argument("--baseline", help="Relatório anterior para comparação.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Aumento de p95 aceito em relação ao baseline (padrão: 0.2).",
+    )
+    args = parser.parse_args(argv)
+
+    with test_database():
+        report = run(
+            args.professionals,
+            args.consultations,
+            args.iterations,
+            args.warmup,
+            only=set(args.route or ()),
+        )
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output + "\n")
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            regressions = compare(report, json.load(fp), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSÃO {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
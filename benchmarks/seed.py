@@ -0,0 +1,67 @@
+"""Massa de dados determinística para os benchmarks."""
+
+import random
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from consultations.models import Consultation
+from core import search
+from professionals.models import Professional
+
+FIRST_NAMES = ("Alex", "Ana", "Bruno", "Carla", "Davi", "Elis", "Joana", "Rafa")
+LAST_NAMES = ("Lima", "Souza", "Reis", "Costa", "Alves", "Rocha", "Nunes")
+PROFESSIONS = ("Psicólogo", "Médica", "Enfermeiro", "Nutricionista", "Fisioterapeuta")
+STREETS = ("Rua Azul", "Av. Paulista", "Rua Verde", "Av. Brasil", "Rua das Flores")
+NOTES = (
+    "Primeira consulta",
+    "Retorno de rotina",
+    "Paciente relatou ansiedade",
+    "Acompanhamento hormonal",
+    "Avaliação inicial",
+)
+
+
+def seed(professionals=500, consultations=5000, batch_size=1000, random_seed=42):
+    """
+    Cria ``professionals`` profissionais e ``consultations`` consultas com
+    ``bulk_create``. Cada consulta ocupa um horário distinto do seu
+    profissional, a partir de amanhã, em passos de 30 minutos.
+    """
+    rng = random.Random(random_seed)
+
+    with transaction.atomic():
+        pros = Professional.objects.bulk_create(
+            [
+                Professional(
+                    name_social=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    profession=rng.choice(PROFESSIONS),
+                    address=f"{rng.choice(STREETS)}, {rng.randint(1, 2000)}",
+                    contact=f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                )
+                for _ in range(professionals)
+            ],
+            batch_size=batch_size,
+        )
+        search.index_instances(Professional, pros)
+
+        start = (timezone.now() + timedelta(days=1)).replace(
+            minute=0, second=0, microsecond=0
+        )
+        next_slot = dict.fromkeys((p.pk for p in pros), 0)
+        objs = []
+        for _ in range(consultations):
+            pid = rng.choice(pros).pk
+            objs.append(
+                Consultation(
+                    professional_id=pid,
+                    datetime=start + timedelta(minutes=30 * next_slot[pid]),
+                    notes=rng.choice(NOTES),
+                )
+            )
+            next_slot[pid] += 1
+        objs = Consultation.objects.bulk_create(objs, batch_size=batch_size)
+        search.index_instances(Consultation, objs)
+
+    return pros, objs
@@ -0,0 +1,104 @@
+"""
+Custo de CPU para montar uma página de consultas, por caminho de
+serialização.
+
+Compara, por página de ``--rows`` linhas (1000 por padrão):
+
+- ``instances``: instâncias do modelo + ``ModelSerializer`` + ``json``;
+- ``values``: ``.values()`` + ``ValuesPlan`` + ``json``;
+- ``values_orjson``: ``.values()`` + ``ValuesPlan`` + ``ORJSONRenderer``.
+
+Cada etapa (busca, serialização, renderização) é medida em tempo de CPU do
+processo (``time.process_time``), mediana de ``--repeat`` execuções. Uso::
+
+    python -m benchmarks.serialization --rows 1000 --repeat 20
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from .run import test_database
+
+
+def _cpu_ms(func):
+    started = time.process_time()
+    result = func()
+    return result, (time.process_time() - started) * 1000
+
+
+def measure_path(name, queryset, repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    from consultations.serializers import ConsultationSerializer
+    from core.renderers import ORJSONRenderer
+    from core.values import ValuesPlan
+
+    plan = ValuesPlan.for_serializer(ConsultationSerializer())
+    if name == "instances":
+        fetch = lambda: list(queryset.all())  # noqa: E731
+        serialize = lambda rows: ConsultationSerializer(rows, many=True).data  # noqa
+    else:
+        fetch = lambda: list(plan.values(queryset.all()))  # noqa: E731
+        serialize = plan.serialize
+    renderer = ORJSONRenderer() if name == "values_orjson" else JSONRenderer()
+
+    timings = {"fetch_ms": [], "serialize_ms": [], "render_ms": []}
+    for _ in range(repeat):
+        rows, fetch_ms = _cpu_ms(fetch)
+        data, serialize_ms = _cpu_ms(lambda: serialize(rows))
+        body, render_ms = _cpu_ms(lambda: renderer.render(data))
+        timings["fetch_ms"].append(fetch_ms)
+        timings["serialize_ms"].append(serialize_ms)
+        timings["render_ms"].append(render_ms)
+
+    result = {
+        key: round(statistics.median(values), 3) for key, values in timings.items()
+    }
+    result["total_ms"] = round(sum(result.values()), 3)
+    result["bytes"] = len(body)
+    return result
+
+
+def compare_paths(rows, repeat):
+    from consultations.models import Consultation
+
+    from .seed import seed
+
+    seed(professionals=max(1, rows // 10), consultations=rows)
+    queryset = Consultation.objects.order_by("datetime", "id")[:rows]
+
+    paths = {
+        name: measure_path(name, queryset, repeat)
+        for name in ("instances", "values", "values_orjson")
+    }
+    baseline = paths["instances"]["total_ms"]
+    for result in paths.values():
+        saved = baseline - result["total_ms"]
+        result["cpu_saved_ms"] = round(saved, 3)
+        result["cpu_saved_pct"] = round(100 * saved / baseline, 1) if baseline else 0
+    return {"rows": rows, "repeat": repeat, "paths": paths}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Arquivo para gravar o relatório JSON.")
+    args = parser.parse_args(argv)
+
+    with test_database():
+        report = compare_paths(args.rows, args.repeat)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
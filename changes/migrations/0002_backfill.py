@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# recurso -> (app, modelo) registrados no feed
+RESOURCES = {
+    "professional": ("professionals", "Professional"),
+    "consultation": ("consultations", "Consultation"),
+}
+
+
+def record_existing(apps, schema_editor):
+    """Inclui no feed os objetos criados antes dele existir."""
+    Change = apps.get_model("changes", "Change")
+    for resource, (app_label, model_name) in RESOURCES.items():
+        model = apps.get_model(app_label, model_name)
+        ids = model.objects.order_by("pk").values_list("pk", flat=True)
+        Change.objects.bulk_create(
+            (Change(resource=resource, object_id=pk) for pk in ids.iterator()),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("changes", "0001_initial"),
+        ("consultations", "0005_daily_stats"),
+        ("professionals", "0002_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(record_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import models
+
+
+class Change(models.Model):
+    """
+    Última alteração de um objeto sincronizável.
+
+    O ``id`` crescente é a posição no feed: cada escrita grava uma linha nova
+    para o objeto e apaga as anteriores, então a tabela guarda uma linha por
+    objeto (exclusões ficam como lápide, com ``deleted``) e quem sincroniza
+    lê só o que mudou depois do seu último ``id``.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    resource = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Remoção das linhas substituídas de um objeto
+            models.Index(
+                fields=["resource", "object_id"], name="change_resource_object_idx"
+            ),
+            # Feed filtrado por ?resource=
+            models.Index(fields=["resource", "id"], name="change_resource_id_idx"),
+        ]
+
+    def __str__(self):
+        action = "removido" if self.deleted else "alterado"
+        return f"{self.id}: {self.resource} {self.object_id} {action}"
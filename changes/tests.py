@@ -0,0 +1,180 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from consultations.models import Consultation
+from professionals.models import Professional
+from .models import Change
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.url = reverse("changes")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.professional = Professional.objects.create(
+                name_social="Alex", profession="Psicólogo"
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consultation = Consultation.objects.create(
+                professional=self.professional,
+                datetime=timezone.now() + timedelta(days=1),
+            )
+
+    def sync(self, since=None, **params):
+        if since:
+            params["since"] = since
+        r = self.client.get(self.url, params)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        return r.data
+
+    def summary(self, data):
+        return [(item["resource"], item["id"], item["deleted"]) for item in data]
+
+    def test_initial_sync_returns_everything_with_data(self):
+        data = self.sync()
+        self.assertEqual(
+            self.summary(data["results"]),
+            [
+                ("professional", self.professional.id, False),
+                ("consultation", self.consultation.id, False),
+            ],
+        )
+        self.assertEqual(data["results"][0]["data"]["name_social"], "Alex")
+        self.assertEqual(
+            data["results"][1]["data"]["professional"], self.professional.id
+        )
+        self.assertIsNone(data["next"])
+        self.assertTrue(data["sync_token"])
+
+    def test_since_returns_only_the_delta(self):
+        token = self.sync()["sync_token"]
+        self.assertEqual(self.sync(token)["results"], [])
+        self.assertEqual(self.sync(token)["sync_token"], token)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.professional.profession = "Psicanalista"
+            self.professional.save()
+        data = self.sync(token)
+        self.assertEqual(
+            self.summary(data["results"]),
+            [("professional", self.professional.id, False)],
+        )
+        self.assertEqual(data["results"][0]["data"]["profession"], "Psicanalista")
+
+    def test_deletes_leave_tombstones(self):
+        token = self.sync()["sync_token"]
+        consultation_id = self.consultation.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consultation.delete()
+
+        data = self.sync(token)
+        self.assertEqual(
+            self.summary(data["results"]),
+            [("consultation", consultation_id, True)],
+        )
+        self.assertIsNone(data["results"][0]["data"])
+
+    def test_one_row_per_object(self):
+        for notes in ("a", "b", "c"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.consultation.notes = notes
+                self.consultation.save()
+        self.assertEqual(
+            Change.objects.filter(
+                resource="consultation", object_id=self.consultation.id
+            ).count(),
+            1,
+        )
+        self.assertEqual(self.sync()["results"][-1]["data"]["notes"], "c")
+
+    def test_rolled_back_writes_are_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Professional.objects.create(name_social="X", profession="Y")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(len(self.sync()["results"]), 2)
+
+    def test_bulk_writes_are_recorded(self):
+        token = self.sync()["sync_token"]
+        items = [
+            {
+                "professional": self.professional.id,
+                "datetime": (timezone.now() + timedelta(days=2, hours=h)).isoformat(),
+            }
+            for h in range(2)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("consultation-bulk"), {"items": items}, format="json"
+            )
+        results = self.sync(token)["results"]
+        self.assertEqual([item["resource"] for item in results], ["consultation"] * 2)
+
+    def test_pages_follow_next_with_constant_queries(self):
+        for i in range(4):
+            with self.captureOnCommitCallbacks(execute=True):
+                Professional.objects.create(name_social=f"P{i}", profession="Y")
+
+        seen, url, params = [], self.url, {"page_size": 2}
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(url, params).data
+            # Página de alterações + um SELECT por tipo de objeto
+            queries = [q for q in ctx.captured_queries if "auth_user" not in q["sql"]]
+            self.assertLessEqual(len(queries), 3)
+            seen += self.summary(data["results"])
+            url, params = data["next"], None
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(self.sync(data["sync_token"])["results"], [])
+
+    def test_resource_filter_and_invalid_params(self):
+        data = self.sync(resource="consultation")
+        self.assertEqual(
+            self.summary(data["results"]),
+            [("consultation", self.consultation.id, False)],
+        )
+        r = self.client.get(self.url, {"resource": "user"})
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        r = self.client.get(self.url, {"since": "invalido"})
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("since", r.data)
+
+    @override_settings(CHANGE_FEED_SETTLE_SECONDS=60)
+    def test_recent_changes_wait_for_the_settle_window(self):
+        token = self.sync()["sync_token"]
+        self.assertIsNone(token)
+
+        # Só o que foi gravado antes da janela sai no feed
+        Change.objects.filter(resource="professional").update(
+            changed_at=timezone.now() - timedelta(minutes=5)
+        )
+        data = self.sync()
+        self.assertEqual(
+            self.summary(data["results"]),
+            [("professional", self.professional.id, False)],
+        )
+        # A consulta, de id maior, ainda não: o token para antes dela
+        later = self.sync(data["sync_token"])
+        self.assertEqual(later["results"], [])
+        self.assertEqual(later["sync_token"], data["sync_token"])
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        r = self.client.get(self.url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,129 @@
+"""
+Registro de alterações para sincronização incremental.
+
+Cada modelo registrado com ``register`` grava uma ``Change`` a cada
+``post_save``/``post_delete``. A gravação acontece depois do commit da
+transação, então alterações desfeitas nunca aparecem no feed.
+
+Os ``id`` vêm de transações concorrentes: uma que pegou um ``id`` menor pode
+ficar visível depois de outra com ``id`` maior. Se o feed já tivesse
+entregue o maior como ``sync_token``, o cliente nunca veria o menor. Por
+isso o feed só serve alterações gravadas há mais de
+``CHANGE_FEED_SETTLE_SECONDS`` segundos (``settled``): a transação de
+gravação é curta e, passado esse prazo, todas as de ``id`` menor já terminaram.
+
+Escritas que não disparam sinais (``bulk_create``, ``QuerySet.update``)
+precisam chamar ``record`` por conta própria.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Change
+
+# recurso -> (modelo, caminho do serializer usado no feed)
+registry = {}
+
+
+def resource_for(model):
+    for resource, (registered, _) in registry.items():
+        if registered is model:
+            return resource
+    raise LookupError(f"{model.__name__} não está registrado no feed de alterações.")
+
+
+def get_model(resource):
+    return registry[resource][0]
+
+
+def get_serializer_class(resource):
+    return import_string(registry[resource][1])
+
+
+def record(model, ids, deleted=False):
+    """Registra, após o commit, que os objetos ``ids`` de ``model`` mudaram."""
+    resource = resource_for(model)
+    ids = [object_id for object_id in ids if object_id is not None]
+    if not ids:
+        return
+
+    def write():
+        with transaction.atomic():
+            created = Change.objects.bulk_create(
+                Change(resource=resource, object_id=object_id, deleted=deleted)
+                for object_id in ids
+            )
+            # As linhas anteriores dos mesmos objetos deixam de ser necessárias
+            Change.objects.filter(
+                resource=resource,
+                object_id__in=ids,
+                id__lt=min(change.id for change in created),
+            ).delete()
+
+    transaction.on_commit(write)
+
+
+def get_settle_seconds():
+    return getattr(settings, "CHANGE_FEED_SETTLE_SECONDS", 5)
+
+
+def settled(queryset, now=None):
+    """Só as alterações que não podem mais ganhar vizinhas de ``id`` menor."""
+    now = now or timezone.now()
+    return queryset.filter(
+        changed_at__lte=now - timedelta(seconds=get_settle_seconds())
+    )
+
+
+def _on_save(sender, instance, **kwargs):
+    record(sender, [instance.pk])
+
+
+def _on_delete(sender, instance, **kwargs):
+    record(sender, [instance.pk], deleted=True)
+
+
+def register(model, resource, serializer_path):
+    """Inclui ``model`` no feed como ``resource``, serializado por ``serializer_path``."""
+    registry[resource] = (model, serializer_path)
+    post_save.connect(_on_save, sender=model, dispatch_uid=f"changes-save-{model}")
+    post_delete.connect(_on_delete, sender=model, dispatch_uid=f"changes-del-{model}")
+
+
+def serialize_changes(changes):
+    """
+    Monta os itens do feed: a lápide, para exclusões, ou o objeto atual
+    serializado. Os objetos de cada recurso são buscados numa única consulta.
+    """
+    wanted = {}
+    for change in changes:
+        if not change.deleted:
+            wanted.setdefault(change.resource, set()).add(change.object_id)
+
+    current = {}
+    for resource, ids in wanted.items():
+        model = get_model(resource)
+        serializer_class = get_serializer_class(resource)
+        objects = model._default_manager.filter(pk__in=ids)
+        for data in serializer_class(objects, many=True).data:
+            current[(resource, data["id"])] = data
+
+    items = []
+    for change in changes:
+        data = current.get((change.resource, change.object_id))
+        items.append(
+            {
+                "resource": change.resource,
+                "id": change.object_id,
+                # Removido depois desta alteração: a lápide vem mais adiante no feed
+                "deleted": change.deleted or data is None,
+                "changed_at": change.changed_at,
+                "data": data,
+            }
+        )
+    return items
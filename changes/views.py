@@ -0,0 +1,110 @@
+from collections import OrderedDict
+
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes, extend_schema
+from rest_framework import generics
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+
+from core.db_routers import ReplicaReadMixin
+from core.pagination import KeysetPagination
+
+from . import tracking
+from .models import Change
+
+
+class ChangeFeedPagination(KeysetPagination):
+    """
+    Paginação do feed pelo ``id`` das alterações. O cursor da última linha
+    entregue é o ``sync_token``: guardado pelo cliente e enviado em
+    ``?since=`` na próxima sincronização.
+    """
+
+    ordering = ("id",)
+    cursor_query_param = "since"
+    invalid_cursor_message = "Token de sincronização inválido."
+
+    def decode_cursor(self, request):
+        # Token malformado é erro do cliente, não uma página inexistente
+        try:
+            return super().decode_cursor(request)
+        except NotFound as exc:
+            raise ValidationError({self.cursor_query_param: [exc.detail]})
+
+    def get_sync_token(self):
+        if self.page:
+            return self.encode_position(self._position_of(self.page[-1]))
+        # Nada novo: o cliente continua do mesmo ponto
+        return self.request.query_params.get(self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("sync_token", self.get_sync_token()),
+                    ("results", data),
+                ]
+            )
+        )
+
+
+@extend_schema(
+    summary="Alterações desde a última sincronização",
+    description=(
+        "Devolve os profissionais e consultas criados, alterados ou removidos "
+        "depois de `since`, em ordem. Itens removidos vêm com `deleted: true` e "
+        "sem `data`. Siga `next` enquanto houver páginas e guarde o "
+        "`sync_token` da última para a próxima sincronização. Alterações dos "
+        "últimos `CHANGE_FEED_SETTLE_SECONDS` segundos ficam para a próxima."
+    ),
+    parameters=[
+        OpenApiParameter(
+            "since",
+            OpenApiTypes.STR,
+            description=(
+                "`sync_token` da última sincronização; sem ele, o feed começa "
+                "do início."
+            ),
+        ),
+        OpenApiParameter(
+            "page_size", OpenApiTypes.INT, description="Alterações por página."
+        ),
+        OpenApiParameter(
+            "resource",
+            OpenApiTypes.STR,
+            enum=["professional", "consultation"],
+            description="Restringe o feed a um tipo de objeto.",
+        ),
+    ],
+    responses={200: OpenApiTypes.OBJECT},
+)
+class ChangeFeedView(ReplicaReadMixin, generics.GenericAPIView):
+    """
+    Feed de alterações para sincronização incremental.
+    Endpoints:
+    - GET /api/changes/ - Tudo que existe, desde o início
+    - GET /api/changes/?since=<sync_token> - Só o que mudou desde o token
+    - GET /api/changes/?resource=consultation - Só um tipo de objeto
+    """
+
+    queryset = Change.objects.all()
+    pagination_class = ChangeFeedPagination
+    # Permissões só exigem autenticação: usuário montado a partir do token
+    token_user = True
+
+    def get(self, request):
+        """
+        Changed rows and tombstones since the client's last sync token.
+        Endpoint: GET /api/changes/?since=<sync_token>
+        """
+        queryset = tracking.settled(self.get_queryset())
+        resource = request.query_params.get("resource")
+        if resource:
+            if resource not in tracking.registry:
+                raise ValidationError(
+                    {"resource": [f"Use: {', '.join(sorted(tracking.registry))}."]}
+                )
+            queryset = queryset.filter(resource=resource)
+
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(tracking.serialize_changes(page))
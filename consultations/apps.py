@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ConsultationsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "consultations"
+
+    def ready(self):
+        from changes import tracking
+        from core import search
+        from . import signals  # noqa: F401
+        from .models import Consultation
+
+        search.register(Consultation, ("notes",))
+        tracking.register(
+            Consultation,
+            "consultation",
+            "consultations.serializers.ConsultationSerializer",
+        )
@@ -0,0 +1,136 @@
+"""
+Arquivamento de consultas passadas.
+
+A maior parte das leituras procura consultas futuras, mas a tabela e os
+índices de ``Consultation`` carregam todo o histórico. ``archive_consultations``
+move, em lotes, as consultas anteriores ao horizonte de retenção
+(``CONSULTATION_ARCHIVE_AFTER_DAYS``) para ``ArchivedConsultation``, com o
+mesmo id: cada lote copia e apaga na mesma transação.
+
+O corte cai sempre no início de um dia (fuso ``TIME_ZONE``), então cada dia
+fica inteiro numa das duas tabelas e os resumos diários de
+``consultations.stats`` continuam valendo. Para os demais índices (busca
+textual, disponibilidade, feed de alterações) a consulta arquivada sai como
+uma remoção.
+
+O histórico segue acessível, de forma explícita, em
+``GET /api/consultations/professional/{id}/?archived=true``.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework import serializers
+
+from changes import tracking
+from core import search
+
+from .availability import invalidate_slots
+from .models import ArchivedConsultation, Consultation
+from .stats import day_start, stat_day
+
+ARCHIVED_PARAM = "archived"
+ARCHIVED_COLUMNS = (
+    "id",
+    "professional_id",
+    "datetime",
+    "notes",
+    "duration",
+    "updated_at",
+)
+
+
+def get_archive_after_days():
+    return getattr(settings, "CONSULTATION_ARCHIVE_AFTER_DAYS", 365)
+
+
+def get_batch_size():
+    return getattr(settings, "CONSULTATION_ARCHIVE_BATCH_SIZE", 1000)
+
+
+def archive_cutoff(days=None, now=None):
+    """Início do dia a partir do qual as consultas continuam na tabela principal."""
+    if days is None:
+        days = get_archive_after_days()
+    now = now or timezone.now()
+    return day_start(stat_day(now - timedelta(days=days)))
+
+
+def pending_archive(before):
+    """Consultas anteriores a ``before``, na ordem do índice (datetime, id)."""
+    return Consultation.objects.filter(datetime__lt=before).order_by("datetime", "id")
+
+
+def delete_consultations(ids, using):
+    """
+    Apaga as consultas ``ids`` num único DELETE, sem sinais por linha.
+
+    ``Consultation`` não é referenciada por nenhuma outra tabela, então não
+    há cascatas a aplicar.
+    """
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {Consultation._meta.db_table} WHERE id IN ({placeholders})",
+            ids,
+        )
+
+
+def archive_batch(before, batch_size):
+    """Move um lote para o arquivo; devolve quantas consultas moveu."""
+    using = router.db_for_write(Consultation)
+    with transaction.atomic(using=using):
+        rows = list(
+            pending_archive(before)
+            .select_for_update()
+            .values(*ARCHIVED_COLUMNS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        archived_at = timezone.now()
+        ArchivedConsultation.objects.bulk_create(
+            ArchivedConsultation(archived_at=archived_at, **row) for row in rows
+        )
+        ids = [row["id"] for row in rows]
+        # Sem sinais por linha: os efeitos colaterais são aplicados ao lote
+        # abaixo, e os resumos diários não mudam (a consulta só trocou de tabela)
+        delete_consultations(ids, using)
+        search.get_backend(using).remove(Consultation, ids)
+        invalidate_slots([(row["professional_id"], row["datetime"]) for row in rows])
+        tracking.record(Consultation, ids, deleted=True)
+    return len(rows)
+
+
+def archive_consultations(before, batch_size=None):
+    """Arquiva, lote a lote, todas as consultas anteriores a ``before``."""
+    batch_size = batch_size or get_batch_size()
+    total = 0
+    while True:
+        moved = archive_batch(before, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def wants_archive(query_params):
+    """``?archived=true`` pede o histórico arquivado (400 para valores inválidos)."""
+    raw = query_params.get(ARCHIVED_PARAM)
+    if raw is None:
+        return False
+    try:
+        return serializers.BooleanField().to_internal_value(raw)
+    except serializers.ValidationError as exc:
+        raise serializers.ValidationError({ARCHIVED_PARAM: exc.detail})
+
+
+ARCHIVED_PARAMETER = OpenApiParameter(
+    ARCHIVED_PARAM,
+    OpenApiTypes.BOOL,
+    description=(
+        "Lê o histórico arquivado (consultas anteriores ao horizonte de "
+        "retenção) em vez das consultas atuais."
+    ),
+)
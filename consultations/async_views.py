@@ -0,0 +1,37 @@
+"""Leituras assíncronas de consultas (``/api/async/consultations/``)."""
+
+from core.async_views import (
+    async_api_view,
+    list_data,
+    page_data,
+    render,
+    retrieve_data,
+)
+from .views import ConsultationViewSet
+
+
+@async_api_view(ConsultationViewSet, "list")
+async def consultation_list(view):
+    """
+    Endpoint: GET /api/async/consultations/
+
+    Paginado por cursor, como GET /api/consultations/; aceita ``?search=`` e
+    os mesmos filtros.
+    """
+    return render(await list_data(view))
+
+
+@async_api_view(ConsultationViewSet, "retrieve", detail=True)
+async def consultation_detail(view, pk):
+    """Endpoint: GET /api/async/consultations/{id}/"""
+    return render(await retrieve_data(view))
+
+
+@async_api_view(ConsultationViewSet, "by_professional")
+async def by_professional(view, professional_id):
+    """
+    Endpoint: GET /api/async/consultations/professional/{professional_id}/
+
+    Com ``?archived=true``, lê o histórico arquivado.
+    """
+    return render(await page_data(view, view.professional_queryset(professional_id)))
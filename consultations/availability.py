@@ -0,0 +1,156 @@
+"""
+Horários livres de profissionais.
+
+Para cada (profissional, dia) os horários ocupados vêm de uma única consulta
+por intervalo servida pelo índice (professional, datetime); os horários
+livres são obtidos com uma varredura linear sobre esses intervalos já
+ordenados. O resultado de cada (profissional, dia) fica em cache e é
+invalidado quando uma consulta daquele dia muda.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.caching import VersionedCache
+
+from .models import Consultation, get_max_duration
+
+availability_cache = VersionedCache(
+    "availability", timeout_setting="AVAILABILITY_CACHE_TIMEOUT"
+)
+
+
+def get_working_hours():
+    return (
+        time.fromisoformat(getattr(settings, "AVAILABILITY_DAY_START", "08:00")),
+        time.fromisoformat(getattr(settings, "AVAILABILITY_DAY_END", "18:00")),
+    )
+
+
+def day_bounds(day):
+    """Início e fim do expediente de ``day`` no fuso horário corrente."""
+    opening, closing = get_working_hours()
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(day, opening), tz),
+        timezone.make_aware(datetime.combine(day, closing), tz),
+    )
+
+
+def free_slots(day, busy, slot):
+    """
+    Varre ``busy`` (intervalos ordenados pelo início) e devolve os horários
+    livres de ``day`` alinhados à grade de ``slot`` a partir da abertura.
+    """
+    opening, closing = day_bounds(day)
+    starts = [start for start, _ in busy]
+    i = bisect_left(starts, opening - get_max_duration())
+
+    slots = []
+    current = opening
+    while current + slot <= closing:
+        while i < len(busy) and busy[i][1] <= current:
+            i += 1
+        if i < len(busy) and busy[i][0] < current + slot:
+            # Ocupado: pula para o primeiro horário da grade após o término
+            steps = -(-(busy[i][1] - opening) // slot)
+            current = opening + steps * slot
+            continue
+        slots.append((current, current + slot))
+        current += slot
+    return slots
+
+
+def get_availability(professional_ids, first_day, last_day, slot):
+    """
+    Horários livres por (profissional, dia), consultando o banco apenas para
+    os pares que não estão em cache — e com uma só consulta para todos eles.
+    """
+    days = [
+        first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)
+    ]
+    scopes = [(pid, day.isoformat()) for pid in professional_ids for day in days]
+    opening, closing = get_working_hours()
+    keys = availability_cache.keys_for(
+        scopes, slot.total_seconds(), opening, closing, get_max_duration()
+    )
+    cached = availability_cache.get_many(keys.values())
+
+    missing = [scope for scope in scopes if keys[scope] not in cached]
+    if missing:
+        computed = _compute(missing, slot)
+        availability_cache.set_many(
+            {keys[scope]: slots for scope, slots in computed.items()}
+        )
+        cached.update({keys[scope]: slots for scope, slots in computed.items()})
+
+    now = timezone.now()
+    return [
+        {
+            "professional": pid,
+            "date": day,
+            # O passado é filtrado na resposta para o cache não envelhecer
+            "slots": [
+                {"start": start, "end": end}
+                for start, end in cached[keys[(pid, day)]]
+                if start >= now
+            ],
+        }
+        for pid, day in scopes
+    ]
+
+
+def _compute(scopes, slot):
+    days = sorted({day for _, day in scopes})
+    # Uma consulta do dia anterior pode avançar sobre a abertura
+    range_start = day_bounds(date.fromisoformat(days[0]))[0] - get_max_duration()
+    range_end = day_bounds(date.fromisoformat(days[-1]))[1]
+
+    busy = defaultdict(list)
+    rows = (
+        Consultation.objects.filter(
+            professional_id__in={pid for pid, _ in scopes},
+            datetime__gte=range_start,
+            datetime__lt=range_end,
+        )
+        .order_by("professional_id", "datetime")
+        .values_list("professional_id", "datetime", "ends_at")
+    )
+    for pid, start, end in rows:
+        busy[pid].append((start, end))
+
+    return {
+        (pid, day): free_slots(date.fromisoformat(day), busy[pid], slot)
+        for pid, day in scopes
+    }
+
+
+def invalidate_slots(slots):
+    """
+    Invalida os dias tocados por cada ``(professional_id, datetime)`` depois
+    do commit, para que uma leitura concorrente não grave em cache o estado
+    anterior com a versão nova.
+    """
+    # A duração de cada consulta não vem nos pares: usa a maior possível
+    duration = get_max_duration()
+    scopes = set()
+    for professional_id, start in slots:
+        if professional_id is None or start is None:
+            continue
+        day = timezone.localdate(start)
+        last_day = timezone.localdate(start + duration - timedelta(microseconds=1))
+        while day <= last_day:
+            scopes.add((professional_id, day.isoformat()))
+            day += timedelta(days=1)
+
+    def bump():
+        for scope in scopes:
+            availability_cache.bump(*scope)
+
+    if scopes:
+        transaction.on_commit(bump)
@@ -0,0 +1,213 @@
+"""
+Agenda de um profissional em iCalendar (RFC 5545).
+
+O feed é gerado em fluxo: as consultas são percorridas com ``iterator`` em
+blocos e cada evento vira algumas linhas de texto sob demanda. Antes disso,
+uma única consulta agregada (quantidade e última alteração das consultas do
+profissional, servida pelo índice (professional, updated_at)) dá o ETag do
+feed, de modo que clientes com o feed em dia recebem 304 sem que nenhuma
+consulta seja lida.
+
+Aplicativos de calendário só sabem buscar uma URL: não mandam o cabeçalho
+``Authorization`` nem renovam o JWT. Além do JWT, o feed aceita
+``?token=`` com o token de assinatura do profissional
+(``CalendarFeedToken``), de longa duração e revogável: emitir outro invalida
+o anterior, e apagá-lo encerra a assinatura.
+
+O feed não tem Last-Modified: a última alteração das consultas que restam
+não muda quando uma consulta é excluída, arquivada ou passa para outro
+profissional, e um cliente que só mandasse ``If-Modified-Since`` ficaria com
+o evento removido para sempre. Só o ETag (que inclui a quantidade) percebe
+essas remoções.
+"""
+
+import hashlib
+import hmac
+import secrets
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer
+
+from professionals.models import Professional
+from .models import CalendarFeedToken, Consultation
+
+TOKEN_PARAM = "token"
+
+CONTENT_TYPE = "text/calendar; charset=utf-8"
+PRODID = "-//Lacrei Saude//Consultas//PT-BR"
+# Limite de octetos por linha antes da dobra (RFC 5545, 3.1)
+LINE_LIMIT = 75
+
+
+class ICalendarRenderer(BaseRenderer):
+    """
+    Permite negociar ``text/calendar`` (e o sufixo ``.ics``). O feed em si sai
+    como ``StreamingHttpResponse``; o renderer só escreve respostas de erro.
+    """
+
+    media_type = "text/calendar"
+    format = "ics"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and "detail" in data:
+            data = data["detail"]
+        return str(data if data is not None else "").encode(self.charset)
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_feed_token(professional_id):
+    """Emite um token de assinatura para o profissional, revogando o anterior."""
+    token = secrets.token_urlsafe(32)
+    CalendarFeedToken.objects.update_or_create(
+        professional_id=professional_id,
+        defaults={"token_hash": hash_token(token)},
+    )
+    return token
+
+
+def revoke_feed_token(professional_id):
+    """Revoga o token do profissional; devolve se havia um."""
+    deleted, _ = CalendarFeedToken.objects.filter(
+        professional_id=professional_id
+    ).delete()
+    return bool(deleted)
+
+
+def check_feed_token(professional_id, token):
+    stored = (
+        CalendarFeedToken.objects.filter(professional_id=professional_id)
+        .values_list("token_hash", flat=True)
+        .first()
+    )
+    return stored is not None and hmac.compare_digest(stored, hash_token(token))
+
+
+class CalendarFeedPermission(IsAuthenticated):
+    """
+    Usuário autenticado (JWT) ou ``?token=`` do profissional do feed. Como
+    ``IsAuthenticated``, só olha ``is_authenticated``: o JWT continua bastando
+    para um ``TokenUser``.
+    """
+
+    def has_permission(self, request, view):
+        if super().has_permission(request, view):
+            return True
+        token = request.query_params.get(TOKEN_PARAM)
+        return bool(token) and check_feed_token(view.kwargs["professional_id"], token)
+
+
+def get_chunk_size():
+    return getattr(settings, "CONSULTATION_CALENDAR_CHUNK_SIZE", 500)
+
+
+def feed_state(professional_id):
+    """
+    ``(profissional, quantidade, última alteração)`` das consultas de
+    ``professional_id``, ou ``None`` se o profissional não existir.
+    """
+    row = (
+        Professional.objects.filter(pk=professional_id)
+        .annotate(
+            consultation_count=Count("consultations"),
+            last_modified=Max("consultations__updated_at"),
+        )
+        .values("id", "name_social", "consultation_count", "last_modified")
+        .first()
+    )
+    if row is None:
+        return None
+    professional = {"id": row["id"], "name_social": row["name_social"]}
+    return professional, row["consultation_count"], row["last_modified"]
+
+
+def feed_etag(professional, count, last_modified):
+    """
+    ETag do feed. A quantidade entra junto com a última alteração porque uma
+    exclusão não muda o ``updated_at`` das consultas que ficaram.
+    """
+    parts = [
+        professional["id"],
+        professional["name_social"],
+        count,
+        last_modified.isoformat() if last_modified else "",
+    ]
+    digest = hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def escape_text(value):
+    """Escapa um valor TEXT (RFC 5545, 3.3.11)."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+        .replace("\r", "\\n")
+    )
+
+
+def fold(line):
+    """Dobra a linha em partes de até 75 octetos, sem cortar caracteres UTF-8."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= LINE_LIMIT:
+        return line + "\r\n"
+
+    parts = []
+    start, limit = 0, LINE_LIMIT
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Não termina uma parte no meio de um caractere multibyte
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        # As continuações começam com um espaço, que conta no limite
+        start, limit = end, LINE_LIMIT - 1
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def event_lines(consultation_id, start, end, notes, updated_at, summary):
+    yield fold("BEGIN:VEVENT")
+    yield fold(f"UID:consultation-{consultation_id}@lacreisaude")
+    yield fold(f"DTSTAMP:{format_datetime(updated_at)}")
+    yield fold(f"LAST-MODIFIED:{format_datetime(updated_at)}")
+    yield fold(f"DTSTART:{format_datetime(start)}")
+    yield fold(f"DTEND:{format_datetime(end)}")
+    yield fold(f"SUMMARY:{escape_text(summary)}")
+    if notes:
+        yield fold(f"DESCRIPTION:{escape_text(notes)}")
+    yield fold("END:VEVENT")
+
+
+def calendar_lines(professional, chunk_size=None):
+    """Gera o ``VCALENDAR`` do profissional, evento a evento."""
+    summary = f"Consulta - {professional['name_social']}"
+    rows = (
+        Consultation.objects.filter(professional_id=professional["id"])
+        .order_by("datetime", "id")
+        .values_list("id", "datetime", "ends_at", "notes", "updated_at")
+        .iterator(chunk_size=chunk_size or get_chunk_size())
+    )
+
+    yield fold("BEGIN:VCALENDAR")
+    yield fold("VERSION:2.0")
+    yield fold(f"PRODID:{PRODID}")
+    yield fold("CALSCALE:GREGORIAN")
+    yield fold("METHOD:PUBLISH")
+    yield fold(f"X-WR-CALNAME:{escape_text(professional['name_social'])}")
+    for consultation_id, start, end, notes, updated_at in rows:
+        yield "".join(
+            event_lines(consultation_id, start, end, notes, updated_at, summary)
+        )
+    yield fold("END:VCALENDAR")
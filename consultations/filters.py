@@ -0,0 +1,163 @@
+"""
+Filtros das listagens de consultas.
+
+Cada filtro aceito tem um índice que o atende, sem depender de varrer a
+tabela:
+
+- ``datetime__gte``/``datetime__lt`` e ``when`` (``upcoming``/``past``):
+  índice (datetime, id), o mesmo da ordenação da paginação por cursor;
+- ``professional`` (lista de ids): constraint única (professional, datetime);
+- ``profession``: índice de ``Professional.profession``, e daí o índice
+  (professional, datetime).
+
+A ordenação é fixa e a lista de profissionais é limitada. Parâmetros com
+cara de filtro que não estão na lista (``status``, ``notes``,
+``datetime__year``...) são recusados com 400 em vez de ignorados, para que
+nenhum cliente pagine a tabela inteira achando que filtrou.
+"""
+
+from django.conf import settings
+from django.utils import timezone
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Consultation
+
+UPCOMING = "upcoming"
+PAST = "past"
+
+
+def get_max_professionals():
+    return getattr(settings, "CONSULTATION_FILTER_MAX_PROFESSIONALS", 50)
+
+
+class ConsultationFilterSerializer(serializers.Serializer):
+    """Valida os filtros da listagem de consultas."""
+
+    datetime__gte = serializers.DateTimeField(required=False)
+    datetime__lt = serializers.DateTimeField(required=False)
+    professional = serializers.CharField(required=False)
+    profession = serializers.CharField(required=False)
+    when = serializers.ChoiceField(choices=[UPCOMING, PAST], required=False)
+
+    def validate_professional(self, value):
+        try:
+            ids = sorted({int(pk) for pk in value.split(",") if pk.strip()})
+        except ValueError:
+            raise serializers.ValidationError(
+                "Informe ids de profissionais separados por vírgula."
+            )
+        if not ids or ids[0] < 1:
+            raise serializers.ValidationError("Informe ids de profissionais válidos.")
+        max_professionals = get_max_professionals()
+        if len(ids) > max_professionals:
+            raise serializers.ValidationError(
+                f"Informe no máximo {max_professionals} profissionais."
+            )
+        return ids
+
+    def validate(self, attrs):
+        start, end = attrs.get("datetime__gte"), attrs.get("datetime__lt")
+        if start and end and end <= start:
+            raise serializers.ValidationError(
+                {"datetime__lt": ["Deve ser posterior a datetime__gte."]}
+            )
+        return attrs
+
+
+FILTER_PARAMS = tuple(ConsultationFilterSerializer().fields)
+
+
+def unsupported_filters(query_params):
+    """Parâmetros que pedem filtros sem índice (ou que não existem)."""
+    model_fields = {field.name for field in Consultation._meta.get_fields()}
+    model_fields |= {field.attname for field in Consultation._meta.concrete_fields}
+    return sorted(
+        name
+        for name in query_params
+        if name not in FILTER_PARAMS
+        and ("__" in name or name in model_fields or name == "status")
+    )
+
+
+def filter_consultations(queryset, query_params, now=None):
+    """Aplica a ``queryset`` os filtros de ``query_params`` (já validados aqui)."""
+    unsupported = unsupported_filters(query_params)
+    if unsupported:
+        raise serializers.ValidationError(
+            {
+                name: [f"Filtro não suportado. Use: {', '.join(FILTER_PARAMS)}."]
+                for name in unsupported
+            }
+        )
+
+    query = ConsultationFilterSerializer(
+        data={
+            name: query_params[name] for name in FILTER_PARAMS if name in query_params
+        }
+    )
+    query.is_valid(raise_exception=True)
+    params = query.validated_data
+
+    if "datetime__gte" in params:
+        queryset = queryset.filter(datetime__gte=params["datetime__gte"])
+    if "datetime__lt" in params:
+        queryset = queryset.filter(datetime__lt=params["datetime__lt"])
+    if "when" in params:
+        now = now or timezone.now()
+        if params["when"] == UPCOMING:
+            queryset = queryset.filter(datetime__gte=now)
+        else:
+            queryset = queryset.filter(datetime__lt=now)
+    if "professional" in params:
+        queryset = queryset.filter(professional_id__in=params["professional"])
+    if "profession" in params:
+        queryset = queryset.filter(professional__profession=params["profession"])
+    return queryset
+
+
+FILTER_PARAMETERS = [
+    OpenApiParameter(
+        "datetime__gte",
+        OpenApiTypes.DATETIME,
+        description="Consultas a partir deste instante (inclusive).",
+    ),
+    OpenApiParameter(
+        "datetime__lt",
+        OpenApiTypes.DATETIME,
+        description="Consultas antes deste instante.",
+    ),
+    OpenApiParameter(
+        "professional",
+        OpenApiTypes.STR,
+        description="Ids de profissionais separados por vírgula (ex.: 1,2,3).",
+    ),
+    OpenApiParameter(
+        "profession",
+        OpenApiTypes.STR,
+        description="Profissão do profissional (valor exato).",
+    ),
+    OpenApiParameter(
+        "when",
+        OpenApiTypes.STR,
+        enum=[UPCOMING, PAST],
+        description="Só consultas futuras (upcoming) ou passadas (past).",
+    ),
+]
+
+
+class ConsultationFilterBackend(BaseFilterBackend):
+    """
+    Filtros indexados das listagens de ``ConsultationViewSet``.
+
+    Só vale nas ações de listagem: no detalhe, na edição e na exclusão os
+    parâmetros de filtro são ignorados, como em qualquer rota por id.
+    """
+
+    list_actions = ("list", "by_professional")
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, "action", None) not in self.list_actions:
+            return queryset
+        return filter_consultations(queryset, request.query_params)
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from consultations.archive import (
+    archive_consultations,
+    archive_cutoff,
+    get_archive_after_days,
+    get_batch_size,
+    pending_archive,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move as consultas anteriores ao horizonte de retenção para a tabela "
+        "de arquivo, em lotes (agende, por exemplo, uma vez por dia)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Arquiva consultas com mais de N dias "
+            "(padrão: CONSULTATION_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Consultas por transação (padrão: CONSULTATION_ARCHIVE_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Só informa quantas consultas seriam arquivadas.",
+        )
+
+    def handle(self, *args, days, batch_size, dry_run, **options):
+        days = get_archive_after_days() if days is None else days
+        before = archive_cutoff(days)
+        if dry_run:
+            count = pending_archive(before).count()
+            self.stdout.write(
+                f"{count} consultas anteriores a {before} seriam arquivadas."
+            )
+            return
+        moved = archive_consultations(before, batch_size or get_batch_size())
+        self.stdout.write(
+            self.style.SUCCESS(f"{moved} consultas anteriores a {before} arquivadas.")
+        )
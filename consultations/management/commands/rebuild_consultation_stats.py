@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from consultations.stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os resumos diários de consultas a partir da tabela de "
+        "consultas (ex.: depois de alterações feitas direto no banco)."
+    )
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_stats()
+        self.stdout.write(self.style.SUCCESS(f"{rows} resumos diários gravados."))
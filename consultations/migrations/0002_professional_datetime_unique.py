@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consultations", "0001_initial"),
+        ("professionals", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="consultation",
+            constraint=models.UniqueConstraint(
+                fields=("professional", "datetime"),
+                name="unique_consultation_professional_datetime",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="consultation",
+            name="professional",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="consultations",
+                to="professionals.professional",
+            ),
+        ),
+    ]
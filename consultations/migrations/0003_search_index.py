@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from core.search import create_index_operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consultations", "0002_professional_datetime_unique"),
+    ]
+
+    operations = [
+        create_index_operation("consultations_consultation", ("notes",)),
+    ]
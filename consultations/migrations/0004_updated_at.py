@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consultations", "0003_search_index"),
+        ("professionals", "0002_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="consultation",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="consultation",
+            index=models.Index(
+                fields=["professional", "updated_at"],
+                name="consultation_prof_updated_idx",
+            ),
+        ),
+    ]
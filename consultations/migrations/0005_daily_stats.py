@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def build_daily_stats(apps, schema_editor):
+    """Preenche os resumos com as consultas já existentes."""
+    Consultation = apps.get_model("consultations", "Consultation")
+    ConsultationDailyStat = apps.get_model("consultations", "ConsultationDailyStat")
+    rows = (
+        Consultation.objects.annotate(
+            day=TruncDate("datetime", tzinfo=timezone.get_default_timezone())
+        )
+        .values("professional_id", "day")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    ConsultationDailyStat.objects.bulk_create(
+        (ConsultationDailyStat(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consultations", "0004_updated_at"),
+        ("professionals", "0002_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConsultationDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "professional",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="professionals.professional",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["day"], name="daily_stat_day_idx")],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("professional", "day"),
+                        name="unique_daily_stat_professional_day",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consultations", "0005_daily_stats"),
+        ("professionals", "0003_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="consultation",
+            index=models.Index(
+                fields=["datetime", "id"], name="consultation_datetime_id_idx"
+            ),
+        ),
+    ]
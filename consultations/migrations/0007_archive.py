@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consultations", "0006_filter_indexes"),
+        ("professionals", "0003_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedConsultation",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("datetime", models.DateTimeField()),
+                ("notes", models.TextField(blank=True)),
+                ("updated_at", models.DateTimeField()),
+                (
+                    "archived_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "professional",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_consultations",
+                        to="professionals.professional",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["professional", "datetime", "id"],
+                        name="archived_prof_datetime_idx",
+                    )
+                ],
+            },
+        ),
+    ]
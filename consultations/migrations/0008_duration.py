@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+import consultations.models
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_ends_at(apps, schema_editor):
+    """
+    Dá às consultas existentes a duração padrão, encurtada quando a próxima
+    consulta do mesmo profissional começa antes disso — assim nenhuma
+    consulta já gravada passa a se sobrepor a outra.
+    """
+    Consultation = apps.get_model("consultations", "Consultation")
+    default = timedelta(minutes=consultations.models.default_duration())
+    rows = (
+        Consultation.objects.order_by("professional_id", "datetime")
+        .only("id", "professional_id", "datetime")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+
+    batch, previous = [], None
+    for consultation in rows:
+        if previous is not None:
+            gap = default
+            if previous.professional_id == consultation.professional_id:
+                gap = min(default, consultation.datetime - previous.datetime)
+            batch.append(finish(previous, gap))
+        previous = consultation
+        if len(batch) >= BATCH_SIZE:
+            Consultation.objects.bulk_update(batch, ["duration", "ends_at"])
+            batch = []
+    if previous is not None:
+        batch.append(finish(previous, default))
+    Consultation.objects.bulk_update(batch, ["duration", "ends_at"])
+
+
+def finish(consultation, length):
+    consultation.duration = int(length.total_seconds() // 60)
+    consultation.ends_at = consultation.datetime + timedelta(
+        minutes=consultation.duration
+    )
+    return consultation
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    # No PostgreSQL o próprio banco recusa sobreposições, mesmo entre
+    # transações concorrentes; nos demais bancos vale a checagem da aplicação
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE consultations_consultation "
+        "ADD CONSTRAINT consultation_no_overlap EXCLUDE USING gist "
+        "(professional_id WITH =, tstzrange(datetime, ends_at) WITH &&)"
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE consultations_consultation "
+        "DROP CONSTRAINT IF EXISTS consultation_no_overlap"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consultations", "0007_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="consultation",
+            name="duration",
+            field=models.PositiveSmallIntegerField(
+                default=consultations.models.default_duration
+            ),
+        ),
+        migrations.AddField(
+            model_name="consultation",
+            name="ends_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_ends_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="consultation",
+            name="ends_at",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddField(
+            model_name="archivedconsultation",
+            name="duration",
+            field=models.PositiveSmallIntegerField(
+                default=consultations.models.default_duration
+            ),
+        ),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -1,13 +1,213 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from professionals.models import Professional
 
 
+def default_duration():
+    """Duração padrão (minutos) de uma consulta nova."""
+    return getattr(settings, "CONSULTATION_DEFAULT_DURATION_MINUTES", 30)
+
+
+def get_max_duration():
+    """
+    Maior duração aceita. Limita quanto antes de um horário uma consulta que o
+    sobrepõe pode ter começado; por isso o valor só deve aumentar.
+    """
+    return timedelta(
+        minutes=getattr(settings, "CONSULTATION_MAX_DURATION_MINUTES", 480)
+    )
+
+
+class ConsultationQuerySet(models.QuerySet):
+    def overlapping(self, intervals):
+        """
+        Consultas que se sobrepõem a algum dos intervalos
+        ``(professional_id, início, fim)``.
+
+        Como nenhuma consulta dura mais que ``get_max_duration()``, só as que
+        começam entre ``início - duração máxima`` e ``fim`` podem se sobrepor:
+        cada intervalo vira uma faixa curta do índice (professional, datetime),
+        e a lista inteira é resolvida em uma única query, sem ler o histórico
+        do profissional.
+        """
+        max_duration = get_max_duration()
+        condition = Q()
+        for professional_id, start, end in intervals:
+            condition |= Q(
+                professional_id=professional_id,
+                datetime__gt=start - max_duration,
+                datetime__lt=end,
+                ends_at__gt=start,
+            )
+        if not condition:
+            return self.none()
+        return self.filter(condition)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create não chama save(): o término é calculado aqui
+        objs = list(objs)
+        for obj in objs:
+            obj.set_ends_at()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Consultation(models.Model):
     datetime = models.DateTimeField()
+    # Índice próprio dispensado: (professional, datetime) já começa pelo FK
     professional = models.ForeignKey(
-        Professional, on_delete=models.CASCADE, related_name="consultations"
+        Professional,
+        on_delete=models.CASCADE,
+        related_name="consultations",
+        db_index=False,
     )
     notes = models.TextField(blank=True)
+    # Última gravação da linha; base do ETag do calendário
+    updated_at = models.DateTimeField(auto_now=True)
+    # Duração em minutos; o término é gravado junto para as buscas por sobreposição
+    duration = models.PositiveSmallIntegerField(default=default_duration)
+    ends_at = models.DateTimeField(editable=False)
+
+    objects = ConsultationQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Também serve como índice composto para buscas por profissional/horário
+            models.UniqueConstraint(
+                fields=["professional", "datetime"],
+                name="unique_consultation_professional_datetime",
+            ),
+        ]
+        indexes = [
+            # Ordenação da paginação por cursor e filtros por período
+            models.Index(
+                fields=["datetime", "id"], name="consultation_datetime_id_idx"
+            ),
+            # Contagem e última alteração por profissional sem ler a tabela
+            models.Index(
+                fields=["professional", "updated_at"],
+                name="consultation_prof_updated_idx",
+            ),
+        ]
+
+    def set_ends_at(self):
+        self.ends_at = self.datetime + timedelta(minutes=self.duration)
+
+    def save(self, *args, **kwargs):
+        self.set_ends_at()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"datetime", "duration"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "ends_at"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_slot()
+        return instance
+
+    def remember_slot(self):
+        """
+        Guarda o horário como estava no banco, para que os sinais saibam qual
+        horário foi liberado quando uma consulta é remarcada.
+        """
+        self._loaded_slot = (
+            self.__dict__.get("professional_id"),
+            self.__dict__.get("datetime"),
+        )
 
     def __str__(self):
         return f"Consulta {self.id} - {self.professional} @ {self.datetime}"
+
+
+class ArchivedConsultation(models.Model):
+    """
+    Consulta passada movida para fora de ``Consultation`` pelo comando
+    ``archive_consultations`` (ver ``consultations.archive``). Mantém o id
+    original; só é lida pelo histórico explícito da API.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    datetime = models.DateTimeField()
+    # Índice próprio dispensado: (professional, datetime, id) já começa pelo FK
+    professional = models.ForeignKey(
+        Professional,
+        on_delete=models.CASCADE,
+        related_name="archived_consultations",
+        db_index=False,
+    )
+    notes = models.TextField(blank=True)
+    updated_at = models.DateTimeField()
+    duration = models.PositiveSmallIntegerField(default=default_duration)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Histórico por profissional na ordem da paginação por cursor
+            models.Index(
+                fields=["professional", "datetime", "id"],
+                name="archived_prof_datetime_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"Consulta arquivada {self.id} - {self.professional_id} @ {self.datetime}"
+        )
+
+
+class ConsultationDailyStat(models.Model):
+    """
+    Quantidade de consultas por (profissional, dia), no fuso ``TIME_ZONE``.
+
+    Tabela de resumo mantida por ``consultations.stats``: cada gravação de
+    consulta recalcula só os dias que tocou, e os relatórios somam estas
+    linhas em vez de percorrer as consultas.
+    """
+
+    # Índice próprio dispensado: a constraint (professional, day) já começa pelo FK
+    professional = models.ForeignKey(
+        Professional,
+        on_delete=models.CASCADE,
+        related_name="daily_stats",
+        db_index=False,
+    )
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["professional", "day"],
+                name="unique_daily_stat_professional_day",
+            ),
+        ]
+        indexes = [
+            # Relatórios filtram por período antes de agrupar
+            models.Index(fields=["day"], name="daily_stat_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.professional_id} @ {self.day}: {self.count}"
+
+
+class CalendarFeedToken(models.Model):
+    """
+    Token de assinatura do feed iCalendar de um profissional.
+
+    Aplicativos de calendário não enviam cabeçalhos nem renovam o JWT: o feed
+    aceita este token, de longa duração, na própria URL. Só o sha256 do token
+    é guardado; emitir outro revoga o anterior.
+    """
+
+    professional = models.OneToOneField(
+        Professional, on_delete=models.CASCADE, related_name="calendar_token"
+    )
+    token_hash = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Token do feed de {self.professional_id}"
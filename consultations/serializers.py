@@ -1,38 +1,340 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from django.utils import timezone
-from .models import Consultation
+from changes import tracking
+from core import search
+from .availability import invalidate_slots
+from .models import (
+    ArchivedConsultation,
+    Consultation,
+    default_duration,
+    get_max_duration,
+)
+from .stats import GROUPS, refresh_daily_stats
 from professionals.models import Professional
 
+DUPLICATE_SLOT_MESSAGE = (
+    "Já existe uma consulta agendada para este horário com o mesmo profissional."
+)
+MISSING_PROFESSIONAL_MESSAGE = "Profissional informado não existe."
+
+
+def validate_future_datetime(value):
+    if value < timezone.now():
+        raise serializers.ValidationError(
+            "A data/hora da consulta não pode ser no passado."
+        )
+    return value
+
+
+def validate_duration(value):
+    max_minutes = int(get_max_duration().total_seconds() // 60)
+    if not 1 <= value <= max_minutes:
+        raise serializers.ValidationError(
+            f"A duração deve estar entre 1 e {max_minutes} minutos."
+        )
+    return value
+
+
+def first_conflict(intervals, start, end):
+    """
+    Intervalo de ``intervals`` (ordenados e sem sobreposição entre si) que
+    cruza ``[start, end)``, ou ``None``. Basta olhar os dois vizinhos de
+    ``start`` na ordem: o anterior e o seguinte.
+    """
+    i = bisect_left(intervals, (start,))
+    if i and intervals[i - 1][1] > start:
+        return intervals[i - 1]
+    if i < len(intervals) and intervals[i][0] < end:
+        return intervals[i]
+    return None
+
 
 class ConsultationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Consultation
-        fields = "__all__"
+        # updated_at é interno (versão do calendário); a API não o expõe
+        exclude = ["updated_at"]
+        # A unicidade (professional, datetime) é garantida pela constraint do
+        # banco; sem isso o DRF geraria um UniqueTogetherValidator com SELECT extra.
+        validators = []
+        extra_kwargs = {
+            "professional": {
+                "error_messages": {
+                    "does_not_exist": MISSING_PROFESSIONAL_MESSAGE,
+                }
+            }
+        }
+
+    def validate_datetime(self, value):
+        return validate_future_datetime(value)
+
+    def validate_duration(self, value):
+        return validate_duration(value)
+
+    def create(self, validated_data):
+        """
+        Regras adicionais de negócio:
+        - Impedir consultas sobrepostas para o mesmo profissional: uma busca
+          pelos vizinhos no índice (professional, datetime); no PostgreSQL a
+          constraint de exclusão também barra gravações concorrentes
+        """
+        try:
+            with transaction.atomic():
+                self._check_overlap(validated_data)
+                return super().create(validated_data)
+        except IntegrityError:
+            raise self._duplicate_slot_error()
+
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                self._check_overlap(validated_data, instance)
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise self._duplicate_slot_error()
+
+    def _check_overlap(self, data, instance=None):
+        # Alterações que não mexem no intervalo (ex.: só notas) não consultam
+        if instance is not None and not {"professional", "datetime", "duration"} & (
+            data.keys()
+        ):
+            return
+        professional = data.get("professional") or instance.professional
+        start = data.get("datetime") or instance.datetime
+        duration = data.get(
+            "duration", instance.duration if instance else default_duration()
+        )
+        conflicts = Consultation.objects.overlapping(
+            [(professional.pk, start, start + timedelta(minutes=duration))]
+        )
+        if instance is not None:
+            conflicts = conflicts.exclude(pk=instance.pk)
+        if conflicts.exists():
+            raise self._duplicate_slot_error()
+
+    def _duplicate_slot_error(self):
+        return serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [DUPLICATE_SLOT_MESSAGE]}
+        )
+
+
+class ArchivedConsultationSerializer(serializers.ModelSerializer):
+    """Consulta do histórico arquivado (somente leitura)."""
+
+    class Meta:
+        model = ArchivedConsultation
+        fields = [
+            "id",
+            "datetime",
+            "notes",
+            "duration",
+            "professional",
+            "archived_at",
+        ]
+        read_only_fields = fields
+
+
+class ConsultationBulkItemSerializer(serializers.Serializer):
+    """
+    Item de um lote. O profissional é validado apenas como inteiro aqui; a
+    existência é conferida para o lote inteiro com uma única query.
+    """
+
+    professional = serializers.IntegerField(min_value=1)
+    datetime = serializers.DateTimeField()
+    notes = serializers.CharField(required=False, allow_blank=True, default="")
+    duration = serializers.IntegerField(required=False, default=default_duration)
 
     def validate_datetime(self, value):
-        if value < timezone.now():
+        return validate_future_datetime(value)
+
+    def validate_duration(self, value):
+        return validate_duration(value)
+
+
+class ConsultationBulkSerializer(serializers.Serializer):
+    """
+    Criação (ou upsert) de consultas em lote.
+
+    Cada item é validado isoladamente e recebe seu próprio resultado; as
+    verificações que dependem do banco são feitas por conjunto (uma query
+    para profissionais e outra para os intervalos já ocupados) e a gravação
+    usa ``bulk_create`` em uma única transação. Itens que se sobrepõem a uma
+    consulta existente ou a um item anterior do lote são recusados.
+    """
+
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    upsert = serializers.BooleanField(default=False)
+
+    def validate_items(self, value):
+        max_items = getattr(settings, "CONSULTATION_BULK_MAX_ITEMS", 500)
+        if len(value) > max_items:
             raise serializers.ValidationError(
-                "A data/hora da consulta não pode ser no passado."
+                f"O lote aceita no máximo {max_items} consultas."
             )
         return value
 
-    def validate_professional(self, value):
-        if not Professional.objects.filter(id=value.id).exists():
-            raise serializers.ValidationError("Profissional informado não existe.")
-        return value
+    def save(self):
+        upsert = self.validated_data["upsert"]
+        self.results = []
+        self.pending = {}
+
+        for index, raw in enumerate(self.validated_data["items"]):
+            item = ConsultationBulkItemSerializer(data=raw)
+            self.results.append({"index": index, "status": "pending"})
+            if item.is_valid():
+                self.pending[index] = item.validated_data
+            else:
+                self._fail(index, item.errors)
+
+        existing_professionals = set(
+            Professional.objects.filter(
+                id__in={data["professional"] for data in self.pending.values()}
+            ).values_list("id", flat=True)
+        )
+        intervals = {}
+        for index, data in list(self.pending.items()):
+            if data["professional"] not in existing_professionals:
+                self._fail(index, {"professional": [MISSING_PROFESSIONAL_MESSAGE]})
+            else:
+                start = data["datetime"]
+                end = start + timedelta(minutes=data["duration"])
+                intervals[index] = (data["professional"], start, end)
+
+        # Intervalos já gravados que cruzam algum item, numa única query
+        existing = defaultdict(list)
+        rows = (
+            Consultation.objects.overlapping(intervals.values())
+            .order_by("professional_id", "datetime")
+            .values_list("professional_id", "datetime", "ends_at")
+        )
+        for professional_id, start, end in rows:
+            existing[professional_id].append((start, end))
+
+        # Itens aceitos até aqui, por profissional, na ordem do início
+        accepted = defaultdict(list)
+        taken = set()
+        for index, (professional_id, start, end) in intervals.items():
+            booked = existing[professional_id]
+            i = bisect_left(booked, (start,))
+            updating = upsert and i < len(booked) and booked[i][0] == start
+            if updating:
+                # No upsert, a consulta no mesmo horário é a que será atualizada
+                booked = booked[:i] + booked[i + 1 :]
+            if first_conflict(booked, start, end) or first_conflict(
+                accepted[professional_id], start, end
+            ):
+                self._fail(index, self._duplicate_errors())
+                continue
+            insort(accepted[professional_id], (start, end))
+            if updating:
+                taken.add((professional_id, start))
+
+        objs = [
+            Consultation(
+                professional_id=data["professional"],
+                datetime=data["datetime"],
+                notes=data["notes"],
+                duration=data["duration"],
+            )
+            for data in self.pending.values()
+        ]
+        if objs:
+            try:
+                with transaction.atomic():
+                    if upsert:
+                        Consultation.objects.bulk_create(
+                            objs,
+                            update_conflicts=True,
+                            unique_fields=["professional", "datetime"],
+                            update_fields=[
+                                "notes",
+                                "duration",
+                                "ends_at",
+                                "updated_at",
+                            ],
+                        )
+                    else:
+                        Consultation.objects.bulk_create(objs)
+                    # bulk_create não dispara post_save
+                    search.index_instances(Consultation, objs)
+                    written = [(obj.professional_id, obj.datetime) for obj in objs]
+                    invalidate_slots(written)
+                    refresh_daily_stats(written)
+                    tracking.record(Consultation, [obj.pk for obj in objs])
+            except IntegrityError:
+                # Outro processo ocupou um dos horários entre a checagem e a gravação
+                raise serializers.ValidationError(self._duplicate_errors())
+
+        for index, obj in zip(self.pending, objs):
+            slot = (obj.professional_id, obj.datetime)
+            self.results[index] = {
+                "index": index,
+                "status": "updated" if slot in taken else "created",
+                "id": obj.pk,
+            }
+        return self.results
+
+    def _fail(self, index, errors):
+        self.pending.pop(index, None)
+        self.results[index] = {"index": index, "status": "error", "errors": errors}
+
+    def _duplicate_errors(self):
+        return {api_settings.NON_FIELD_ERRORS_KEY: [DUPLICATE_SLOT_MESSAGE]}
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """Parâmetros de busca de horários livres."""
+
+    professional = serializers.IntegerField(required=False, min_value=1)
+    profession = serializers.CharField(required=False)
+    start = serializers.DateField()
+    end = serializers.DateField()
+    slot_minutes = serializers.IntegerField(
+        required=False, default=30, min_value=5, max_value=480
+    )
 
     def validate(self, attrs):
-        """
-        Regras adicionais de negócio:
-        - Impedir consultas duplicadas no mesmo horário para o mesmo profissional
-        """
-        professional = attrs.get("professional")
-        datetime_ = attrs.get("datetime")
+        if ("professional" in attrs) == ("profession" in attrs):
+            raise serializers.ValidationError(
+                "Informe um profissional ou uma profissão (apenas um deles)."
+            )
+        if attrs["end"] < attrs["start"]:
+            raise serializers.ValidationError(
+                {"end": ["A data final deve ser igual ou posterior à inicial."]}
+            )
+        max_days = getattr(settings, "AVAILABILITY_MAX_DAYS", 31)
+        if (attrs["end"] - attrs["start"]).days + 1 > max_days:
+            raise serializers.ValidationError(
+                {"end": [f"O intervalo máximo é de {max_days} dias."]}
+            )
+        return attrs
+
+
+class StatsQuerySerializer(serializers.Serializer):
+    """Parâmetros do relatório de consultas."""
+
+    start = serializers.DateField()
+    end = serializers.DateField()
+    group_by = serializers.ChoiceField(choices=list(GROUPS), default="day")
+    profession = serializers.CharField(required=False)
+    professional = serializers.IntegerField(required=False, min_value=1)
 
-        if Consultation.objects.filter(
-            professional=professional, datetime=datetime_
-        ).exists():
+    def validate(self, attrs):
+        if attrs["end"] < attrs["start"]:
+            raise serializers.ValidationError(
+                {"end": ["A data final deve ser igual ou posterior à inicial."]}
+            )
+        max_days = getattr(settings, "STATS_MAX_DAYS", 366)
+        if (attrs["end"] - attrs["start"]).days + 1 > max_days:
             raise serializers.ValidationError(
-                "Já existe uma consulta agendada para este horário com o mesmo profissional."
+                {"end": [f"O intervalo máximo é de {max_days} dias."]}
             )
         return attrs
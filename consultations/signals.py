@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .availability import invalidate_slots
+from .models import Consultation
+from .stats import refresh_daily_stats
+
+
+@receiver(post_save, sender=Consultation)
+@receiver(post_delete, sender=Consultation)
+def consultation_changed(sender, instance, **kwargs):
+    """Invalida a disponibilidade e reconta os resumos do horário novo e do antigo."""
+    slots = {(instance.professional_id, instance.datetime)}
+    previous = getattr(instance, "_loaded_slot", None)
+    if previous:
+        slots.add(previous)
+    invalidate_slots(slots)
+    refresh_daily_stats(slots)
+    instance.remember_slot()
@@ -0,0 +1,180 @@
+"""
+Estatísticas de consultas a partir de resumos diários.
+
+``ConsultationDailyStat`` guarda quantas consultas cada profissional tem em
+cada dia. Quando consultas mudam, apenas os pares (profissional, dia)
+tocados são recontados, com uma agregação servida pelo índice
+(professional, datetime), e gravados com um upsert. Os relatórios agrupam
+e somam a tabela de resumo; o custo depende do número de dias e
+profissionais do período, não do número de consultas.
+
+Recontar em vez de somar/subtrair deixa a atualização idempotente: uma
+recontagem repetida ou fora de ordem chega ao mesmo valor. A recontagem roda
+depois do commit de quem gravou e com as linhas de resumo travadas: dentro da
+transação, duas gravações concorrentes no mesmo dia não veriam uma a consulta
+da outra e a última a gravar deixaria o total uma unidade abaixo.
+"""
+
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedConsultation, Consultation, ConsultationDailyStat
+
+# Agrupamentos do relatório: nome na resposta -> coluna da tabela de resumo
+GROUPS = {
+    "day": {"day": "day"},
+    "professional": {
+        "professional": "professional_id",
+        "name_social": "professional__name_social",
+    },
+    "profession": {"profession": "professional__profession"},
+}
+
+
+def stat_day(value):
+    """Dia do resumo em que cai ``value``."""
+    return timezone.localdate(value, timezone.get_default_timezone())
+
+
+def day_start(day):
+    return timezone.make_aware(
+        datetime.combine(day, time.min), timezone.get_default_timezone()
+    )
+
+
+def count_by_day(queryset):
+    """``{(professional_id, dia): quantidade}`` das consultas de ``queryset``."""
+    rows = (
+        queryset.annotate(
+            day=TruncDate("datetime", tzinfo=timezone.get_default_timezone())
+        )
+        .values("professional_id", "day")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return {(row["professional_id"], row["day"]): row["count"] for row in rows}
+
+
+def refresh_daily_stats(slots):
+    """
+    Agenda, para depois do commit da transação corrente, a recontagem dos dias
+    tocados por cada ``(professional_id, datetime)``.
+    """
+    pairs = {
+        (professional_id, stat_day(start))
+        for professional_id, start in slots
+        if professional_id is not None and start is not None
+    }
+    if pairs:
+        transaction.on_commit(lambda: recount_daily_stats(pairs))
+
+
+def recount_daily_stats(pairs):
+    """
+    Reconta os pares ``(professional_id, dia)`` com uma única agregação e grava
+    os resumos.
+
+    As linhas de resumo dos pares são criadas (se faltarem) e travadas antes
+    da contagem: uma recontagem concorrente do mesmo dia espera esta terminar
+    e então conta também as consultas gravadas nesse meio-tempo.
+    """
+    pairs = sorted(pairs)
+    days = sorted(day for _, day in pairs)
+    with transaction.atomic():
+        ConsultationDailyStat.objects.bulk_create(
+            [
+                ConsultationDailyStat(professional_id=pid, day=day, count=0)
+                for pid, day in pairs
+            ],
+            ignore_conflicts=True,
+        )
+        list(
+            ConsultationDailyStat.objects.select_for_update()
+            .filter(
+                professional_id__in={pid for pid, _ in pairs},
+                day__gte=days[0],
+                day__lte=days[-1],
+            )
+            .order_by("professional_id", "day")
+            .values_list("pk", flat=True)
+        )
+        counts = count_by_day(
+            Consultation.objects.filter(
+                professional_id__in={pid for pid, _ in pairs},
+                datetime__gte=day_start(days[0]),
+                datetime__lt=day_start(days[-1] + timedelta(days=1)),
+            )
+        )
+        write_daily_stats({pair: counts.get(pair, 0) for pair in pairs})
+
+
+def write_daily_stats(counts):
+    """Grava os resumos de ``{(professional_id, dia): quantidade}``."""
+    stats = [
+        ConsultationDailyStat(professional_id=pid, day=day, count=count)
+        for (pid, day), count in counts.items()
+        if count
+    ]
+    empty = [pair for pair, count in counts.items() if not count]
+
+    with transaction.atomic():
+        if stats:
+            ConsultationDailyStat.objects.bulk_create(
+                stats,
+                update_conflicts=True,
+                unique_fields=["professional", "day"],
+                update_fields=["count"],
+            )
+        for pid, day in empty:
+            ConsultationDailyStat.objects.filter(professional_id=pid, day=day).delete()
+
+
+def rebuild_daily_stats():
+    """
+    Recalcula a tabela de resumo inteira (consultas arquivadas incluídas);
+    devolve quantas linhas gravou.
+    """
+    counts = Counter(count_by_day(Consultation.objects.all()))
+    counts.update(count_by_day(ArchivedConsultation.objects.all()))
+    with transaction.atomic():
+        ConsultationDailyStat.objects.all().delete()
+        ConsultationDailyStat.objects.bulk_create(
+            ConsultationDailyStat(professional_id=pid, day=day, count=count)
+            for (pid, day), count in counts.items()
+        )
+    return len(counts)
+
+
+def get_stats(start, end, group_by, profession=None, professional=None):
+    """
+    Total de consultas entre ``start`` e ``end`` (inclusive), agrupado por
+    ``group_by`` (``day``, ``professional`` ou ``profession``).
+    """
+    queryset = ConsultationDailyStat.objects.filter(day__gte=start, day__lte=end)
+    if profession:
+        queryset = queryset.filter(professional__profession=profession)
+    if professional:
+        queryset = queryset.filter(professional_id=professional)
+
+    columns = GROUPS[group_by]
+    rows = (
+        queryset.values(*columns.values())
+        .annotate(consultations=Sum("count"))
+        .order_by(*columns.values())
+    )
+    results = [
+        {
+            **{name: row[column] for name, column in columns.items()},
+            "consultations": row["consultations"],
+        }
+        for row in rows
+    ]
+    return {
+        "total": sum(row["consultations"] for row in results),
+        "results": results,
+    }
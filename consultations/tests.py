@@ -1,10 +1,17 @@
 from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from professionals.models import Professional
-from .models import Consultation
+from . import calendar
+from .models import CalendarFeedToken, Consultation
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.http import http_date
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -49,6 +56,32 @@ class ConsultationCRUDTest(APITestCase):
         r = self.client.post(self.list_url, payload, format="json")
         self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_duplicate_slot(self):
+        r = self.client.post(self.list_url, self.valid_payload, format="json")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        r = self.client.post(self.list_url, self.valid_payload, format="json")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Já existe uma consulta agendada para este horário", str(r.data))
+        self.assertEqual(Consultation.objects.count(), 1)
+
+    def test_update_keeping_same_slot(self):
+        consultation = Consultation.objects.create(
+            professional=self.professional,
+            datetime=timezone.now() + timedelta(days=2),
+            notes="Antiga",
+        )
+        url = reverse("consultation-detail", args=[consultation.id])
+        r = self.client.put(
+            url,
+            {
+                "professional": self.professional.id,
+                "datetime": consultation.datetime.isoformat(),
+                "notes": "Mesmo horário",
+            },
+            format="json",
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
     def test_update_consultation(self):
         consultation = Consultation.objects.create(
             professional=self.professional,
@@ -133,3 +166,1166 @@ class ConsultationCRUDTest(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
         r = self.client.get(self.list_url)
         self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ConsultationPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+        self.professional = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        other = Professional.objects.create(name_social="Bia", profession="Médica")
+        base = timezone.now() + timedelta(days=1)
+        # Horários repetidos entre profissionais garantem o desempate por id
+        self.consultations = [
+            Consultation.objects.create(
+                professional=self.professional if i % 2 else other,
+                datetime=base + timedelta(hours=i // 2),
+                notes=f"c{i}",
+            )
+            for i in range(7)
+        ]
+        self.list_url = reverse("consultation-list")
+
+    def _collect(self, url):
+        ids = []
+        while url:
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+            ids.extend(item["id"] for item in r.data["results"])
+            url = r.data["next"]
+        return ids
+
+    def test_pages_follow_datetime_then_id(self):
+        ids = self._collect(f"{self.list_url}?page_size=3")
+        expected = [
+            c.id for c in sorted(self.consultations, key=lambda c: (c.datetime, c.id))
+        ]
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get(f"{self.list_url}?page_size=3").data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual(
+            [item["id"] for item in back["results"]],
+            [item["id"] for item in first["results"]],
+        )
+        self.assertIsNone(first["previous"])
+
+    def test_page_does_not_count_rows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(f"{self.list_url}?page_size=2")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        sql = " ".join(q["sql"].upper() for q in ctx.captured_queries)
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_page_size_is_capped(self):
+        with self.settings(API_MAX_PAGE_SIZE=2):
+            r = self.client.get(f"{self.list_url}?page_size=1000")
+        self.assertEqual(len(r.data["results"]), 2)
+
+    def test_invalid_cursor(self):
+        r = self.client.get(f"{self.list_url}?cursor=invalido")
+        self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_by_professional_is_paginated(self):
+        url = reverse("consultation-by_professional", args=[self.professional.id])
+        ids = self._collect(f"{url}?page_size=2")
+        expected = [
+            c.id
+            for c in sorted(self.consultations, key=lambda c: (c.datetime, c.id))
+            if c.professional_id == self.professional.id
+        ]
+        self.assertEqual(ids, expected)
+
+
+class ConsultationBulkTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+        self.professional = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        self.url = reverse("consultation-bulk")
+        self.base = timezone.now() + timedelta(days=1)
+
+    def _item(self, hours, notes="", professional=None):
+        return {
+            "professional": professional or self.professional.id,
+            "datetime": (self.base + timedelta(hours=hours)).isoformat(),
+            "notes": notes,
+        }
+
+    def test_bulk_create(self):
+        items = [self._item(i) for i in range(5)]
+        r = self.client.post(self.url, {"items": items}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Consultation.objects.count(), 5)
+        self.assertTrue(all(res["status"] == "created" for res in r.data["results"]))
+
+    def test_bulk_queries_do_not_grow_with_batch(self):
+        # Aquece o cache de autenticação para as duas medições serem iguais
+        self.client.get(reverse("consultation-list"))
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {"items": [self._item(0)]}, format="json")
+        items = [self._item(i) for i in range(1, 51)]
+        with CaptureQueriesContext(connection) as large:
+            r = self.client.post(self.url, {"items": items}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_bulk_reports_errors_per_item(self):
+        Consultation.objects.create(
+            professional=self.professional, datetime=self.base, notes="ocupado"
+        )
+        items = [
+            self._item(0),
+            self._item(1),
+            self._item(1),
+            self._item(2, professional=9999),
+            {"professional": self.professional.id, "datetime": "invalido"},
+        ]
+        r = self.client.post(self.url, {"items": items}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_207_MULTI_STATUS)
+        statuses = [res["status"] for res in r.data["results"]]
+        self.assertEqual(statuses, ["error", "created", "error", "error", "error"])
+        self.assertIn("Já existe uma consulta agendada", str(r.data["results"][0]))
+        self.assertIn("Profissional informado não existe", str(r.data["results"][3]))
+        self.assertEqual(Consultation.objects.count(), 2)
+
+    def test_bulk_upsert_is_idempotent(self):
+        items = [self._item(0, "a"), self._item(1, "b")]
+        self.client.post(self.url, {"items": items}, format="json")
+        items = [self._item(0, "a2"), self._item(2, "c")]
+        r = self.client.post(self.url, {"items": items, "upsert": True}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [res["status"] for res in r.data["results"]], ["updated", "created"]
+        )
+        self.assertEqual(Consultation.objects.count(), 3)
+        self.assertEqual(
+            Consultation.objects.get(id=r.data["results"][0]["id"]).notes, "a2"
+        )
+
+    def test_bulk_rejects_oversized_batch(self):
+        with self.settings(CONSULTATION_BULK_MAX_ITEMS=2):
+            items = [self._item(i) for i in range(3)]
+            r = self.client.post(self.url, {"items": items}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Consultation.objects.count(), 0)
+
+
+@override_settings(
+    AVAILABILITY_DAY_START="08:00",
+    AVAILABILITY_DAY_END="12:00",
+    CONSULTATION_DEFAULT_DURATION_MINUTES=30,
+)
+class ConsultationAvailabilityTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+        self.professional = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        self.url = reverse("consultation-availability")
+        self.day = (timezone.now() + timedelta(days=3)).date()
+        self.params = {
+            "professional": self.professional.id,
+            "start": self.day.isoformat(),
+            "end": self.day.isoformat(),
+            "slot_minutes": 60,
+        }
+
+    def _at(self, hour, minute=0):
+        return datetime.combine(self.day, time(hour, minute), tzinfo=dt_timezone.utc)
+
+    def _starts(self, response):
+        return [slot["start"].hour for slot in response.data["results"][0]["slots"]]
+
+    def test_busy_intervals_are_skipped(self):
+        Consultation.objects.create(
+            professional=self.professional, datetime=self._at(9, 15)
+        )
+        r = self.client.get(self.url, self.params)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        # 09:15-09:45 ocupa a grade das 9h; o próximo horário alinhado é 10h
+        self.assertEqual(self._starts(r), [8, 10, 11])
+
+    def test_results_are_cached_and_invalidated(self):
+        self.client.get(self.url, self.params)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url, self.params)
+        self.assertFalse(
+            any("consultations_consultation" in q["sql"] for q in ctx.captured_queries)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Consultation.objects.create(
+                professional=self.professional, datetime=self._at(8)
+            )
+        r = self.client.get(self.url, self.params)
+        self.assertEqual(self._starts(r), [9, 10, 11])
+
+    def test_rescheduling_frees_previous_day(self):
+        consultation = Consultation.objects.create(
+            professional=self.professional, datetime=self._at(8)
+        )
+        self.assertEqual(
+            self._starts(self.client.get(self.url, self.params)), [9, 10, 11]
+        )
+
+        consultation = Consultation.objects.get(id=consultation.id)
+        consultation.datetime = self._at(8) + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            consultation.save()
+        self.assertEqual(
+            self._starts(self.client.get(self.url, self.params)), [8, 9, 10, 11]
+        )
+
+    def test_by_profession(self):
+        other = Professional.objects.create(name_social="Bia", profession="Psicólogo")
+        params = dict(self.params, profession="Psicólogo")
+        del params["professional"]
+        r = self.client.get(self.url, params)
+        self.assertEqual(
+            [item["professional"] for item in r.data["results"]],
+            [self.professional.id, other.id],
+        )
+
+    def test_invalid_queries(self):
+        r = self.client.get(self.url, dict(self.params, profession="Psicólogo"))
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+        end = (self.day + timedelta(days=60)).isoformat()
+        r = self.client.get(self.url, dict(self.params, end=end))
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+        r = self.client.get(self.url, dict(self.params, professional=9999))
+        self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConsultationSearchTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.professional = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        self.list_url = reverse("consultation-list")
+        self.base = timezone.now() + timedelta(days=1)
+
+    def test_search_notes(self):
+        match = Consultation.objects.create(
+            professional=self.professional,
+            datetime=self.base,
+            notes="Paciente relatou ansiedade",
+        )
+        Consultation.objects.create(
+            professional=self.professional,
+            datetime=self.base + timedelta(hours=1),
+            notes="Retorno de rotina",
+        )
+        r = self.client.get(self.list_url, {"search": "ansied"})
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in r.data["results"]], [match.id])
+
+    def test_bulk_created_notes_are_indexed(self):
+        items = [
+            {
+                "professional": self.professional.id,
+                "datetime": self.base.isoformat(),
+                "notes": "Avaliação neuropsicológica",
+            }
+        ]
+        self.client.post(reverse("consultation-bulk"), {"items": items}, format="json")
+        r = self.client.get(self.list_url, {"search": "neuropsicologica"})
+        self.assertEqual(len(r.data["results"]), 1)
+
+    def test_filters_apply_before_paging(self):
+        # As consultas passadas entram primeiro no índice e ficariam com a
+        # primeira página se o filtro fosse aplicado depois do LIMIT
+        for i in range(4):
+            Consultation.objects.create(
+                professional=self.professional,
+                datetime=timezone.now() - timedelta(days=i + 1),
+                notes="Dor de cabeça",
+            )
+        upcoming = [
+            Consultation.objects.create(
+                professional=self.professional,
+                datetime=self.base + timedelta(hours=i),
+                notes="Dor nas costas",
+            ).id
+            for i in range(3)
+        ]
+        params = {"search": "dor", "when": "upcoming", "page_size": 2}
+        for url in (self.list_url, reverse("async-consultation-list")):
+            first = self.client.get(url, params).json()
+            second = self.client.get(first["next"]).json()
+            self.assertIsNone(second["next"])
+            ids = [item["id"] for item in first["results"] + second["results"]]
+            self.assertEqual(sorted(ids), upcoming)
+
+        r = self.client.get(self.list_url, {"search": "dor", "professional": 9999})
+        self.assertEqual(r.json()["results"], [])
+
+
+class ConsultationAsyncReadTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.professional = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        other = Professional.objects.create(name_social="Bia", profession="Médica")
+        base = timezone.now() + timedelta(days=1)
+        self.consultations = [
+            Consultation.objects.create(
+                professional=professional,
+                datetime=base + timedelta(hours=i),
+                notes=f"Consulta {i}",
+            )
+            for i, professional in enumerate([self.professional, other] * 3)
+        ]
+
+    async def _get(self, url, params=None):
+        r = await self.async_client.get(url, params or {}, headers=self.auth)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        return r.json()
+
+    async def _sync_get(self, url, params=None):
+        from asgiref.sync import sync_to_async
+
+        return (await sync_to_async(self.client.get)(url, params or {})).json()
+
+    async def test_list_pages_match_sync_endpoint(self):
+        body = await self._get(reverse("async-consultation-list"), {"page_size": 4})
+        sync = await self._sync_get(reverse("consultation-list"), {"page_size": 4})
+        self.assertEqual(body["results"], sync["results"])
+        self.assertIsNotNone(body["next"])
+
+        rest = await self._get(body["next"])
+        self.assertEqual(len(rest["results"]), 2)
+        self.assertIsNone(rest["next"])
+
+    async def test_by_professional(self):
+        url = reverse("async-consultation-by_professional", args=[self.professional.id])
+        body = await self._get(url)
+        self.assertEqual(len(body["results"]), 3)
+        self.assertTrue(
+            all(
+                item["professional"] == self.professional.id for item in body["results"]
+            )
+        )
+
+    async def test_detail_and_invalid_cursor(self):
+        obj = self.consultations[0]
+        body = await self._get(reverse("async-consultation-detail", args=[obj.id]))
+        self.assertEqual(body["notes"], obj.notes)
+
+        r = await self.async_client.get(
+            reverse("async-consultation-list"), {"cursor": "x"}, headers=self.auth
+        )
+        self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn("detail", r.json())
+
+
+class ConsultationProjectionTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.professional = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo", address="Rua A, 123"
+        )
+        start = timezone.now() + timedelta(days=1)
+        for i in range(3):
+            Consultation.objects.create(
+                professional=self.professional,
+                datetime=start + timedelta(hours=i),
+                notes="anotação longa " * 50,
+            )
+
+    def get_with_queries(self, url, params):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(url, params)
+        sql = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if "consultations_consultation" in q["sql"]
+        ]
+        return r, sql
+
+    def test_exclude_skips_notes_column(self):
+        r, sql = self.get_with_queries(
+            reverse("consultation-list"), {"exclude": "notes"}
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(r.data["results"][0]),
+            {"id", "datetime", "duration", "ends_at", "professional"},
+        )
+        self.assertNotIn('"notes"', sql[0])
+        # O profissional sai como id: nada de JOIN
+        self.assertNotIn("professionals_professional", sql[0])
+
+    def test_fields_keep_cursor_pagination_working(self):
+        url = reverse("consultation-list")
+        r, sql = self.get_with_queries(url, {"fields": "id", "page_size": 2})
+        self.assertEqual(
+            r.data["results"], [{"id": row["id"]} for row in r.data["results"]]
+        )
+        self.assertEqual(len(sql), 1)
+
+        r2 = self.client.get(r.data["next"])
+        self.assertEqual(len(r2.data["results"]), 1)
+        self.assertEqual(set(r2.data["results"][0]), {"id"})
+
+    def test_by_professional_and_detail(self):
+        r = self.client.get(
+            reverse("consultation-by_professional", args=[self.professional.id]),
+            {"fields": "datetime"},
+        )
+        self.assertEqual(set(r.data["results"][0]), {"datetime"})
+
+        obj = Consultation.objects.first()
+        r, sql = self.get_with_queries(
+            reverse("consultation-detail", args=[obj.id]), {"fields": "notes"}
+        )
+        self.assertEqual(r.data, {"notes": obj.notes})
+        self.assertNotIn('"datetime"', sql[0])
+
+    def test_unknown_fields_are_rejected(self):
+        r = self.client.get(
+            reverse("consultation-list"), {"fields": "id,secret", "exclude": "x"}
+        )
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", r.data)
+        self.assertIn("exclude", r.data)
+
+    def test_writes_return_full_object(self):
+        obj = Consultation.objects.first()
+        r = self.client.patch(
+            reverse("consultation-detail", args=[obj.id]) + "?fields=id",
+            {"notes": "nova"},
+            format="json",
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["notes"], "nova")
+        self.assertIn("datetime", r.data)
+
+    def test_async_list_matches_sync(self):
+        params = {"exclude": "notes", "page_size": 2}
+        sync = self.client.get(reverse("consultation-list"), params)
+        r = self.client.get(reverse("async-consultation-list"), params)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.json()["results"], sync.json()["results"])
+
+
+class ConsultationCalendarTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.auth = f"Bearer {refresh.access_token}"
+        self.client.credentials(HTTP_AUTHORIZATION=self.auth)
+        self.professional = Professional.objects.create(
+            name_social="Alex, Psicólogo", profession="Psicólogo"
+        )
+        self.start = datetime(2030, 1, 10, 14, 30, tzinfo=dt_timezone.utc)
+        self.consultation = Consultation.objects.create(
+            professional=self.professional,
+            datetime=self.start,
+            notes="Retorno; trazer exames\nSegunda linha " + "ç" * 80,
+        )
+        self.url = reverse(
+            "consultation-calendar",
+            kwargs={"professional_id": self.professional.id, "format": "ics"},
+        )
+
+    def feed(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_feed_lists_consultations(self):
+        r = self.client.get(self.url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r["Content-Type"], "text/calendar; charset=utf-8")
+        body = self.feed(r)
+        self.assertTrue(body.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertTrue(body.endswith("END:VCALENDAR\r\n"))
+        self.assertIn(f"UID:consultation-{self.consultation.id}@", body)
+        self.assertIn("DTSTART:20300110T143000Z\r\n", body)
+        self.assertIn("DTEND:20300110T150000Z\r\n", body)
+        self.assertIn("X-WR-CALNAME:Alex\\, Psicólogo\r\n", body)
+
+        lines = body.split("\r\n")
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        unfolded = body.replace("\r\n ", "")
+        self.assertIn(
+            "DESCRIPTION:Retorno\\; trazer exames\\nSegunda linha " + "ç" * 80,
+            unfolded,
+        )
+
+    def test_unchanged_feed_returns_304_without_reading_consultations(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_calendar_apps_subscribe_with_a_revocable_token(self):
+        token_url = reverse("consultation-calendar_token", args=[self.professional.id])
+        r = self.client.post(token_url)
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        token, url = r.data["token"], r.data["url"]
+        self.assertTrue(url.endswith(f"{self.url}?token={token}"))
+
+        # Sem cabeçalho Authorization, como um aplicativo de calendário
+        self.client.credentials()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        r = self.client.get(self.url, {"token": token})
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertIn(f"UID:consultation-{self.consultation.id}@", self.feed(r))
+        # Só o resumo do token fica no banco
+        self.assertEqual(
+            CalendarFeedToken.objects.get().token_hash, calendar.hash_token(token)
+        )
+
+        other = Professional.objects.create(name_social="Bia", profession="Médica")
+        other_url = reverse(
+            "consultation-calendar",
+            kwargs={"professional_id": other.id, "format": "ics"},
+        )
+        self.assertEqual(self.client.get(other_url, {"token": token}).status_code, 401)
+        self.assertEqual(self.client.get(self.url, {"token": "x"}).status_code, 401)
+
+        # Emitir outro revoga o anterior; DELETE encerra a assinatura
+        self.client.credentials(HTTP_AUTHORIZATION=self.auth)
+        new_token = self.client.post(token_url).data["token"]
+        self.assertEqual(self.client.delete(token_url).status_code, 204)
+        self.client.credentials()
+        for value in (token, new_token):
+            r = self.client.get(self.url, {"token": value})
+            self.assertEqual(r.status_code, 401)
+
+    def test_if_modified_since_does_not_hide_deletions(self):
+        other = Consultation.objects.create(
+            professional=self.professional, datetime=self.start + timedelta(days=1)
+        )
+        r = self.client.get(self.url)
+        self.assertNotIn("Last-Modified", r)
+
+        other.delete()
+        since = http_date(timezone.now().timestamp() + 60)
+        r = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.feed(r).count("BEGIN:VEVENT"), 1)
+
+    def test_etag_changes_on_update_and_delete(self):
+        other = Consultation.objects.create(
+            professional=self.professional, datetime=self.start + timedelta(days=1)
+        )
+        etag = self.client.get(self.url)["ETag"]
+
+        self.consultation.notes = "nova"
+        self.consultation.save()
+        r = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertIn("DESCRIPTION:nova", self.feed(r))
+
+        etag = r["ETag"]
+        other.delete()
+        r = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.feed(r).count("BEGIN:VEVENT"), 1)
+
+    def test_negotiates_text_calendar(self):
+        url = reverse("consultation-calendar", args=[self.professional.id])
+        r = self.client.get(url, HTTP_ACCEPT="text/calendar")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertIn("BEGIN:VEVENT", self.feed(r))
+
+    def test_unknown_professional(self):
+        r = self.client.get(reverse("consultation-calendar", args=[9999]))
+        self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+        for path in ("professional/abc/calendar.ics", "professional/abc/"):
+            r = self.client.get(f"/api/consultations/{path}")
+            self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        r = self.client.get(self.url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(TIME_ZONE="America/Sao_Paulo")
+class ConsultationStatsTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.url = reverse("consultation-stats")
+
+        self.psy = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        self.doc = Professional.objects.create(name_social="Bia", profession="Médica")
+        local = ZoneInfo("America/Sao_Paulo")
+        self.day = datetime(2030, 1, 10, tzinfo=local)
+        # Os resumos são recontados depois do commit
+        with self.captureOnCommitCallbacks(execute=True):
+            for professional, hours in (
+                (self.psy, 10),
+                (self.psy, 11),
+                (self.psy, 24 + 10),
+                (self.doc, 12),
+            ):
+                Consultation.objects.create(
+                    professional=professional,
+                    datetime=self.day + timedelta(hours=hours),
+                )
+            # 23h30 de 10/01 em São Paulo já é 11/01 em UTC
+            Consultation.objects.create(
+                professional=self.psy,
+                datetime=self.day + timedelta(hours=23, minutes=30),
+                notes="limite do dia",
+            )
+
+    def stats(self, **params):
+        params = {"start": "2030-01-10", "end": "2030-01-11", **params}
+        return self.client.get(self.url, params)
+
+    def test_group_by_day_uses_local_days(self):
+        r = self.stats()
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["total"], 5)
+        self.assertEqual(
+            [(str(row["day"]), row["consultations"]) for row in r.data["results"]],
+            [("2030-01-10", 4), ("2030-01-11", 1)],
+        )
+
+    def test_group_by_professional_and_profession(self):
+        r = self.stats(group_by="professional")
+        self.assertEqual(
+            r.data["results"],
+            [
+                {
+                    "professional": self.psy.id,
+                    "name_social": "Alex",
+                    "consultations": 4,
+                },
+                {"professional": self.doc.id, "name_social": "Bia", "consultations": 1},
+            ],
+        )
+        r = self.stats(group_by="profession", profession="Médica")
+        self.assertEqual(
+            r.data["results"], [{"profession": "Médica", "consultations": 1}]
+        )
+
+    def test_rollups_follow_updates_deletes_and_bulk(self):
+        consultation = Consultation.objects.get(notes="limite do dia")
+        consultation.datetime += timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            consultation.save()
+        days = {
+            str(row["day"]): row["consultations"]
+            for row in self.stats().data["results"]
+        }
+        self.assertEqual(days, {"2030-01-10": 3, "2030-01-11": 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Consultation.objects.filter(professional=self.doc).get().delete()
+        self.assertEqual(self.stats().data["total"], 4)
+
+        items = [
+            {
+                "professional": self.doc.id,
+                "datetime": (self.day + timedelta(hours=hours)).isoformat(),
+            }
+            for hours in (8, 9)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("consultation-bulk"), {"items": items}, format="json"
+            )
+        self.assertEqual(self.stats(professional=self.doc.id).data["total"], 2)
+
+    def test_recount_after_commit_sees_concurrent_writes(self):
+        from .models import ConsultationDailyStat
+
+        day = self.day + timedelta(days=5)
+        with self.captureOnCommitCallbacks() as first:
+            Consultation.objects.create(professional=self.doc, datetime=day)
+        # Outra transação grava no mesmo dia antes da recontagem da primeira
+        with self.captureOnCommitCallbacks():
+            Consultation.objects.create(
+                professional=self.doc, datetime=day + timedelta(hours=1)
+            )
+        stats = ConsultationDailyStat.objects.filter(
+            professional=self.doc, day=day.date()
+        )
+        self.assertFalse(stats.exists())
+
+        for callback in first:
+            callback()
+        self.assertEqual(stats.get().count, 2)
+
+    def test_report_reads_only_the_rollup_table(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.stats(group_by="profession")
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertIn("consultations_consultationdailystat", sql)
+        self.assertNotIn('"consultations_consultation"', sql)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        from .models import ConsultationDailyStat
+        from .stats import rebuild_daily_stats
+
+        before = set(
+            ConsultationDailyStat.objects.values_list("professional", "day", "count")
+        )
+        ConsultationDailyStat.objects.all().delete()
+        rebuild_daily_stats()
+        after = set(
+            ConsultationDailyStat.objects.values_list("professional", "day", "count")
+        )
+        self.assertEqual(before, after)
+
+    def test_invalid_range(self):
+        r = self.stats(start="2030-01-11", end="2030-01-10")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        r = self.stats(group_by="hour")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConsultationFilterTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.url = reverse("consultation-list")
+
+        self.psy = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        self.doc = Professional.objects.create(name_social="Bia", profession="Médica")
+        self.other = Professional.objects.create(
+            name_social="Caio", profession="Médica"
+        )
+        now = timezone.now()
+        self.past = Consultation.objects.create(
+            professional=self.psy, datetime=now - timedelta(days=2)
+        )
+        self.soon = Consultation.objects.create(
+            professional=self.doc, datetime=now + timedelta(days=1)
+        )
+        self.later = Consultation.objects.create(
+            professional=self.other, datetime=now + timedelta(days=10)
+        )
+
+    def ids(self, params, url=None):
+        r = self.client.get(url or self.url, params)
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        return [row["id"] for row in r.data["results"]]
+
+    def test_date_range_and_when(self):
+        self.assertEqual(self.ids({"when": "upcoming"}), [self.soon.id, self.later.id])
+        self.assertEqual(self.ids({"when": "past"}), [self.past.id])
+        params = {
+            "datetime__gte": (timezone.now() + timedelta(hours=1)).isoformat(),
+            "datetime__lt": (timezone.now() + timedelta(days=5)).isoformat(),
+        }
+        self.assertEqual(self.ids(params), [self.soon.id])
+
+    def test_professional_list_and_profession(self):
+        self.assertEqual(
+            self.ids({"professional": f"{self.psy.id},{self.other.id}"}),
+            [self.past.id, self.later.id],
+        )
+        self.assertEqual(
+            self.ids({"profession": "Médica", "when": "upcoming"}),
+            [self.soon.id, self.later.id],
+        )
+
+    def test_filters_apply_to_by_professional_and_async_list(self):
+        url = reverse("consultation-by_professional", args=[self.doc.id])
+        self.assertEqual(self.ids({"when": "past"}, url), [])
+        self.assertEqual(self.ids({"when": "upcoming"}, url), [self.soon.id])
+        r = self.client.get(
+            reverse("async-consultation-list"), {"profession": "Médica"}
+        )
+        self.assertEqual(
+            [row["id"] for row in r.json()["results"]], [self.soon.id, self.later.id]
+        )
+
+    def test_unsupported_filters_are_rejected(self):
+        url = reverse("consultation-by_professional", args=[self.doc.id])
+        for params in (
+            {"status": "agendada"},
+            {"notes": "x"},
+            {"datetime__year": 2030},
+        ):
+            r = self.client.get(url, params)
+            self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn(next(iter(params)), r.data)
+
+    def test_filters_do_not_apply_to_detail_routes(self):
+        url = reverse("consultation-detail", args=[self.soon.id])
+        for params in ({"when": "past"}, {"status": "agendada"}, {"when": "today"}):
+            r = self.client.get(url, params)
+            self.assertEqual(r.status_code, status.HTTP_200_OK, params)
+            self.assertEqual(r.data["id"], self.soon.id)
+        r = self.client.patch(f"{url}?when=past", {"notes": "remarcada"}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        r = self.client.delete(f"{url}?profession=Psicólogo")
+        self.assertEqual(r.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_invalid_values(self):
+        for params in (
+            {"professional": "1,abc"},
+            {"when": "today"},
+            {"datetime__gte": "2030-01-02T00:00Z", "datetime__lt": "2030-01-01T00:00Z"},
+        ):
+            r = self.client.get(self.url, params)
+            self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    @override_settings(CONSULTATION_FILTER_MAX_PROFESSIONALS=2)
+    def test_professional_list_is_capped(self):
+        r = self.client.get(self.url, {"professional": "1,2,3"})
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_are_served_by_indexes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Plano de execução conferido no SQLite.")
+        from .filters import filter_consultations
+        from django.http import QueryDict
+
+        queryset = Consultation.objects.order_by("datetime", "id")
+        for query in (
+            "",
+            "when=upcoming",
+            "datetime__gte=2030-01-01T00:00Z&datetime__lt=2030-02-01T00:00Z",
+            f"professional={self.psy.id},{self.doc.id}",
+            "profession=Médica&when=past",
+        ):
+            plan = filter_consultations(queryset, QueryDict(query))[:51].explain()
+            for table in ("consultations_consultation", "professionals_professional"):
+                # "SCAN <tabela>" sem índice é leitura da tabela inteira
+                self.assertNotRegex(plan, rf"SCAN {table}\s*$", query)
+                self.assertNotRegex(plan, rf"SCAN {table}\n", query)
+
+
+class ConsultationArchiveTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+        self.psy = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        self.url = reverse("consultation-by_professional", args=[self.psy.id])
+        now = timezone.now()
+        self.old = [
+            Consultation.objects.create(
+                professional=self.psy,
+                datetime=now - timedelta(days=400 + i),
+                notes=f"histórico {i}",
+            )
+            for i in range(3)
+        ]
+        self.recent = Consultation.objects.create(
+            professional=self.psy, datetime=now - timedelta(days=10)
+        )
+        self.upcoming = Consultation.objects.create(
+            professional=self.psy, datetime=now + timedelta(days=1)
+        )
+
+    def archive(self, **options):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("archive_consultations", stdout=out, **options)
+        return out.getvalue()
+
+    def test_moves_old_consultations_in_batches(self):
+        from changes.models import Change
+        from .models import ArchivedConsultation, ConsultationDailyStat
+
+        stats = list(ConsultationDailyStat.objects.values_list("day", "count"))
+        out = self.archive(batch_size=2)
+
+        self.assertIn("3 consultas", out)
+        self.assertEqual(
+            set(Consultation.objects.values_list("id", flat=True)),
+            {self.recent.id, self.upcoming.id},
+        )
+        archived = ArchivedConsultation.objects.order_by("datetime")
+        self.assertEqual(
+            [(a.id, a.notes) for a in archived],
+            [(c.id, c.notes) for c in reversed(self.old)],
+        )
+        # Os resumos diários contam as consultas arquivadas
+        self.assertEqual(
+            list(ConsultationDailyStat.objects.values_list("day", "count")), stats
+        )
+        self.assertEqual(
+            Change.objects.filter(
+                resource="consultation",
+                deleted=True,
+                object_id__in=[c.id for c in self.old],
+            ).count(),
+            3,
+        )
+        r = self.client.get(reverse("consultation-list"), {"search": "histórico"})
+        self.assertEqual(r.data["results"], [])
+
+    def test_dry_run_and_day_aligned_cutoff(self):
+        from .archive import archive_cutoff
+        from .stats import stat_day
+
+        out = self.archive(dry_run=True, days=5)
+        self.assertIn("4 consultas", out)
+        self.assertEqual(Consultation.objects.count(), 5)
+
+        cutoff = archive_cutoff(5)
+        self.assertEqual(
+            cutoff.astimezone(timezone.get_default_timezone()).time(), time.min
+        )
+        self.assertEqual(stat_day(cutoff), stat_day(timezone.now() - timedelta(days=5)))
+
+    def test_archived_history_is_explicit(self):
+        self.archive()
+
+        r = self.client.get(self.url)
+        self.assertEqual(
+            [item["id"] for item in r.data["results"]],
+            [self.recent.id, self.upcoming.id],
+        )
+
+        r = self.client.get(self.url, {"archived": "true"})
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["id"] for item in r.data["results"]],
+            [c.id for c in reversed(self.old)],
+        )
+        self.assertEqual(
+            set(r.data["results"][0]),
+            {"id", "datetime", "notes", "duration", "professional", "archived_at"},
+        )
+
+        since = (timezone.now() - timedelta(days=401, hours=12)).isoformat()
+        r = self.client.get(
+            self.url, {"archived": "true", "datetime__gte": since, "page_size": 1}
+        )
+        self.assertEqual([item["id"] for item in r.data["results"]], [self.old[1].id])
+        r = self.client.get(r.data["next"])
+        self.assertEqual([item["id"] for item in r.data["results"]], [self.old[0].id])
+
+        r = self.client.get(self.url, {"archived": "talvez"})
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+        r = self.client.get(
+            reverse("async-consultation-by_professional", args=[self.psy.id]),
+            {"archived": "true", "fields": "id"},
+        )
+        self.assertEqual(len(r.json()["results"]), 3)
+
+    def test_rebuild_stats_counts_archived_consultations(self):
+        from .models import ConsultationDailyStat
+        from .stats import rebuild_daily_stats
+
+        self.archive()
+        rebuild_daily_stats()
+        self.assertEqual(
+            sum(ConsultationDailyStat.objects.values_list("count", flat=True)), 5
+        )
+
+
+@override_settings(
+    AVAILABILITY_DAY_START="08:00",
+    AVAILABILITY_DAY_END="12:00",
+    CONSULTATION_DEFAULT_DURATION_MINUTES=30,
+    CONSULTATION_MAX_DURATION_MINUTES=480,
+)
+class ConsultationOverlapTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+        self.psy = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        self.other = Professional.objects.create(
+            name_social="Bia", profession="Psicólogo"
+        )
+        self.list_url = reverse("consultation-list")
+        self.day = (timezone.now() + timedelta(days=3)).date()
+
+    def _at(self, hour, minute=0):
+        return datetime.combine(self.day, time(hour, minute), tzinfo=dt_timezone.utc)
+
+    def post(self, hour, minute=0, professional=None, **extra):
+        payload = {
+            "professional": (professional or self.psy).id,
+            "datetime": self._at(hour, minute).isoformat(),
+            **extra,
+        }
+        return self.client.post(self.list_url, payload, format="json")
+
+    def test_overlapping_bookings_are_rejected(self):
+        r = self.post(10)
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(r.data["duration"], 30)
+        self.assertEqual(r.data["ends_at"], "%sT10:30:00Z" % self.day.isoformat())
+
+        r = self.post(10, 15)
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Já existe uma consulta agendada", str(r.data))
+        r = self.post(9, 0, duration=90)
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Intervalos encostados não se sobrepõem; outro profissional é livre
+        self.assertEqual(self.post(10, 30).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.post(9, 30, duration=30).status_code, status.HTTP_201_CREATED
+        )
+        self.assertEqual(
+            self.post(10, 15, professional=self.other).status_code,
+            status.HTTP_201_CREATED,
+        )
+
+    def test_duration_limits(self):
+        for duration in (0, 481):
+            r = self.post(10, duration=duration)
+            self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST, duration)
+            self.assertIn("duration", r.data)
+
+    def test_updates_check_the_new_interval(self):
+        first = Consultation.objects.create(professional=self.psy, datetime=self._at(9))
+        Consultation.objects.create(professional=self.psy, datetime=self._at(10))
+        url = reverse("consultation-detail", args=[first.id])
+
+        r = self.client.patch(url, {"duration": 90}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        r = self.client.patch(url, {"duration": 60}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        self.assertEqual(first.ends_at, self._at(10))
+
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.patch(url, {"notes": "só notas"}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        # Só notas: nenhuma busca por sobreposição
+        self.assertFalse(any('"ends_at" >' in q["sql"] for q in ctx.captured_queries))
+
+    def test_bulk_checks_overlaps_against_database_and_batch(self):
+        Consultation.objects.create(professional=self.psy, datetime=self._at(10))
+        items = [
+            {"professional": self.psy.id, "datetime": self._at(h, m).isoformat(), **x}
+            for h, m, x in (
+                (10, 15, {}),
+                (8, 0, {"duration": 60}),
+                (8, 30, {}),
+                (9, 0, {"duration": 60}),
+                (11, 0, {}),
+            )
+        ]
+        r = self.client.post(
+            reverse("consultation-bulk"), {"items": items}, format="json"
+        )
+        self.assertEqual(
+            [res["status"] for res in r.data["results"]],
+            ["error", "created", "error", "created", "created"],
+        )
+
+        # Upsert do mesmo horário pode mudar a duração, sem invadir o vizinho
+        items = [
+            {"professional": self.psy.id, "datetime": self._at(8).isoformat(), **x}
+            for x in ({"duration": 90},)
+        ]
+        r = self.client.post(
+            reverse("consultation-bulk"),
+            {"items": items, "upsert": True},
+            format="json",
+        )
+        self.assertEqual(r.data["results"][0]["status"], "error")
+        items[0]["duration"] = 45
+        r = self.client.post(
+            reverse("consultation-bulk"),
+            {"items": items, "upsert": True},
+            format="json",
+        )
+        self.assertEqual(r.data["results"][0]["status"], "updated")
+        self.assertEqual(
+            Consultation.objects.get(datetime=self._at(8)).ends_at, self._at(8, 45)
+        )
+
+    def test_availability_uses_each_duration(self):
+        Consultation.objects.create(
+            professional=self.psy, datetime=self._at(9), duration=90
+        )
+        r = self.client.get(
+            reverse("consultation-availability"),
+            {
+                "professional": self.psy.id,
+                "start": self.day.isoformat(),
+                "end": self.day.isoformat(),
+                "slot_minutes": 60,
+            },
+        )
+        starts = [slot["start"].hour for slot in r.data["results"][0]["slots"]]
+        self.assertEqual(starts, [8, 11])
+
+    def test_overlap_check_is_served_by_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Plano de execução conferido no SQLite.")
+        plan = (
+            Consultation.objects.overlapping(
+                [(self.psy.id, self._at(10), self._at(10, 30))]
+            )
+            .only("id")
+            .explain()
+        )
+        self.assertIn("USING INDEX", plan)
+        self.assertNotRegex(plan, r"SCAN consultations_consultation\s*$")
+
+    def test_migration_backfill_avoids_overlaps(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        migration = import_module("consultations.migrations.0008_duration")
+        first = Consultation.objects.create(professional=self.psy, datetime=self._at(9))
+        second = Consultation.objects.create(
+            professional=self.psy, datetime=self._at(9, 20)
+        )
+        other = Consultation.objects.create(
+            professional=self.other, datetime=self._at(9, 10)
+        )
+        Consultation.objects.update(duration=0, ends_at=self._at(0))
+
+        migration.fill_ends_at(apps, None)
+        durations = dict(Consultation.objects.values_list("id", "duration"))
+        self.assertEqual(
+            [durations[c.id] for c in (first, second, other)], [20, 30, 30]
+        )
+        first.refresh_from_db()
+        self.assertEqual(first.ends_at, self._at(9, 20))
@@ -1,9 +1,41 @@
-from rest_framework import viewsets, filters
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from .models import Consultation
-from .serializers import ConsultationSerializer
-from drf_spectacular.utils import extend_schema, OpenApiExample
+from core.db_routers import ReplicaReadMixin
+from core.projection import PROJECTION_PARAMETERS, SparseFieldsetMixin
+from core.search import FullTextSearchMixin, SEARCH_PARAMETERS
+from core.values import ValuesListMixin
+from professionals.models import Professional
+from . import calendar
+from .archive import ARCHIVED_PARAMETER, wants_archive
+from .availability import get_availability
+from .filters import FILTER_PARAMETERS, ConsultationFilterBackend
+from .stats import get_stats
+from .models import ArchivedConsultation, Consultation
+from .serializers import (
+    ArchivedConsultationSerializer,
+    AvailabilityQuerySerializer,
+    ConsultationSerializer,
+    ConsultationBulkSerializer,
+    StatsQuerySerializer,
+)
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    OpenApiExample,
+    OpenApiParameter,
+    OpenApiResponse,
+    OpenApiTypes,
+)
+from core.pagination import KeysetPagination
 
 
 @extend_schema(
@@ -20,26 +52,76 @@ from drf_spectacular.utils import extend_schema, OpenApiExample
         )
     ],
 )
-class ConsultationViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(
+        parameters=SEARCH_PARAMETERS + FILTER_PARAMETERS + PROJECTION_PARAMETERS
+    ),
+    retrieve=extend_schema(parameters=PROJECTION_PARAMETERS),
+    by_professional=extend_schema(
+        parameters=FILTER_PARAMETERS + [ARCHIVED_PARAMETER] + PROJECTION_PARAMETERS
+    ),
+)
+class ConsultationViewSet(
+    ReplicaReadMixin,
+    SparseFieldsetMixin,
+    FullTextSearchMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet para gerenciar consultas.
     Endpoints:
     - GET /api/consultas/ - Lista todas as consultas
+    - GET /api/consultas/?search=termo - Busca nas anotações
+    - GET /api/consultas/?exclude=notes - Omite campos (ou ?fields=id,datetime)
+    - GET /api/consultas/?when=upcoming&profession=... - Filtros indexados
     - POST /api/consultas/ - Cria nova consulta
     - GET /api/consultas/{id}/ - Detalhe de uma consulta
     - PUT /api/consultas/{id}/ - Atualiza consulta
     - PATCH /api/consultas/{id}/ - Atualiza parcialmente
     - DELETE /api/consultas/{id}/ - Remove consulta
+    - GET /api/consultas/professional/{id}/?archived=true - Histórico arquivado
+    - GET /api/consultas/professional/{id}/calendar.ics - Agenda em iCalendar
+    - GET /api/consultas/stats/?start=...&end=...&group_by=day - Totais por período
+
+    As listagens são paginadas por cursor ordenado por (datetime, id).
     """
 
     queryset = Consultation.objects.select_related("professional").all()
     serializer_class = ConsultationSerializer
-    filter_backends = [filters.SearchFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [ConsultationFilterBackend]
+    # Permissões só exigem autenticação: usuário montado a partir do token
+    token_user = True
+
+    def reads_archive(self):
+        """``by_professional`` com ``?archived=true`` lê o histórico arquivado."""
+        if not hasattr(self, "_reads_archive"):
+            self._reads_archive = self.action == "by_professional" and wants_archive(
+                self.request.query_params
+            )
+        return self._reads_archive
+
+    def get_queryset(self):
+        if self.reads_archive():
+            self.queryset = ArchivedConsultation.objects.select_related("professional")
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.reads_archive():
+            return ArchivedConsultationSerializer
+        return super().get_serializer_class()
+
+    def professional_queryset(self, professional_id):
+        """Consultas (ou o histórico arquivado) do profissional, já filtradas."""
+        return self.filter_queryset(
+            self.get_queryset().filter(professional_id=professional_id)
+        )
 
     @action(
         detail=False,
         methods=["get"],
-        url_path="professional/(?P<professional_id>[^/.]+)",
+        url_path=r"professional/(?P<professional_id>\d+)",
         url_name="by_professional",
     )
     def by_professional(self, request, professional_id=None):
@@ -47,11 +129,11 @@ class ConsultationViewSet(viewsets.ModelViewSet):
         Search consultations by professional ID.
         Endpoint: GET /api/consultations/professional/{professional_id}/
         """
-        queryset = self.get_queryset().filter(professional_id=professional_id)
+        queryset = self.professional_queryset(professional_id)
 
-        status_filter = request.query_params.get("status", None)
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
+        response = self.values_response(queryset)
+        if response is not None:
+            return response
 
         page = self.paginate_queryset(queryset)
 
@@ -61,3 +143,220 @@ class ConsultationViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+
+    @extend_schema(
+        summary="Agenda de um profissional em iCalendar",
+        description=(
+            "Feed `.ics` com as consultas do profissional, para assinatura em "
+            "aplicativos de calendário. Aceita o JWT ou, para os aplicativos, "
+            "`?token=` com o token emitido em `calendar-token/`. Responde com "
+            "`ETag`; com `If-None-Match` em dia, devolve 304."
+        ),
+        parameters=[
+            OpenApiParameter(
+                calendar.TOKEN_PARAM,
+                OpenApiTypes.STR,
+                description="Token de assinatura do feed (dispensa o JWT).",
+            )
+        ],
+        responses={
+            200: OpenApiResponse(OpenApiTypes.STR, description="text/calendar"),
+            304: OpenApiResponse(description="Feed sem alterações."),
+        },
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"professional/(?P<professional_id>\d+)/calendar",
+        url_name="calendar",
+        renderer_classes=[calendar.ICalendarRenderer],
+        permission_classes=[calendar.CalendarFeedPermission],
+    )
+    def calendar_feed(self, request, professional_id=None, format=None):
+        """
+        Stream a professional's consultations as an iCalendar feed.
+        Endpoint: GET /api/consultations/professional/{professional_id}/calendar.ics
+        """
+        state = calendar.feed_state(professional_id)
+        if state is None:
+            raise NotFound("Profissional não encontrado.")
+        professional, count, last_modified = state
+
+        etag = calendar.feed_etag(professional, count, last_modified)
+        # Sem Last-Modified: ele não muda quando uma consulta sai do feed
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = StreamingHttpResponse(
+                calendar.calendar_lines(professional),
+                content_type=calendar.CONTENT_TYPE,
+            )
+            response["Content-Disposition"] = (
+                f'inline; filename="professional-{professional["id"]}.ics"'
+            )
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @extend_schema(
+        summary="Token de assinatura da agenda de um profissional",
+        description=(
+            "`POST` emite um token de longa duração para o feed `.ics` (e "
+            "revoga o anterior) e devolve a URL de assinatura; `DELETE` revoga "
+            "o token atual."
+        ),
+        request=None,
+        responses={
+            201: OpenApiTypes.OBJECT,
+            204: OpenApiResponse(description="Token revogado."),
+        },
+    )
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path=r"professional/(?P<professional_id>\d+)/calendar-token",
+        url_name="calendar_token",
+    )
+    def calendar_token(self, request, professional_id=None):
+        """
+        Issue or revoke the subscription token of a professional's calendar feed.
+        Endpoint: POST|DELETE /api/consultations/professional/{id}/calendar-token/
+        """
+        if not Professional.objects.filter(pk=professional_id).exists():
+            raise NotFound("Profissional não encontrado.")
+        if request.method == "DELETE":
+            calendar.revoke_feed_token(professional_id)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        token = calendar.issue_feed_token(professional_id)
+        path = reverse(
+            "consultation-calendar",
+            kwargs={"professional_id": professional_id, "format": "ics"},
+        )
+        url = request.build_absolute_uri(path)
+        return Response(
+            {
+                "token": token,
+                "url": f"{url}?{urlencode({calendar.TOKEN_PARAM: token})}",
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(
+        summary="Cria ou atualiza consultas em lote",
+        description=(
+            "Recebe até CONSULTATION_BULK_MAX_ITEMS consultas e devolve um resultado "
+            "por item. Com `upsert`, horários já ocupados pelo mesmo profissional "
+            "têm as notas atualizadas em vez de gerar erro."
+        ),
+        request=ConsultationBulkSerializer,
+        examples=[
+            OpenApiExample(
+                "Exemplo de lote",
+                value={
+                    "upsert": False,
+                    "items": [
+                        {"professional": 1, "datetime": "2024-07-15T14:30:00Z"},
+                        {
+                            "professional": 1,
+                            "datetime": "2024-07-15T15:30:00Z",
+                            "notes": "Retorno",
+                        },
+                    ],
+                },
+            )
+        ],
+    )
+    @action(detail=False, methods=["post"], url_path="bulk", url_name="bulk")
+    def bulk(self, request):
+        """
+        Create consultations in batch.
+        Endpoint: POST /api/consultations/bulk/
+        """
+        serializer = ConsultationBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        failed = sum(1 for result in results if result["status"] == "error")
+        if not failed:
+            code = status.HTTP_201_CREATED
+        elif failed == len(results):
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_207_MULTI_STATUS
+        return Response({"results": results}, status=code)
+
+    @extend_schema(
+        summary="Horários livres de um profissional ou de uma profissão",
+        description=(
+            "Calcula no servidor os horários livres entre `start` e `end` "
+            "(inclusive), dentro do expediente configurado, em intervalos de "
+            "`slot_minutes`. Informe `professional` ou `profession`."
+        ),
+        parameters=[AvailabilityQuerySerializer],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(
+        detail=False, methods=["get"], url_path="availability", url_name="availability"
+    )
+    def availability(self, request):
+        """
+        Free slots per professional and day.
+        Endpoint: GET /api/consultations/availability/?professional=1&start=...&end=...
+        """
+        query = AvailabilityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        professionals = Professional.objects.order_by("id")
+        if "professional" in params:
+            professionals = professionals.filter(id=params["professional"])
+        else:
+            professionals = professionals.filter(profession=params["profession"])
+        limit = getattr(settings, "AVAILABILITY_MAX_PROFESSIONALS", 50)
+        professional_ids = list(professionals.values_list("id", flat=True)[:limit])
+        if "professional" in params and not professional_ids:
+            raise NotFound("Profissional não encontrado.")
+
+        results = get_availability(
+            professional_ids,
+            params["start"],
+            params["end"],
+            timedelta(minutes=params["slot_minutes"]),
+        )
+        return Response({"slot_minutes": params["slot_minutes"], "results": results})
+
+    @extend_schema(
+        summary="Totais de consultas por dia, profissional ou profissão",
+        description=(
+            "Soma as consultas entre `start` e `end` (inclusive) a partir dos "
+            "resumos diários, agrupadas por `group_by`. Filtros opcionais: "
+            "`profession` e `professional`. Os dias seguem o fuso `TIME_ZONE`."
+        ),
+        parameters=[StatsQuerySerializer],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=["get"], url_path="stats", url_name="stats")
+    def stats(self, request):
+        """
+        Consultation counts aggregated from the daily rollup table.
+        Endpoint: GET /api/consultations/stats/?start=...&end=...&group_by=profession
+        """
+        query = StatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        stats = get_stats(
+            params["start"],
+            params["end"],
+            params["group_by"],
+            profession=params.get("profession"),
+            professional=params.get("professional"),
+        )
+        return Response(
+            {
+                "start": params["start"],
+                "end": params["end"],
+                "group_by": params["group_by"],
+                **stats,
+            }
+        )
@@ -0,0 +1,333 @@
+"""
+Registro de requisições da API fora do caminho da requisição.
+
+O middleware só monta um dicionário com os dados da chamada e o coloca em
+uma fila em memória com tamanho limitado. Uma thread em segundo plano esvazia
+a fila e grava em lote (``bulk_create``) quando junta ``API_LOG_BATCH_SIZE``
+entradas ou a cada ``API_LOG_FLUSH_INTERVAL`` segundos. Se a fila estiver
+cheia a entrada é descartada e contada — a requisição nunca espera pelo log.
+Com ``API_LOG_WRITER_THREAD=False`` (padrão nos testes) a thread não sobe: as
+entradas ficam na fila até que alguém as leia com ``drain``.
+
+As linhas continuam indo para a tabela ``drf_api_logs`` do drf_api_logger,
+então o admin existente segue funcionando.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max, Min
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SENSITIVE_KEYS = {"password", "token", "access", "refresh", "secret", "authorization"}
+MASK = "***FILTERED***"
+JSON_CONTENT_TYPES = ("application/json",)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def to_log_text(raw):
+    """Converte um corpo JSON bruto em texto com os campos sensíveis mascarados."""
+    if not raw:
+        return ""
+    try:
+        return json.dumps(mask_sensitive(json.loads(raw)), ensure_ascii=False)
+    except ValueError:
+        return ""
+
+
+def mask_query(url):
+    """Mascara os parâmetros sensíveis da query string (ex.: ``?token=``)."""
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    query = [
+        (key, MASK if key.lower() in SENSITIVE_KEYS else value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query, safe="*")))
+
+
+def mask_sensitive(data):
+    if isinstance(data, dict):
+        return {
+            key: MASK if str(key).lower() in SENSITIVE_KEYS else mask_sensitive(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [mask_sensitive(item) for item in data]
+    return data
+
+
+class APILogWriter:
+    """Fila limitada + thread de gravação em lote, uma por processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stop = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        # Após um fork (gunicorn com preload) a thread do processo pai não
+        # existe no filho: cada processo cria a sua fila e a sua thread.
+        if self._pid == os.getpid() and self._queue is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._queue is not None:
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=_setting("API_LOG_QUEUE_SIZE", 10000))
+            self._stop = threading.Event()
+            if not _setting("API_LOG_WRITER_THREAD", True):
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="api-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def enqueue(self, entry):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _run(self):
+        batch_size = _setting("API_LOG_BATCH_SIZE", 200)
+        interval = _setting("API_LOG_FLUSH_INTERVAL", 2.0)
+        while not self._stop.is_set():
+            batch = []
+            deadline = time.monotonic() + interval
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                self.write(batch)
+        close_old_connections()
+
+    def drain(self):
+        """Retira da fila tudo o que estiver pendente."""
+        batch = []
+        if self._queue is None:
+            return batch
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def write(self, entries):
+        from drf_api_logger.models import APILogsModel
+
+        try:
+            close_old_connections()
+            APILogsModel.objects.bulk_create(
+                [self.to_model(APILogsModel, entry) for entry in entries],
+                batch_size=_setting("API_LOG_BATCH_SIZE", 200),
+            )
+        except Exception:
+            self.failed += len(entries)
+            logger.warning(
+                "Falha ao gravar %d registros de API", len(entries), exc_info=True
+            )
+        else:
+            self.written += len(entries)
+
+    def to_model(self, model, entry):
+        # A serialização dos corpos acontece aqui, na thread de gravação
+        fields = dict(entry)
+        fields["headers"] = json.dumps(fields["headers"])
+        fields["body"] = to_log_text(fields["body"])
+        fields["response"] = to_log_text(fields["response"])
+        return model(**fields)
+
+    def shutdown(self, timeout=5.0):
+        """Para a thread e grava o que restou na fila (chamado no fim do worker)."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        remaining = self.drain()
+        if remaining:
+            self.write(remaining)
+
+    def stats(self):
+        return {
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+writer = APILogWriter()
+atexit.register(writer.shutdown)
+
+
+def prune_logs(before, batch_size=None):
+    """
+    Apaga os registros anteriores a ``before``; devolve quantos apagou.
+
+    ``added_on`` é o instante da requisição, mas cada worker grava os seus
+    lotes depois: os ids não seguem ``added_on`` à risca e registros de
+    workers diferentes se intercalam. A tabela do drf_api_logger também não
+    tem índice em ``added_on``. Por isso o intervalo de ids a limpar vem de uma
+    única agregação, e cada DELETE cobre uma faixa de ``batch_size`` ids pela
+    chave primária, apagando só o que está fora da retenção.
+    """
+    from drf_api_logger.models import APILogsModel
+
+    batch_size = batch_size or _setting("API_LOG_PRUNE_BATCH_SIZE", 5000)
+    expired = APILogsModel.objects.filter(added_on__lt=before)
+    bounds = expired.aggregate(low=Min("id"), high=Max("id"))
+    if bounds["high"] is None:
+        return 0
+    deleted = 0
+    for low in range(bounds["low"], bounds["high"] + 1, batch_size):
+        count, _ = expired.filter(id__gte=low, id__lt=low + batch_size).delete()
+        deleted += count
+    return deleted
+
+
+def get_sample_rate(path, method):
+    """
+    Taxa de amostragem para a rota: a primeira regra de ``API_LOG_SAMPLING``
+    cujo prefixo e método casarem vence; sem regra, ``API_LOG_SAMPLE_RATE``.
+    """
+    for rule in _setting("API_LOG_SAMPLING", []):
+        if not path.startswith(rule.get("path", "/")):
+            continue
+        if rule.get("method", "*") not in ("*", method):
+            continue
+        return rule.get("rate", 1.0)
+    return _setting("API_LOG_SAMPLE_RATE", 1.0)
+
+
+class APILoggingMiddleware:
+    """Enfileira um registro por requisição amostrada; nunca grava no banco."""
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.should_log(request):
+            return self.get_response(request)
+
+        sampled = random.random() < get_sample_rate(request.path, request.method)
+        body = self.capture_request_body(request) if sampled else ""
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, body, sampled, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        # Sob ASGI o corpo já foi lido pelo handler; nada aqui bloqueia
+        if not self.should_log(request):
+            return await self.get_response(request)
+
+        sampled = random.random() < get_sample_rate(request.path, request.method)
+        body = self.capture_request_body(request) if sampled else ""
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, body, sampled, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, body, sampled, elapsed):
+        # Erros de servidor são sempre registrados, mesmo fora da amostra
+        if sampled or response.status_code >= 500:
+            writer.enqueue(self.build_entry(request, response, body, elapsed))
+
+    def should_log(self, request):
+        if not _setting("API_LOG_ENABLED", True):
+            return False
+        if request.method not in _setting(
+            "API_LOG_METHODS", ["GET", "POST", "PUT", "PATCH", "DELETE"]
+        ):
+            return False
+        return not any(
+            request.path.startswith(prefix)
+            for prefix in _setting("API_LOG_EXCLUDE_PATHS", [])
+        )
+
+    def capture_request_body(self, request):
+        # Só lê corpos JSON pequenos: uploads em fluxo (NDJSON/CSV) continuam
+        # sendo consumidos linha a linha pela view.
+        if request.content_type not in JSON_CONTENT_TYPES:
+            return ""
+        max_size = _setting("API_LOG_MAX_BODY_SIZE", 32768)
+        try:
+            if int(request.META.get("CONTENT_LENGTH") or 0) > max_size:
+                return ""
+            return request.body
+        except Exception:
+            return ""
+
+    def capture_response_body(self, response):
+        if response.streaming:
+            return ""
+        content_type = response.get("Content-Type", "").split(";")[0]
+        if content_type not in JSON_CONTENT_TYPES:
+            return ""
+        if len(response.content) > _setting("API_LOG_MAX_BODY_SIZE", 32768):
+            return ""
+        return response.content
+
+    def build_entry(self, request, response, body, elapsed):
+        headers = {
+            key[5:]: MASK if key == "HTTP_AUTHORIZATION" else value
+            for key, value in request.META.items()
+            if key.startswith("HTTP_")
+        }
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+        return {
+            "api": mask_query(request.build_absolute_uri())[:1024],
+            "headers": headers,
+            "body": body,
+            "method": request.method,
+            "client_ip_address": (
+                forwarded.split(",")[0].strip()
+                if forwarded
+                else request.META.get("REMOTE_ADDR", "")
+            )[:50],
+            "response": self.capture_response_body(response),
+            "status_code": response.status_code,
+            "execution_time": round(elapsed, 5),
+            "added_on": timezone.now(),
+        }
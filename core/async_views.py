@@ -0,0 +1,158 @@
+"""
+Base das leituras assíncronas servidas em ``/api/async/``.
+
+As views de ``professionals.async_views`` e ``consultations.async_views`` são
+funções ``async`` do Django que adaptam as ações de leitura dos ViewSets da
+API síncrona. ``async_api_view`` monta o ViewSet com a ação, e dele vêm o
+queryset, os filtros, a projeção, o serializer (ou o ``ValuesPlan``), a
+paginação, o cache e as permissões. Aqui fica só o que muda sob ASGI: a
+leitura do banco e do cache pelas APIs assíncronas. O corpo das respostas é o
+mesmo da API síncrona, e uma requisição lenta não prende uma thread do pool
+enquanto espera.
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .authentication import CachedJWTAuthentication
+from .caching import cache_entry, cache_query, entry_response
+from .db_routers import read_from_replica
+from .search import get_page_params
+
+authenticator = CachedJWTAuthentication()
+
+
+def render(data, status=200):
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f"{content_type}; charset={renderer.charset}"
+    return HttpResponse(renderer.render(data), status=status, content_type=content_type)
+
+
+def error_response(request, exc):
+    detail = exc.detail
+    data = detail if isinstance(detail, (dict, list)) else {"detail": detail}
+    response = render(data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response.status_code = 401
+        response["WWW-Authenticate"] = authenticator.authenticate_header(request)
+    return response
+
+
+def async_api_view(viewset_class, action, detail=False):
+    """
+    Leitura assíncrona da ``action`` de ``viewset_class``: somente GET,
+    autenticada e com as permissões da view; erros da API viram respostas
+    JSON. A função decorada recebe a view montada no lugar da requisição.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(request, *args, **kwargs):
+            view = viewset_class(
+                action=action,
+                detail=detail,
+                args=args,
+                kwargs=kwargs,
+                format_kwarg=None,
+            )
+            view.request = Request(
+                request, parser_context={"view": view, "args": args, "kwargs": kwargs}
+            )
+            try:
+                if request.method not in ("GET", "HEAD"):
+                    raise exceptions.MethodNotAllowed(request.method)
+                with read_from_replica():
+                    auth = await authenticator.aauthenticate(view.request)
+                    if auth is None:
+                        raise exceptions.NotAuthenticated()
+                    view.request.user, view.request.auth = auth
+                    view.check_permissions(view.request)
+                    return await func(view, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return error_response(request, exc)
+
+        return wrapper
+
+    return decorator
+
+
+async def aget_or_404(queryset, **kwargs):
+    try:
+        return await queryset.aget(**kwargs)
+    except (queryset.model.DoesNotExist, ValueError, TypeError):
+        raise exceptions.NotFound()
+
+
+async def retrieve_data(view):
+    """Corpo de ``view.retrieve()``, com o objeto buscado como em ``get_object``."""
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    obj = await aget_or_404(
+        view.filter_queryset(view.get_queryset()),
+        **{view.lookup_field: view.kwargs[lookup_url_kwarg]},
+    )
+    view.check_object_permissions(view.request, obj)
+    return view.get_serializer(obj).data
+
+
+async def list_data(view):
+    """Corpo de ``view.list()``: ``?search=`` ou a listagem paginada."""
+    queryset = view.filter_queryset(view.get_queryset())
+    term = view.get_search_term(view.request)
+    if term:
+        return await search_data(view, queryset, term)
+    return await page_data(view, queryset)
+
+
+async def page_data(view, queryset):
+    """
+    Listagem como em ``ValuesListMixin``, com a paginação da view. A paginação
+    precisa separar a montagem do queryset da página, como
+    ``KeysetPagination.prepare_queryset``/``finalize_page``.
+    """
+    plan = view.get_values_plan()
+    if plan is not None:
+        queryset = view.values_queryset(queryset, plan)
+
+    paginator = view.paginator
+    if paginator is None:
+        return _serialize(view, plan, [row async for row in queryset])
+    queryset = paginator.prepare_queryset(queryset, view.request)
+    rows = paginator.finalize_page([row async for row in queryset])
+    return paginator.get_paginated_response(_serialize(view, plan, rows)).data
+
+
+def _serialize(view, plan, rows):
+    if plan is not None:
+        return plan.serialize(rows)
+    return view.get_serializer(rows, many=True).data
+
+
+async def search_data(view, queryset, term):
+    """Página de ``?search=``, como em ``FullTextSearchMixin.list``."""
+    page, page_size = get_page_params(view.request.query_params)
+    # Cursor cru do banco: roda na thread síncrona, com a conexão dela
+    ids = await sync_to_async(view.search_ids)(queryset, term, page, page_size)
+    rows = await queryset.ain_bulk(ids[:page_size])
+    return view.search_page(view.request, ids, rows, page, page_size)
+
+
+async def cached_response(view, build):
+    """``CachedReadMixin.cached_response`` com o cache lido sem bloquear."""
+    request, read_cache = view.request, view.read_cache
+    key = await read_cache.akey(request.path, cache_query(request))
+    entry = await read_cache.aget(key)
+    cache_status = "HIT"
+
+    if entry is None:
+        cache_status = "MISS"
+        entry = cache_entry(await build())
+        await read_cache.aset(key, entry)
+
+    return entry_response(request, entry, cache_status, render)
@@ -0,0 +1,300 @@
+"""
+Autenticação JWT com caminho rápido.
+
+O ``JWTAuthentication`` do simplejwt verifica a assinatura do token e busca o
+usuário no banco a cada requisição. Aqui:
+
+- os tokens já verificados ficam num cache LRU em memória, por ``jti``, até o
+  seu ``exp`` — a mesma string de token não é decodificada de novo;
+- quando a view só precisa saber *quem* está autenticado (permissões que não
+  olham atributos do usuário), o usuário é montado a partir das claims
+  (``TokenUser``), com uma checagem de existência/ativo guardada no cache do
+  Django e invalidada pelos sinais do modelo de usuário. Num cache local
+  (``LocMemCache``) a invalidação só alcança o processo que fez a escrita,
+  então lá essa checagem dura só ``JWT_USER_CACHE_LOCAL_TIMEOUT`` segundos;
+- nos demais casos o usuário continua vindo do banco, como antes.
+
+Tokens de tipos sujeitos à blacklist do simplejwt continuam sendo conferidos
+contra ela a cada uso, mesmo quando vêm do cache.
+"""
+
+import threading
+from collections import OrderedDict
+
+import jwt
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework import permissions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+    TokenError,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import aware_utcnow, get_md5_hash_password
+
+from .caching import get_cache_alias, is_shared_cache
+
+BLACKLIST_APP = "rest_framework_simplejwt.token_blacklist"
+
+# Permissões que só dependem de ``is_authenticated``
+TOKEN_USER_PERMISSIONS = (
+    permissions.AllowAny,
+    permissions.IsAuthenticated,
+    permissions.IsAuthenticatedOrReadOnly,
+)
+
+
+class TokenCache:
+    """LRU limitado de tokens validados, protegido por lock."""
+
+    def __init__(self, max_size_setting="JWT_CACHE_MAX_SIZE", default_max_size=10000):
+        self.max_size_setting = max_size_setting
+        self.default_max_size = default_max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self):
+        return getattr(settings, self.max_size_setting, self.default_max_size)
+
+    def get(self, jti, raw_token):
+        with self._lock:
+            entry = self._entries.get(jti)
+            # Confere o token inteiro: o jti sozinho não prova a assinatura
+            if entry is None or entry[0] != raw_token:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(jti)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, jti, raw_token, token):
+        with self._lock:
+            self._entries[jti] = (raw_token, token)
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, jti):
+        with self._lock:
+            self._entries.pop(jti, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+token_cache = TokenCache()
+
+
+def _unverified_jti(raw_token):
+    """Lê o ``jti`` do payload sem verificar nada — serve só de chave."""
+    try:
+        payload = jwt.decode(raw_token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return None
+    return payload.get(api_settings.JTI_CLAIM)
+
+
+def _user_state_key(user_id):
+    return f"auth:user-state:{user_id}"
+
+
+def _user_cache():
+    return caches[get_cache_alias()]
+
+
+def forget_user(sender, instance, **kwargs):
+    key = _user_state_key(instance.pk)
+    _user_cache().delete(key)
+    # De novo após o commit: uma leitura concorrente pode ter gravado a
+    # situação anterior (ainda visível antes do commit) nesse meio-tempo
+    transaction.on_commit(lambda: _user_cache().delete(key))
+
+
+post_save.connect(
+    forget_user, sender=settings.AUTH_USER_MODEL, dispatch_uid="auth-user-state-save"
+)
+post_delete.connect(
+    forget_user, sender=settings.AUTH_USER_MODEL, dispatch_uid="auth-user-state-del"
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` com cache de tokens e usuário montado das claims."""
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        if self.accepts_token_user(request):
+            return self.get_token_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_validated_token(self, raw_token):
+        jti = _unverified_jti(raw_token)
+        token = token_cache.get(jti, raw_token) if jti else None
+        if token is not None:
+            try:
+                token.check_exp(current_time=aware_utcnow())
+                # Só existe nos tipos com blacklist, e só se o app estiver ativo
+                if hasattr(token, "check_blacklist"):
+                    token.check_blacklist()
+            except TokenError as exc:
+                token_cache.discard(jti)
+                raise InvalidToken(
+                    {
+                        "detail": _("Given token not valid for any token type"),
+                        "messages": [
+                            {
+                                "token_class": type(token).__name__,
+                                "token_type": token.token_type,
+                                "message": exc.args[0],
+                            }
+                        ],
+                    }
+                )
+            return token
+
+        token = super().get_validated_token(raw_token)
+        if jti:
+            token_cache.set(jti, raw_token, token)
+        return token
+
+    def accepts_token_user(self, request):
+        """
+        A view aceita um ``TokenUser`` quando todas as suas permissões só
+        dependem de o usuário estar autenticado.
+        """
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        if view is None or not getattr(view, "token_user", False):
+            return False
+        return all(
+            isinstance(permission, TOKEN_USER_PERMISSIONS)
+            for permission in view.get_permissions()
+        )
+
+    async def aauthenticate(self, request):
+        """
+        Versão assíncrona, para as views servidas sob ASGI, com a mesma regra
+        de ``authenticate``: ``TokenUser`` só quando a view aceita.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        if BLACKLIST_APP in settings.INSTALLED_APPS:
+            # A conferência da blacklist consulta o banco
+            validated_token = await sync_to_async(self.get_validated_token)(raw_token)
+        else:
+            validated_token = self.get_validated_token(raw_token)
+
+        if not self.accepts_token_user(request):
+            user = await sync_to_async(self.get_user)(validated_token)
+            return user, validated_token
+
+        user_id = self._user_id(validated_token)
+        state = await self.aget_user_state(user_id)
+        return self._token_user(validated_token, state), validated_token
+
+    def get_token_user(self, validated_token):
+        state = self.get_user_state(self._user_id(validated_token))
+        return self._token_user(validated_token, state)
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def _token_user(self, validated_token, state):
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not state["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+            != state["password_hash"]
+        ):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+    def _user_queryset(self, user_id):
+        return self.user_model.objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).values("is_active", "password")
+
+    def get_user_state(self, user_id):
+        """Existência e situação do usuário, em cache até ele ser alterado."""
+        cache = _user_cache()
+        key = _user_state_key(user_id)
+        state = cache.get(key)
+        if state is None:
+            state = _state_from_row(self._user_queryset(user_id).first())
+            cache.set(key, state, timeout=_user_cache_timeout())
+        return state or None
+
+    async def aget_user_state(self, user_id):
+        cache = _user_cache()
+        key = _user_state_key(user_id)
+        state = await cache.aget(key)
+        if state is None:
+            state = _state_from_row(await self._user_queryset(user_id).afirst())
+            await cache.aset(key, state, timeout=_user_cache_timeout())
+        return state or None
+
+
+def _state_from_row(row):
+    # Dicionário vazio (e não None) marca "usuário inexistente" no cache
+    if row is None:
+        return {}
+    return {
+        "is_active": row["is_active"],
+        "password_hash": get_md5_hash_password(row["password"]),
+    }
+
+
+def _user_cache_timeout():
+    if is_shared_cache():
+        return getattr(settings, "JWT_USER_CACHE_TIMEOUT", 300)
+    # Cache por processo: um usuário desativado ou removido pela requisição
+    # de outro worker só deixa de ser aceito aqui quando a entrada expira
+    return getattr(settings, "JWT_USER_CACHE_LOCAL_TIMEOUT", 5)
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Mantém o esquema ``Bearer`` do OpenAPI para a classe acima."""
+
+    target_class = "core.authentication.CachedJWTAuthentication"
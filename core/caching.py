@@ -0,0 +1,238 @@
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.response import Response
+
+# Backends cujo conteúdo vive na memória de cada processo: uma invalidação
+# feita num worker não chega aos demais
+LOCAL_CACHE_BACKENDS = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+def get_cache_alias():
+    return getattr(settings, "API_CACHE_ALIAS", "default")
+
+
+def is_shared_cache(alias=None):
+    """O cache é o mesmo para todos os processos (Redis, memcached, banco...)?"""
+    backend = settings.CACHES[alias or get_cache_alias()]["BACKEND"]
+    return backend not in LOCAL_CACHE_BACKENDS
+
+
+def allowed_workers(workers):
+    """
+    Quantos workers podem subir com o cache configurado: sobre um cache local
+    cada um guardaria as suas respostas e só o que recebeu a escrita veria a
+    invalidação, então fica um só.
+    """
+    if workers > 1 and not is_shared_cache():
+        return 1
+    return workers
+
+
+class VersionedCache:
+    """
+    Cache com chaves versionadas sobre o framework de cache do Django.
+
+    Cada chave embute a versão atual do seu escopo (o namespace inteiro ou
+    um sub-escopo, como um profissional/dia). Invalidar é só incrementar a
+    versão: as entradas antigas deixam de ser alcançáveis e expiram sozinhas,
+    sem precisar listar nem apagar chaves — o que funciona igual em locmem e
+    em Redis.
+    """
+
+    def __init__(self, namespace, timeout_setting=None, default_timeout=300):
+        self.namespace = namespace
+        self.timeout_setting = timeout_setting
+        self.default_timeout = default_timeout
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[get_cache_alias()]
+
+    @property
+    def timeout(self):
+        if self.timeout_setting:
+            return getattr(settings, self.timeout_setting, self.default_timeout)
+        return self.default_timeout
+
+    def _version_key(self, scope):
+        return ":".join([self.namespace, "version", *map(str, scope)])
+
+    def version(self, *scope):
+        key = self._version_key(scope)
+        version = self.cache.get(key)
+        if version is None:
+            # Começa de um valor baseado no relógio para nunca reaproveitar uma
+            # versão antiga caso a chave de versão tenha sido descartada.
+            version = int(time.time() * 1000)
+            if not self.cache.add(key, version, timeout=None):
+                version = self.cache.get(key, version)
+        return version
+
+    def bump(self, *scope):
+        """Invalida todas as entradas do escopo."""
+        key = self._version_key(scope)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, int(time.time() * 1000), timeout=None)
+
+    def _build_key(self, scope, version, parts):
+        digest = hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()
+        return ":".join([self.namespace, *map(str, scope), str(version), digest])
+
+    def key(self, *parts, scope=()):
+        return self._build_key(scope, self.version(*scope), parts)
+
+    def keys_for(self, scopes, *parts):
+        """
+        Chaves de vários escopos de uma vez: as versões são lidas com um único
+        ``get_many`` em vez de uma ida ao cache por escopo.
+        """
+        version_keys = {scope: self._version_key(scope) for scope in scopes}
+        versions = self.cache.get_many(list(version_keys.values()))
+        keys = {}
+        for scope, version_key in version_keys.items():
+            version = versions.get(version_key)
+            if version is None:
+                version = self.version(*scope)
+            keys[scope] = self._build_key(scope, version, parts)
+        return keys
+
+    def get_many(self, keys):
+        found = self.cache.get_many(list(keys))
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, mapping):
+        self.cache.set_many(mapping, timeout=self.timeout)
+
+    def get(self, key):
+        value = self.cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.cache.set(key, value, timeout=self.timeout)
+
+    # Variantes assíncronas (API assíncrona do cache do Django), para as views
+    # servidas sob ASGI
+
+    async def aversion(self, *scope):
+        key = self._version_key(scope)
+        version = await self.cache.aget(key)
+        if version is None:
+            version = int(time.time() * 1000)
+            if not await self.cache.aadd(key, version, timeout=None):
+                version = await self.cache.aget(key, version)
+        return version
+
+    async def akey(self, *parts, scope=()):
+        return self._build_key(scope, await self.aversion(*scope), parts)
+
+    async def aget(self, key):
+        value = await self.cache.aget(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    async def aset(self, key, value):
+        await self.cache.aset(key, value, timeout=self.timeout)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "namespace": self.namespace,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        }
+
+
+def compute_etag(data):
+    payload = json.dumps(data, sort_keys=True, default=str, separators=(",", ":"))
+    return '"%s"' % hashlib.md5(payload.encode()).hexdigest()
+
+
+class CachedReadMixin:
+    """
+    Serve ``list``/``retrieve`` a partir de um ``VersionedCache``.
+
+    Guarda os dados já serializados junto com um ETag do conteúdo; requisições
+    com ``If-None-Match`` igual recebem 304 sem corpo e sem serialização.
+    Autenticação e permissões continuam sendo verificadas antes do cache.
+    """
+
+    read_cache = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(CachedReadMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            lambda: super(CachedReadMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+    def get_cache_key(self, request):
+        return self.read_cache.key(request.path, cache_query(request))
+
+    def cached_response(self, request, build):
+        key = self.get_cache_key(request)
+        entry = self.read_cache.get(key)
+        cache_status = "HIT"
+
+        if entry is None:
+            cache_status = "MISS"
+            response = build()
+            if response.status_code != 200:
+                return response
+            entry = cache_entry(response.data)
+            self.read_cache.set(key, entry)
+
+        return entry_response(request, entry, cache_status)
+
+
+def cache_query(request):
+    """Query string em ordem canônica, para a chave do cache."""
+    return urlencode(sorted(request.query_params.lists()), doseq=True)
+
+
+def cache_entry(data):
+    """``(etag, dados)`` guardado no cache para uma resposta serializada."""
+    data = list(data) if isinstance(data, list) else dict(data)
+    return compute_etag(data), data
+
+
+def entry_response(request, entry, cache_status, response_class=Response):
+    """Resposta para uma entrada do cache: 304 se o ``If-None-Match`` bater."""
+    etag, data = entry
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = response_class(data)
+    response["ETag"] = etag
+    response["X-Cache"] = cache_status
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
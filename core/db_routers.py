@@ -0,0 +1,62 @@
+"""
+Roteamento de leituras para a réplica.
+
+O router não enxerga a requisição: quem decide é o código que a atende, com
+``read_from_replica()`` (ou ``ReplicaReadMixin`` nas views DRF). Dentro desse
+contexto as leituras vão para o alias ``DB_REPLICA_ALIAS``, se ele estiver em
+``DATABASES``; escritas e todo o resto continuam no ``default``.
+
+A variável de contexto acompanha o código síncrono chamado via
+``sync_to_async``, então o ORM assíncrono respeita a mesma escolha. Respostas
+em fluxo consultam o banco depois que a view retornou e, por isso, leem do
+``default``.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+_use_replica = ContextVar("use_replica", default=False)
+
+
+def get_replica_alias():
+    """Alias da réplica, ou ``None`` se ela não estiver configurada."""
+    alias = getattr(settings, "DB_REPLICA_ALIAS", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return get_replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # São o mesmo banco: objetos lidos da réplica podem se relacionar com
+        # objetos do default
+        aliases = {"default", get_replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """Atende os métodos seguros (GET, HEAD, OPTIONS) lendo da réplica."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_from_replica(request.method in SAFE_METHODS):
+            return super().dispatch(request, *args, **kwargs)
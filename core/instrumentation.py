@@ -0,0 +1,271 @@
+"""
+Instrumentação por requisição.
+
+O middleware instala um ``execute_wrapper`` nas conexões e registra, para cada
+requisição, quantas consultas foram feitas, quanto tempo passaram no banco e
+quais SQLs se repetiram (o padrão de N+1). A renderização da resposta
+(serialização para JSON) é medida à parte da view.
+
+Os números vão para o cabeçalho ``Server-Timing``, para ``request.query_stats``
+e para histogramas em memória por rota. Rotas acima do orçamento de consultas
+(``QUERY_BUDGETS``, por rota ou por método e rota, e ``QUERY_BUDGET_DEFAULT``)
+ou com o mesmo SQL repetido ``N_PLUS_ONE_THRESHOLD`` vezes geram um aviso no
+log.
+
+Respostas em fluxo só contam o que aconteceu antes de o corpo começar a ser
+enviado.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores (ms) dos baldes dos histogramas de tempo
+DURATION_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, float("inf"))
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class QueryStats:
+    """Consultas de uma requisição; usado como ``execute_wrapper``."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Execuções repetidas do mesmo SQL (parâmetros à parte)."""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def repeated(self, threshold):
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "duration_ms": round(self.duration * 1000, 3),
+            "duplicates": self.duplicates,
+            "render_ms": round(self.render * 1000, 3),
+        }
+
+
+class Histogram:
+    """Histograma cumulativo simples, seguro entre threads."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, buckets = 0, {}
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {"count": count, "sum": round(total, 3), "buckets": buckets}
+
+
+class RouteHistograms:
+    """Histogramas por rota: tempo total, tempo no banco e nº de consultas."""
+
+    metrics = {
+        "duration_ms": DURATION_BUCKETS,
+        "db_ms": DURATION_BUCKETS,
+        "queries": QUERY_BUCKETS,
+    }
+
+    def __init__(self):
+        self._routes = defaultdict(
+            lambda: {name: Histogram(b) for name, b in self.metrics.items()}
+        )
+        self._lock = threading.Lock()
+
+    def observe(self, route, **values):
+        with self._lock:
+            histograms = self._routes[route]
+        for name, value in values.items():
+            histograms[name].observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            routes = dict(self._routes)
+        return {
+            route: {name: h.snapshot() for name, h in histograms.items()}
+            for route, histograms in sorted(routes.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+histograms = RouteHistograms()
+
+
+def route_name(request):
+    """Nome da rota resolvida (ex.: ``consultation-list``)."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return match.view_name or match.route or "unnamed"
+
+
+def get_query_budget(route, method):
+    """Orçamento de ``"<MÉTODO> <rota>"``, senão o da rota, senão o padrão."""
+    budgets = _setting("QUERY_BUDGETS", {})
+    for key in (f"{method} {route}", route):
+        if key in budgets:
+            return budgets[key]
+    return _setting("QUERY_BUDGET_DEFAULT", None)
+
+
+# Estatísticas da requisição corrente; o contexto acompanha o código síncrono
+# chamado via ``sync_to_async``, então cada consulta cai na requisição certa
+# mesmo quando várias requisições assíncronas dividem a mesma thread.
+_current_stats = ContextVar("query_stats", default=None)
+
+
+def _dispatch(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def _install_dispatcher():
+    """Instala o wrapper (uma vez) nas conexões da thread atual."""
+    for connection in connections.all():
+        if _dispatch not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_dispatch)
+
+
+class InstrumentationMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _setting("INSTRUMENTATION_ENABLED", True):
+            return self.get_response(request)
+
+        stats = request.query_stats = QueryStats()
+        started = time.perf_counter()
+        _install_dispatcher()
+        token = _current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not _setting("INSTRUMENTATION_ENABLED", True):
+            return await self.get_response(request)
+
+        # O ORM assíncrono executa as consultas na thread síncrona da
+        # requisição: é nas conexões dela que o wrapper precisa estar.
+        stats = request.query_stats = QueryStats()
+        started = time.perf_counter()
+        await sync_to_async(_install_dispatcher)()
+        token = _current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    def finish(self, request, response, stats, total):
+        route = route_name(request)
+        histograms.observe(
+            route,
+            duration_ms=total * 1000,
+            db_ms=stats.duration * 1000,
+            queries=stats.count,
+        )
+        self.check_budget(route, request.method, stats)
+        if _setting("SERVER_TIMING_ENABLED", True):
+            response["Server-Timing"] = self.server_timing(stats, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # A view já terminou; o que falta é a renderização (serialização)
+        stats = getattr(request, "query_stats", None)
+        if stats is not None:
+            render_started = time.perf_counter()
+
+            def rendered(response):
+                stats.render = time.perf_counter() - render_started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def server_timing(self, stats, total):
+        app = max(total - stats.duration - stats.render, 0.0)
+        return ", ".join(
+            [
+                f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"',
+                f"render;dur={stats.render * 1000:.2f}",
+                f"app;dur={app * 1000:.2f}",
+                f"total;dur={total * 1000:.2f}",
+            ]
+        )
+
+    def check_budget(self, route, method, stats):
+        budget = get_query_budget(route, method)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                "%s %s fez %d consultas (orçamento: %d)",
+                method,
+                route,
+                stats.count,
+                budget,
+            )
+        threshold = _setting("N_PLUS_ONE_THRESHOLD", 5)
+        for sql, count in stats.repeated(threshold):
+            logger.warning(
+                "Possível N+1 em %s: SQL repetido %d vezes: %s",
+                route,
+                count,
+                sql[:300],
+            )
@@ -0,0 +1,256 @@
+"""
+Logs estruturados fora do caminho da requisição.
+
+``QueueLogHandler`` é o único handler dos loggers do projeto: na thread que
+loga ele só resolve a mensagem, anota o id da requisição e coloca o registro
+numa fila em memória com tamanho limitado. Uma thread por processo
+(``QueueListener``) formata e grava no console e num arquivo com rotação por
+tamanho — ou um arquivo por processo (``app.<pid>.log``), para que vários
+workers do gunicorn não disputem o mesmo arquivo. Com a fila cheia o registro
+é descartado e contado; quem loga nunca espera por disco.
+
+``RequestIDMiddleware`` aceita o ``X-Request-ID`` recebido (ou gera um), o
+devolve na resposta e o deixa num ``ContextVar``; ``JSONFormatter`` escreve
+uma linha JSON por registro com esse id, para correlacionar as linhas de uma
+mesma requisição.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import uuid
+import weakref
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+request_id_var = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Ids recebidos de fora só são aceitos se forem curtos e sem caracteres que
+# quebrem uma linha de log
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Atributos de todo LogRecord; o que sobra veio de ``extra=``
+RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+
+def get_request_id():
+    """Id da requisição em andamento neste contexto, ou ``None``."""
+    return request_id_var.get()
+
+
+class RequestIDFilter(logging.Filter):
+    """Anota ``record.request_id`` (roda na thread que loga)."""
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = get_request_id()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos de ``extra=``."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Espera vaga na fila: a thread de escrita continua consumindo
+        self.queue.put(self._sentinel)
+
+
+_handlers = weakref.WeakSet()
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Enfileira os registros; uma thread por processo grava no console e/ou no
+    arquivo ``filename`` (com rotação a cada ``max_bytes``).
+    """
+
+    def __init__(
+        self,
+        filename=None,
+        max_bytes=10 * 1024 * 1024,
+        backup_count=5,
+        per_process=False,
+        console=True,
+        queue_size=10000,
+    ):
+        super().__init__(None)
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.per_process = per_process
+        self.console = console
+        self.queue_size = queue_size
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self.listener = None
+        self.enqueued = 0
+        self.dropped = 0
+        _handlers.add(self)
+
+    def get_filename(self):
+        if not self.per_process:
+            return self.filename
+        root, ext = os.path.splitext(self.filename)
+        return f"{root}.{os.getpid()}{ext}"
+
+    def build_targets(self):
+        targets = []
+        if self.console:
+            targets.append(logging.StreamHandler(sys.stderr))
+        if self.filename:
+            filename = self.get_filename()
+            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+            targets.append(
+                RotatingFileHandler(
+                    filename,
+                    maxBytes=self.max_bytes,
+                    backupCount=self.backup_count,
+                    encoding="utf-8",
+                    delay=True,
+                )
+            )
+        for target in targets:
+            target.setFormatter(self.formatter)
+        return targets
+
+    def _ensure_started(self):
+        # Após um fork (gunicorn com preload) a thread do processo pai não
+        # existe no filho: cada processo cria a sua fila, arquivo e thread.
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=self.queue_size)
+            self.listener = _Listener(self.queue, *self.build_targets())
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Só o que depende do momento do log: a mensagem com os argumentos
+        # (que podem mudar depois). A formatação fica com a thread de escrita.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.enqueued += 1
+
+    def emit(self, record):
+        self._ensure_started()
+        super().emit(record)
+
+    def stop(self):
+        """Grava o que estiver na fila e encerra a thread deste processo."""
+        with self._start_lock:
+            if self._pid != os.getpid() or self.listener is None:
+                return
+            self.listener.stop()
+            for target in self.listener.handlers:
+                target.close()
+            self.listener = None
+            self._pid = None
+
+    def close(self):
+        self.stop()
+        super().close()
+
+    def stats(self):
+        return {
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "pending": self.queue.qsize() if self.queue is not None else 0,
+        }
+
+
+def shutdown():
+    """Esvazia as filas de todos os ``QueueLogHandler`` (fim do worker)."""
+    for handler in list(_handlers):
+        handler.stop()
+
+
+atexit.register(shutdown)
+
+
+class RequestIDMiddleware:
+    """Propaga (ou gera) o ``X-Request-ID`` e o expõe aos logs."""
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    def start(self, request):
+        received = request.headers.get(REQUEST_ID_HEADER, "")
+        request.request_id = (
+            received if REQUEST_ID_RE.match(received) else uuid.uuid4().hex
+        )
+        return request_id_var.set(request.request_id)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from core.schema import (
+    RENDERERS,
+    SchemaArtifact,
+    digest_path,
+    generate_schema,
+    schema_path,
+    source_digest,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera o esquema OpenAPI (YAML e JSON, com versões gzip) em "
+        "API_SCHEMA_DIR, para ser servido pronto em /api/schema/ enquanto o "
+        "código não mudar."
+    )
+
+    def handle(self, *args, **options):
+        for fmt in RENDERERS:
+            artifact = SchemaArtifact(generate_schema(fmt))
+            artifact.write(fmt)
+            self.stdout.write(
+                f"{schema_path(fmt)}: {len(artifact.body)} bytes "
+                f"({len(artifact.compressed)} com gzip)"
+            )
+        # Os arquivos só são servidos para o mesmo código que os gerou
+        digest_path().write_text(source_digest())
+        self.stdout.write(self.style.SUCCESS("Esquema OpenAPI gerado."))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.api_logging import prune_logs
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga, em lotes, os registros de requisições (drf_api_logs) mais "
+        "antigos que o período de retenção."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Mantém só os últimos N dias (padrão: API_LOG_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Faixa de ids por DELETE (padrão: API_LOG_PRUNE_BATCH_SIZE).",
+        )
+
+    def handle(self, *args, days, batch_size, **options):
+        if days is None:
+            days = getattr(settings, "API_LOG_RETENTION_DAYS", 30)
+        before = timezone.now() - timedelta(days=days)
+        deleted = prune_logs(before, batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(f"{deleted} registros anteriores a {before} apagados.")
+        )
@@ -0,0 +1,371 @@
+"""
+Métricas no formato texto do Prometheus.
+
+O middleware conta requisições, mede a latência e o número de consultas SQL
+por rota (o nome da rota do router, como ``consultation-list``) e acompanha
+as requisições em andamento. ``GET /metrics`` expõe tudo.
+
+Com vários workers (gunicorn), uma thread de cada processo grava o seu estado
+em ``METRICS_MULTIPROC_DIR/metrics-<pid>.json`` a cada
+``METRICS_FLUSH_INTERVAL`` segundos, se algo mudou — inclusive quando o
+worker fica ocioso depois da última requisição — e a coleta soma os arquivos
+de todos os processos. Quando um worker termina (o gunicorn recicla workers
+o tempo todo), ``mark_process_dead`` soma os seus contadores e histogramas
+em ``metrics-archive.json`` — eles não podem regredir —, descarta os gauges
+e apaga o arquivo dele: o diretório fica com um arquivo por worker vivo mais
+o arquivo consolidado. Sem o diretório, cada processo expõe só o que viu.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .instrumentation import route_name
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# nome -> (tipo, ajuda, baldes)
+METRICS = {
+    "http_requests_total": ("counter", "Requisições atendidas.", None),
+    "http_request_duration_seconds": (
+        "histogram",
+        "Latência das requisições, em segundos.",
+        DURATION_BUCKETS,
+    ),
+    "http_request_db_queries": (
+        "histogram",
+        "Consultas SQL por requisição.",
+        QUERY_BUCKETS,
+    ),
+    "http_requests_in_flight": ("gauge", "Requisições em andamento.", None),
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_multiproc_dir():
+    return _setting("METRICS_MULTIPROC_DIR", None)
+
+
+class MetricsStore:
+    """Estado de um processo: séries indexadas por (nome, rótulos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._flusher_pid = None
+        self._dirty = False
+        self.series = {}
+
+    def _reset_after_fork(self):
+        # O filho herda a memória do pai (preload): começa do zero com o seu pid
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._dirty = False
+            self.series = {}
+
+    def _entry(self, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        entry = self.series.get(key)
+        if entry is None:
+            buckets = METRICS[name][2]
+            # histograma: contagem por balde (+Inf no fim), soma e total
+            entry = [0] * (len(buckets) + 1) + [0.0, 0] if buckets else [0.0]
+            self.series[key] = entry
+        return entry
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._reset_after_fork()
+            self._entry(name, labels)[0] += amount
+            self._dirty = True
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        index = bisect_left(buckets, value)
+        with self._lock:
+            self._reset_after_fork()
+            entry = self._entry(name, labels)
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+            self._dirty = True
+
+    def dump(self):
+        with self._lock:
+            self._reset_after_fork()
+            return [
+                [name, list(labels), list(entry)]
+                for (name, labels), entry in self.series.items()
+            ]
+
+    def reset(self):
+        with self._lock:
+            self.series = {}
+
+    def flush(self):
+        """Grava o estado do processo no diretório compartilhado, se houver."""
+        directory = get_multiproc_dir()
+        if not directory:
+            return
+        self._dirty = False
+        write_file(directory, os.getpid(), self.dump())
+
+    def start_flusher(self):
+        """Garante a thread de gravação periódica deste processo."""
+        if self._flusher_pid == os.getpid() or not get_multiproc_dir():
+            return
+        with self._lock:
+            # Após um fork a thread do pai não existe no filho
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(
+            target=self._run_flusher, name="metrics-flusher", daemon=True
+        ).start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(_setting("METRICS_FLUSH_INTERVAL", 1.0))
+            if self._flusher_pid != os.getpid():
+                return
+            if not self._dirty:
+                continue
+            try:
+                self.flush()
+            except OSError:
+                logger.warning("Falha ao gravar as métricas", exc_info=True)
+
+
+store = MetricsStore()
+atexit.register(store.flush)
+
+
+ARCHIVE = "archive"
+
+
+def _path(directory, pid):
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def write_file(directory, pid, series):
+    path = _path(directory, pid)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fp:
+        json.dump(series, fp)
+    os.replace(tmp, path)
+
+
+def merge_series(series):
+    """Soma as entradas com o mesmo (nome, rótulos)."""
+    merged = {}
+    for name, labels, entry in series:
+        key = (name, tuple(tuple(pair) for pair in labels))
+        if key not in merged:
+            merged[key] = list(entry)
+        else:
+            merged[key] = [a + b for a, b in zip(merged[key], entry)]
+    return merged
+
+
+def read_archive(directory):
+    """``(série consolidada, pid sendo consolidado)`` dos workers encerrados."""
+    try:
+        with open(_path(directory, ARCHIVE)) as fp:
+            archive = json.load(fp)
+    except FileNotFoundError:
+        return [], None
+    return archive["series"], archive["merging"]
+
+
+def write_archive(directory, series, merging=None):
+    write_file(directory, ARCHIVE, {"series": series, "merging": merging})
+
+
+def _read_files(directory):
+    # O consolidado primeiro: um arquivo de worker que sumir depois desta
+    # leitura já foi somado a ele, e a leitura recomeça
+    series, merging = read_archive(directory)
+    series = list(series)
+    for filename in sorted(os.listdir(directory)):
+        if not (filename.startswith("metrics-") and filename.endswith(".json")):
+            continue
+        pid = filename[len("metrics-") : -len(".json")]
+        if pid in (ARCHIVE, str(merging)):
+            continue
+        with open(os.path.join(directory, filename)) as fp:
+            try:
+                series.extend(json.load(fp))
+            except ValueError:
+                continue
+    return series
+
+
+def read_files(directory):
+    for _ in range(3):
+        try:
+            return _read_files(directory)
+        except FileNotFoundError:
+            # Um worker foi consolidado no meio da leitura
+            continue
+    return _read_files(directory)
+
+
+def mark_process_dead(pid, directory=None):
+    """
+    Consolida o estado de um worker encerrado (chamar no ``child_exit``):
+    contadores e histogramas vão para o arquivo consolidado, os gauges são
+    descartados e o arquivo do worker é apagado.
+    """
+    directory = directory or get_multiproc_dir()
+    if not directory or not os.path.exists(_path(directory, pid)):
+        return
+    with open(_path(directory, pid)) as fp:
+        dead = [
+            [name, labels, entry]
+            for name, labels, entry in json.load(fp)
+            if METRICS[name][0] != "gauge"
+        ]
+    archived, _ = read_archive(directory)
+    series = [
+        [name, [list(pair) for pair in labels], entry]
+        for (name, labels), entry in merge_series(archived + dead).items()
+    ]
+    # Enquanto o arquivo do worker existir, a coleta o ignora (já está somado)
+    write_archive(directory, series, merging=pid)
+    os.remove(_path(directory, pid))
+    write_archive(directory, series)
+
+
+def collect():
+    """Séries de todos os processos (ou só deste), somadas por rótulo."""
+    directory = get_multiproc_dir()
+    if directory:
+        store.flush()
+        series = read_files(directory)
+    else:
+        series = store.dump()
+    return merge_series(series)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in pairs
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render():
+    merged = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (series_name, labels), entry in sorted(merged.items()):
+            if series_name != name:
+                continue
+            if kind != "histogram":
+                lines.append(
+                    f"{name}{_format_labels(labels)} {_format_value(entry[0])}"
+                )
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], entry[:-2]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(float(bound))
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}"
+                )
+            lines.append(
+                f"{name}_sum{_format_labels(labels)} {_format_value(entry[-2])}"
+            )
+            lines.append(f"{name}_count{_format_labels(labels)} {entry[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Endpoint: GET /metrics
+
+    Se ``METRICS_TOKEN`` estiver definido, exige ``Authorization: Bearer``.
+    """
+    token = _setting("METRICS_TOKEN", "")
+    if token and request.META.get("HTTP_AUTHORIZATION") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """Registra cada requisição; fica depois de ``InstrumentationMiddleware``."""
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _setting("METRICS_ENABLED", True):
+            return self.get_response(request)
+
+        store.inc("http_requests_in_flight", {})
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            store.inc("http_requests_in_flight", {}, -1)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not _setting("METRICS_ENABLED", True):
+            return await self.get_response(request)
+
+        store.inc("http_requests_in_flight", {})
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            store.inc("http_requests_in_flight", {}, -1)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, elapsed):
+        labels = {"route": route_name(request), "method": request.method}
+        store.inc(
+            "http_requests_total", {**labels, "status": str(response.status_code)}
+        )
+        store.observe("http_request_duration_seconds", labels, elapsed)
+        stats = getattr(request, "query_stats", None)
+        if stats is not None:
+            store.observe("http_request_db_queries", labels, stats.count)
+        store.start_flusher()
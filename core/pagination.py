@@ -0,0 +1,198 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.encoding import force_str
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor opaco (keyset) sobre uma ordenação composta.
+
+    A posição é codificada com os valores das colunas de ``ordering`` da
+    última (ou primeira) linha da página, e a próxima página é obtida com
+    ``WHERE (a, b) > (x, y)``. Não há OFFSET nem COUNT(*): páginas profundas
+    custam o mesmo que a primeira, desde que exista índice para a ordenação.
+    """
+
+    ordering = ("datetime", "id")
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Cursor inválido."
+
+    def get_default_page_size(self):
+        return getattr(settings, "API_PAGE_SIZE", 50)
+
+    def get_max_page_size(self):
+        return getattr(settings, "API_MAX_PAGE_SIZE", 200)
+
+    def get_page_size(self, request):
+        page_size = self.get_default_page_size()
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw:
+            try:
+                page_size = int(raw)
+            except ValueError:
+                pass
+        return max(1, min(page_size, self.get_max_page_size()))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.prepare_queryset(queryset, request)
+        return self.finalize_page(list(queryset))
+
+    def prepare_queryset(self, queryset, request):
+        """Aplica ordenação, filtro de posição e LIMIT ao queryset."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [_invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self._seek(self.position, self.reverse))
+        return queryset[: self.page_size + 1]
+
+    def finalize_page(self, rows):
+        """Recebe as linhas buscadas (page_size + 1) e monta a página."""
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor opaco retornado em `next`/`previous`.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Quantidade de itens por página.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position_of(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self._position_of(self.page[0]), reverse=True)
+
+    def encode_position(self, position, reverse=False):
+        """Cursor opaco para ``position`` (sem a URL)."""
+        payload = {"p": [_to_json(value) for value in position]}
+        if reverse:
+            payload["r"] = 1
+        return urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def encode_cursor(self, position, reverse):
+        token = self.encode_position(position, reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(token.encode()).decode())
+            raw_position = payload["p"]
+            if len(raw_position) != len(self.ordering):
+                raise ValueError
+            position = tuple(
+                self._field(name).to_python(value)
+                for name, value in zip(self.ordering, raw_position)
+            )
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get("r"))
+
+    def _field(self, name):
+        return self.model._meta.get_field(name.lstrip("-"))
+
+    def _position_of(self, row):
+        values = []
+        for name in self.ordering:
+            attname = self._field(name).attname
+            if isinstance(row, dict):
+                values.append(row[attname] if attname in row else row[name.lstrip("-")])
+            else:
+                values.append(getattr(row, attname))
+        return values
+
+    def _seek(self, position, reverse):
+        """Monta ``(a, b, ...) > (x, y, ...)`` respeitando a direção de cada coluna."""
+        clauses = []
+        for i, name in enumerate(self.ordering):
+            descending = name.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            equal = {
+                self._field(prev).attname: position[j]
+                for j, prev in enumerate(self.ordering[:i])
+            }
+            equal[f"{self._field(name).attname}__{lookup}"] = position[i]
+            clauses.append(Q(**equal))
+        return reduce(or_, clauses)
+
+
+def _invert(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def _to_json(value):
+    if isinstance(value, int):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return force_str(value)
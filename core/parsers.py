@@ -0,0 +1,29 @@
+"""
+Parser JSON com orjson (cai para o ``JSONParser`` do DRF sem ele).
+"""
+
+import codecs
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser, get_encoding
+
+from .renderers import ORJSONRenderer, orjson
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        encoding = get_encoding(parser_context or {})
+        try:
+            content = stream.read()
+            if codecs.lookup(encoding).name != "utf-8":
+                content = content.decode(encoding).encode()
+            # NaN e Infinity não são JSON: o orjson já os recusa, como o modo
+            # estrito do DRF
+            return orjson.loads(content)
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
@@ -0,0 +1,156 @@
+"""
+Projeção de campos nas leituras: ``?fields=id,name_social`` ou
+``?exclude=notes``.
+
+A projeção corta os campos do serializer e também as colunas do SELECT
+(``.only()``): um campo de texto grande que não foi pedido não é lido do
+banco, não é serializado e não vai na resposta. Campos que não correspondem a
+uma coluna do modelo (propriedades, ``source`` com ``.``) desligam só a parte
+do banco; a resposta continua projetada.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer
+
+FIELDS_PARAM = "fields"
+EXCLUDE_PARAM = "exclude"
+
+PROJECTION_PARAMETERS = [
+    OpenApiParameter(
+        FIELDS_PARAM,
+        OpenApiTypes.STR,
+        description="Campos a devolver, separados por vírgula (ex.: id,datetime).",
+    ),
+    OpenApiParameter(
+        EXCLUDE_PARAM,
+        OpenApiTypes.STR,
+        description="Campos a omitir, separados por vírgula (ex.: notes).",
+    ),
+]
+
+
+def _names(raw):
+    return [name.strip() for name in (raw or "").split(",") if name.strip()]
+
+
+def get_projection(query_params, field_names):
+    """
+    Campos que ficam, na ordem do serializer, ou ``None`` se a requisição não
+    pediu projeção. Nomes desconhecidos geram erro de validação.
+    """
+    requested = {
+        param: _names(query_params.get(param))
+        for param in (FIELDS_PARAM, EXCLUDE_PARAM)
+    }
+    if not any(requested.values()):
+        return None
+
+    errors = {}
+    for param, names in requested.items():
+        unknown = [name for name in names if name not in field_names]
+        if unknown:
+            errors[param] = [f"Campos desconhecidos: {', '.join(unknown)}."]
+    if errors:
+        raise ValidationError(errors)
+
+    fields, exclude = requested[FIELDS_PARAM], requested[EXCLUDE_PARAM]
+    return [
+        name
+        for name in field_names
+        if (not fields or name in fields) and name not in exclude
+    ]
+
+
+def ordering_columns(ordering):
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+    return [field.lstrip("-") for field in ordering or ()]
+
+
+def project_serializer(serializer, names):
+    """Remove do serializer (ou do ``child`` de uma lista) os campos de fora."""
+    target = getattr(serializer, "child", serializer)
+    for name in list(target.fields):
+        if name not in names:
+            target.fields.pop(name)
+    return serializer
+
+
+def project_queryset(queryset, serializer, names, required=()):
+    """
+    ``queryset.only()`` com as colunas dos campos em ``names`` mais a chave
+    primária e ``required`` (ex.: as colunas da ordenação da paginação).
+    """
+    opts = queryset.model._meta
+    columns = {opts.pk.name, *required}
+    nested = set()
+    for name in names:
+        serializer_field = serializer.fields[name]
+        try:
+            field = opts.get_field(serializer_field.source)
+        except FieldDoesNotExist:
+            return queryset
+        if not field.concrete or field.many_to_many:
+            return queryset
+        columns.add(field.name)
+        if isinstance(serializer_field, BaseSerializer):
+            nested.add(field.name)
+
+    # O JOIN só se justifica para relações serializadas por completo; para
+    # devolver só a chave, a coluna do próprio modelo basta
+    related = queryset.query.select_related
+    if related is True:
+        return queryset
+    if related:
+        kept = [name for name in related if name in nested]
+        queryset = queryset.select_related(None)
+        if kept:
+            queryset = queryset.select_related(*kept)
+    return queryset.only(*columns)
+
+
+class SparseFieldsetMixin:
+    """
+    Aplica ``?fields=``/``?exclude=`` às leituras (métodos seguros) de um
+    ``GenericAPIView``: no queryset e no serializer. Escritas devolvem sempre o
+    objeto completo.
+    """
+
+    def get_projection(self):
+        if not hasattr(self, "_projection"):
+            self._projection = None
+            request = getattr(self, "request", None)
+            if request is not None and request.method in SAFE_METHODS:
+                self._projection = get_projection(
+                    request.query_params,
+                    list(self.get_serializer_class()().fields),
+                )
+        return self._projection
+
+    def get_projection_required_fields(self):
+        # A paginação por cursor lê as colunas da ordenação de cada página
+        if getattr(self, "detail", False):
+            return []
+        return ordering_columns(getattr(self.paginator, "ordering", None))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        names = self.get_projection()
+        if names is None:
+            return queryset
+        return project_queryset(
+            queryset,
+            self.get_serializer_class()(),
+            names,
+            self.get_projection_required_fields(),
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.get_projection()
+        if names is None:
+            return serializer
+        return project_serializer(serializer, names)
@@ -0,0 +1,48 @@
+"""
+Renderer JSON com orjson.
+
+Mesma saída do ``JSONRenderer`` do DRF (UTF-8, compacto, datas em ISO 8601
+com ``Z`` para UTC, ``\\u2028``/``\\u2029`` escapados), feita em C. Tipos que
+o orjson não conhece (``Decimal``, textos traduzíveis, ``timedelta``...)
+passam pelo encoder do DRF. Sem o orjson instalado, pedidos com ``indent`` ou
+com ``UNICODE_JSON = False``, o renderer volta ao ``json`` da biblioteca
+padrão.
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+_encoder = encoders.JSONEncoder()
+
+
+def dumps(data):
+    """Serializa ``data`` como o ``JSONRenderer`` compacto, em bytes."""
+    content = orjson.dumps(data, default=_encoder.default, option=OPTIONS)
+    for raw, escaped in LINE_SEPARATORS:
+        if raw in content:
+            content = content.replace(raw, escaped)
+    return content
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
@@ -0,0 +1,236 @@
+"""
+Esquema OpenAPI gerado uma vez e servido pronto.
+
+O ``SpectacularAPIView`` percorre todas as views, serializers e decorators
+``extend_schema`` a cada requisição, e o Swagger/Redoc pedem o esquema a cada
+abertura de página. ``CachedSchemaView`` gera cada formato (YAML/JSON) uma
+vez por processo — ou lê o arquivo gerado no build por
+``manage.py build_api_schema`` — e guarda o corpo, a versão gzip e um ETag do
+conteúdo. As respostas saem com ``Cache-Control`` longo; clientes com o ETag
+atual recebem 304.
+
+Os arquivos do build levam um resumo (sha256) do código-fonte das apps e da
+versão do drf-spectacular que os gerou; um arquivo de outro código (um
+``schema/`` antigo copiado junto com o projeto, por exemplo) é descartado e o
+esquema é gerado de novo.
+
+Com ``API_SCHEMA_AUTORELOAD`` (desenvolvimento) o esquema é refeito quando
+algum ``.py`` das apps do projeto muda; arquivos gerados no build são
+ignorados nesse modo.
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from drf_spectacular import __version__ as spectacular_version
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+# Formato -> renderer usado para gerar o arquivo (o tipo de conteúdo da
+# resposta continua sendo o do renderer negociado)
+RENDERERS = {"yaml": OpenApiYamlRenderer, "json": OpenApiJsonRenderer}
+
+
+def get_schema_dir():
+    return Path(getattr(settings, "API_SCHEMA_DIR", settings.BASE_DIR / "schema"))
+
+
+def schema_path(fmt, compressed=False):
+    return get_schema_dir() / f"openapi.{fmt}{'.gz' if compressed else ''}"
+
+
+def digest_path():
+    return get_schema_dir() / "openapi.source"
+
+
+def generate_schema(fmt, generator_class=None):
+    """Gera o esquema completo (público, sem requisição) no formato ``fmt``."""
+    generator_class = generator_class or spectacular_settings.DEFAULT_GENERATOR_CLASS
+    generator = generator_class(urlconf=spectacular_settings.SERVE_URLCONF)
+    data = generator.get_schema(request=None, public=True)
+    return RENDERERS[fmt]().render(data, renderer_context={})
+
+
+class SchemaArtifact:
+    """Corpo do esquema, versão gzip e ETags de cada uma."""
+
+    def __init__(self, body, compressed=None):
+        self.body = body
+        # mtime fixo: o mesmo conteúdo sempre gera os mesmos bytes
+        self.compressed = compressed or gzip.compress(body, mtime=0)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+    @classmethod
+    def load(cls, fmt, digest):
+        """
+        Artefato gravado por ``build_api_schema`` a partir do código com o
+        resumo ``digest``, ou ``None``.
+        """
+        try:
+            if digest_path().read_text().strip() != digest:
+                return None
+            body = schema_path(fmt).read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            compressed = schema_path(fmt, compressed=True).read_bytes()
+        except FileNotFoundError:
+            compressed = None
+        return cls(body, compressed)
+
+    def write(self, fmt):
+        get_schema_dir().mkdir(parents=True, exist_ok=True)
+        schema_path(fmt).write_bytes(self.body)
+        schema_path(fmt, compressed=True).write_bytes(self.compressed)
+
+
+def source_files():
+    """``.py`` das apps do projeto (e do URLconf), em ordem."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    roots = {
+        Path(config.path).resolve()
+        for config in apps.get_app_configs()
+        if Path(config.path).resolve().is_relative_to(base_dir)
+    }
+    roots.add(base_dir / settings.ROOT_URLCONF.split(".")[0])
+
+    paths = set()
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if name != "__pycache__"]
+            paths.update(
+                Path(dirpath, name) for name in filenames if name.endswith(".py")
+            )
+    return sorted(paths)
+
+
+def source_fingerprint():
+    """Maior mtime dos ``.py`` das apps do projeto (e do URLconf)."""
+    return max((os.stat(path).st_mtime for path in source_files()), default=0.0)
+
+
+def source_digest():
+    """Resumo do conteúdo dos ``.py`` das apps e da versão do drf-spectacular."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    digest = hashlib.sha256(spectacular_version.encode())
+    for path in source_files():
+        digest.update(str(path.relative_to(base_dir)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class SchemaStore:
+    """Artefatos por formato, gerados uma vez por processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._artifacts = {}
+        self._fingerprint = None
+        self._digest = None
+
+    @property
+    def autoreload(self):
+        return getattr(settings, "API_SCHEMA_AUTORELOAD", False)
+
+    def get(self, fmt):
+        if self.autoreload:
+            fingerprint = source_fingerprint()
+            if fingerprint != self._fingerprint:
+                with self._lock:
+                    self._artifacts.clear()
+                    self._fingerprint = fingerprint
+
+        artifact = self._artifacts.get(fmt)
+        if artifact is None:
+            with self._lock:
+                artifact = self._artifacts.get(fmt)
+                if artifact is None:
+                    if not self.autoreload:
+                        if self._digest is None:
+                            self._digest = source_digest()
+                        artifact = SchemaArtifact.load(fmt, self._digest)
+                    if artifact is None:
+                        artifact = SchemaArtifact(generate_schema(fmt))
+                    self._artifacts[fmt] = artifact
+        return artifact
+
+    def warm(self):
+        """Gera (ou carrega) todos os formatos; usado no aquecimento."""
+        for fmt in RENDERERS:
+            self.get(fmt)
+        return len(RENDERERS)
+
+    def clear(self):
+        with self._lock:
+            self._artifacts.clear()
+            self._fingerprint = None
+            self._digest = None
+
+
+schema_store = SchemaStore()
+
+
+# Mesmo critério do GZipMiddleware do Django
+ACCEPTS_GZIP_RE = re.compile(r"\bgzip\b")
+
+
+def accepts_gzip(request):
+    return bool(ACCEPTS_GZIP_RE.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """
+    ``SpectacularAPIView`` servido a partir de ``schema_store``. Pedidos com
+    ``?lang=`` ou ``?version=`` (e ``API_SCHEMA_CACHE`` desligado) seguem
+    pela geração por requisição.
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if (
+            not getattr(settings, "API_SCHEMA_CACHE", True)
+            or "lang" in request.GET
+            or "version" in request.GET
+        ):
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        artifact = schema_store.get(renderer.format)
+        compressed = accepts_gzip(request)
+        etag = artifact.gzip_etag if compressed else artifact.etag
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f"{content_type}; charset={renderer.charset}"
+            response = HttpResponse(
+                artifact.compressed if compressed else artifact.body,
+                content_type=content_type,
+            )
+            if compressed:
+                response["Content-Encoding"] = "gzip"
+            title = spectacular_settings.TITLE or "schema"
+            response["Content-Disposition"] = (
+                f'inline; filename="{title}.{renderer.format}"'
+            )
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+        if schema_store.autoreload:
+            response["Cache-Control"] = "no-cache"
+        else:
+            max_age = getattr(settings, "API_SCHEMA_MAX_AGE", 86400)
+            response["Cache-Control"] = f"public, max-age={max_age}"
+        return response
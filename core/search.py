@@ -0,0 +1,328 @@
+"""
+Busca textual indexada.
+
+Cada modelo registrado ganha uma tabela auxiliar ``<db_table>_fts`` mantida
+em dia pelos sinais de ``post_save``/``post_delete``:
+
+- SQLite (desenvolvimento): tabela virtual FTS5, ranqueada por ``bm25``;
+- PostgreSQL (produção): coluna ``tsvector`` com índice GIN, ranqueada por
+  ``ts_rank``.
+
+As views só conversam com ``get_backend()``; o motor fica escondido atrás de
+``index``/``remove``/``search``. ``search`` recebe o queryset já filtrado da
+view e o usa como subconsulta, para que os filtros valham antes da paginação.
+"""
+
+import re
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, migrations
+from django.db.models.signals import post_delete, post_save
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# modelo -> campos indexados, na ordem de relevância
+registry = {}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def index_table(model_or_table):
+    table = getattr(getattr(model_or_table, "_meta", None), "db_table", model_or_table)
+    return f"{table}_fts"
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query or "")[:16]
+
+
+def restrict_sql(queryset, connection):
+    """
+    ``(sql, params)`` da subconsulta com os ids de ``queryset``, compilada
+    para ``connection``; ``None`` quando o queryset não restringe nada.
+    """
+    if queryset is None or not queryset.query.where:
+        return None
+    query = queryset.order_by().values("pk").query
+    sql, params = query.get_compiler(connection=connection).as_sql()
+    return sql, list(params)
+
+
+class SQLiteSearchBackend:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def create_index(self, table, fields):
+        columns = ", ".join(fields)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index_table(table)} USING "
+                f"fts5({columns}, tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                f"INSERT INTO {index_table(table)} (rowid, {columns}) "
+                f"SELECT id, {columns} FROM {table}"
+            )
+
+    def drop_index(self, table):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {index_table(table)}")
+
+    def index(self, model, rows):
+        fields = registry[model]
+        columns = ", ".join(fields)
+        placeholders = ", ".join(["%s"] * (len(fields) + 1))
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {index_table(model)} (rowid, {columns}) "
+                f"VALUES ({placeholders})",
+                rows,
+            )
+
+    def remove(self, model, pks):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {index_table(model)} WHERE rowid = %s",
+                [(pk,) for pk in pks],
+            )
+
+    def search(self, model, query, offset, limit, within=None):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        try:
+            restriction = restrict_sql(within, self.connection)
+        except EmptyResultSet:
+            return []
+        match = " ".join('"%s"*' % token for token in tokens)
+        table = index_table(model)
+        where, params = f"{table} MATCH %s", [match]
+        if restriction:
+            where += f" AND rowid IN ({restriction[0]})"
+            params += restriction[1]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {table} WHERE {where} "
+                f"ORDER BY bm25({table}), rowid LIMIT %s OFFSET %s",
+                [*params, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    weights = "ABCD"
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.config = getattr(settings, "SEARCH_CONFIG", "portuguese")
+
+    def _document(self, fields):
+        return " || ".join(
+            f"setweight(to_tsvector('{self.config}', coalesce({field}, '')), "
+            f"'{self.weights[min(i, 3)]}')"
+            for i, field in enumerate(fields)
+        )
+
+    def create_index(self, table, fields):
+        name = index_table(table)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} "
+                f"(id bigint PRIMARY KEY, document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name}_document_gin "
+                f"ON {name} USING gin (document)"
+            )
+            cursor.execute(
+                f"INSERT INTO {name} (id, document) "
+                f"SELECT id, {self._document(fields)} FROM {table} "
+                f"ON CONFLICT (id) DO NOTHING"
+            )
+
+    def drop_index(self, table):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {index_table(table)}")
+
+    def index(self, model, rows):
+        fields = registry[model]
+        values = ", ".join(f"%s::text AS {field}" for field in fields)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {index_table(model)} (id, document) "
+                f"SELECT v.id, {self._document(fields)} "
+                f"FROM (SELECT %s::bigint AS id, {values}) v "
+                f"ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+    def remove(self, model, pks):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {index_table(model)} WHERE id = ANY(%s)", [list(pks)]
+            )
+
+    def search(self, model, query, offset, limit, within=None):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        try:
+            restriction = restrict_sql(within, self.connection)
+        except EmptyResultSet:
+            return []
+        tsquery = " & ".join(f"{token}:*" for token in tokens)
+        table = index_table(model)
+        where, params = "document @@ query", [tsquery]
+        if restriction:
+            where += f" AND {table}.id IN ({restriction[0]})"
+            params += restriction[1]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {table}.id FROM {table}, "
+                f"to_tsquery('{self.config}', %s) query "
+                f"WHERE {where} "
+                f"ORDER BY ts_rank(document, query) DESC, {table}.id "
+                f"LIMIT %s OFFSET %s",
+                [*params, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_backend(using="default"):
+    connection = connections[using]
+    try:
+        return BACKENDS[connection.vendor](connection)
+    except KeyError:
+        raise NotImplementedError(
+            f"Busca textual não suportada para o banco '{connection.vendor}'."
+        )
+
+
+def _rows(model, instances):
+    fields = registry[model]
+    return [
+        (obj.pk, *[getattr(obj, field) or "" for field in fields]) for obj in instances
+    ]
+
+
+def index_instances(model, instances, using="default"):
+    """Atualiza o índice de vários objetos (usado também após ``bulk_create``)."""
+    instances = [obj for obj in instances if obj.pk is not None]
+    if instances:
+        get_backend(using).index(model, _rows(model, instances))
+
+
+def _on_save(sender, instance, using, **kwargs):
+    index_instances(sender, [instance], using)
+
+
+def _on_delete(sender, instance, using, **kwargs):
+    get_backend(using).remove(sender, [instance.pk])
+
+
+def register(model, fields):
+    """Indexa ``fields`` de ``model`` e mantém o índice a cada escrita."""
+    registry[model] = tuple(fields)
+    post_save.connect(_on_save, sender=model, dispatch_uid=f"search-save-{model}")
+    post_delete.connect(_on_delete, sender=model, dispatch_uid=f"search-del-{model}")
+
+
+def create_index_operation(table, fields):
+    """Operação de migração que cria (e popula) o índice de ``table``."""
+
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor in BACKENDS:
+            get_backend(schema_editor.connection.alias).create_index(table, fields)
+
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.vendor in BACKENDS:
+            get_backend(schema_editor.connection.alias).drop_index(table)
+
+    return migrations.RunPython(forwards, backwards)
+
+
+SEARCH_PARAMETERS = [
+    OpenApiParameter(
+        "search",
+        OpenApiTypes.STR,
+        description="Busca textual (por prefixo), em ordem de relevância.",
+    ),
+    OpenApiParameter(
+        "page", OpenApiTypes.INT, description="Página dos resultados da busca."
+    ),
+]
+
+
+def get_page_params(query_params):
+    """``(page, page_size)`` da busca, com o tamanho limitado pelas settings."""
+    default = getattr(settings, "API_PAGE_SIZE", 50)
+    try:
+        page = max(1, int(query_params.get("page", 1)))
+        page_size = int(query_params.get("page_size", default))
+    except ValueError:
+        page, page_size = 1, default
+    return page, max(1, min(page_size, getattr(settings, "API_MAX_PAGE_SIZE", 200)))
+
+
+def page_link(request, page):
+    url = request.build_absolute_uri()
+    if page == 1:
+        return remove_query_param(url, "page")
+    return replace_query_param(url, "page", page)
+
+
+class FullTextSearchMixin:
+    """
+    Atende ``?search=`` na listagem com o índice textual, em ordem de
+    relevância e paginado por ``page``/``page_size``. Os demais filtros da
+    view restringem a busca no próprio banco, antes de ``LIMIT``/``OFFSET``.
+    """
+
+    search_param = "search"
+
+    def list(self, request, *args, **kwargs):
+        term = self.get_search_term(request)
+        if not term:
+            return super().list(request, *args, **kwargs)
+
+        page, page_size = get_page_params(request.query_params)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = self.search_ids(queryset, term, page, page_size)
+        rows = queryset.in_bulk(ids[:page_size])
+        return Response(self.search_page(request, ids, rows, page, page_size))
+
+    def get_search_term(self, request):
+        return request.query_params.get(self.search_param, "").strip()
+
+    def search_ids(self, queryset, term, page, page_size):
+        """Ids da página, em ordem de relevância, com um a mais que a página."""
+        return get_backend().search(
+            queryset.model,
+            term,
+            offset=(page - 1) * page_size,
+            limit=page_size + 1,
+            within=queryset,
+        )
+
+    def search_page(self, request, ids, rows, page, page_size):
+        """Corpo da página: ``rows`` (de ``in_bulk``) na ordem de ``ids``."""
+        has_next = len(ids) > page_size
+        ordered = [rows[pk] for pk in ids[:page_size] if pk in rows]
+        serializer = self.get_serializer(ordered, many=True)
+        return OrderedDict(
+            [
+                ("next", page_link(request, page + 1) if has_next else None),
+                ("previous", page_link(request, page - 1) if page > 1 else None),
+                ("results", serializer.data),
+            ]
+        )
@@ -13,8 +13,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import logging
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 # import sentry_sdk
 # from sentry_sdk.integrations.django import DjangoIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
@@ -27,6 +30,9 @@ load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# manage.py test ou pytest
+TESTING = sys.argv[1:2] == ["test"] or "pytest" in sys.modules
+
 
 sentry_logging = LoggingIntegration(
     level=logging.INFO,  # Captura info e acima
@@ -65,8 +71,11 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
+    # Comandos do projeto (ex.: build_api_schema)
+    "core",
     "professionals",
     "consultations",
+    "changes",
     "corsheaders",
     "drf_api_logger",
 ]
@@ -77,14 +86,14 @@ INSTALLED_APPS += [
 ]
 
 
+# JSON com orjson (core.renderers/core.parsers; sem o pacote, usa o json da
+# biblioteca padrão)
 REST_FRAMEWORK = {
-    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
-    "DEFAULT_PARSER_CLASSES": ("rest_framework.parsers.JSONParser",),
+    "DEFAULT_RENDERER_CLASSES": ("core.renderers.ORJSONRenderer",),
+    "DEFAULT_PARSER_CLASSES": ("core.parsers.ORJSONParser",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
-# REST_FRAMEWORK["DEFAULT_SCHEMA_CLASS"] = "drf_spectacular.openapi.AutoSchema"
-
 SPECTACULAR_SETTINGS = {
     "TITLE": "Lacrei Saúde API",
     "DESCRIPTION": "API RESTful para gerenciamento de profissionais e consultas médicas.",
@@ -103,22 +112,15 @@ SPECTACULAR_SETTINGS = {
     "REDOC_DIST": "SIDECAR",
 }
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": os.getenv("POSTGRES_DB", "lacreisaude"),
-        "USER": os.getenv("POSTGRES_USER", "postgres"),
-        "PASSWORD": os.getenv("POSTGRES_PASSWORD", "postgres"),
-        "HOST": os.getenv("POSTGRES_HOST", "localhost"),
-        "PORT": os.getenv("POSTGRES_PORT", "5432"),
-    }
-}
-
 MIDDLEWARE = [
+    # Primeiro: o id da requisição vale para os logs de todos os outros
+    "core.logs.RequestIDMiddleware",
+    "core.instrumentation.InstrumentationMiddleware",
+    "core.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
-    "drf_api_logger.middleware.api_logger_middleware.APILoggerMiddleware",
+    "core.api_logging.APILoggingMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -126,6 +128,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Não liga o registro do drf_api_logger: o middleware da biblioteca não está em
+# MIDDLEWARE e quem grava é core.api_logging.APILoggingMiddleware. A opção fica
+# porque só com ela a biblioteca define o modelo APILogsModel (tabela
+# drf_api_logs, migrações e admin) em que core.api_logging grava; a thread que
+# a biblioteca sobe com ela nunca recebe registros.
 DRF_API_LOGGER_DATABASE = True
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -180,23 +187,99 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DB_ENGINE: "sqlite" (padrão, desenvolvimento) ou "postgres".
+# DB_CONN_STRATEGY escolhe como as conexões são reaproveitadas:
+#   - "none": uma conexão nova por requisição;
+#   - "persistent": a conexão fica aberta por DB_CONN_MAX_AGE segundos e é
+#     testada antes de ser reutilizada (não use sob ASGI: lá cada requisição
+#     tem a sua thread, prefira o pool);
+#   - "pool": pool nativo do Django 5.1+ (só Postgres, com o psycopg 3 e o
+#     extra "pool" das dependências), com DB_POOL_MIN_SIZE/DB_POOL_MAX_SIZE
+#     conexões.
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+DB_CONN_STRATEGY = os.getenv("DB_CONN_STRATEGY", "persistent")
+
+
+def database_config(host=None, name=None):
+    if DB_ENGINE == "postgres":
+        config = {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB", "lacreisaude"),
+            "USER": os.getenv("POSTGRES_USER", "postgres"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", "postgres"),
+            "HOST": host or os.getenv("POSTGRES_HOST", "localhost"),
+            "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        }
+    elif DB_ENGINE == "sqlite":
+        config = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": name or BASE_DIR / "db.sqlite3",
+        }
+    else:
+        raise ImproperlyConfigured(f"DB_ENGINE inválido: {DB_ENGINE!r}")
+
+    if DB_CONN_STRATEGY == "persistent":
+        config["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+        config["CONN_HEALTH_CHECKS"] = True
+    elif DB_CONN_STRATEGY == "pool":
+        if DB_ENGINE != "postgres":
+            raise ImproperlyConfigured("DB_CONN_STRATEGY=pool exige DB_ENGINE=postgres")
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            }
+        }
+    elif DB_CONN_STRATEGY != "none":
+        raise ImproperlyConfigured(f"DB_CONN_STRATEGY inválido: {DB_CONN_STRATEGY!r}")
+    return config
+
+
+DATABASES = {"default": database_config()}
+
+# Réplica de leitura: os GETs de ProfessionalViewSet e ConsultationViewSet (e
+# das leituras assíncronas) vão para ela (core.db_routers). Em Postgres, defina
+# POSTGRES_REPLICA_HOST; em SQLite, DB_REPLICA_NAME com o caminho de uma cópia
+# do banco. Nos testes a réplica espelha o "default".
+DB_REPLICA_ALIAS = "replica"
+DB_REPLICA_HOST = os.getenv("POSTGRES_REPLICA_HOST")
+DB_REPLICA_NAME = os.getenv("DB_REPLICA_NAME")
+if DB_REPLICA_HOST if DB_ENGINE == "postgres" else DB_REPLICA_NAME:
+    DATABASES[DB_REPLICA_ALIAS] = {
+        **database_config(host=DB_REPLICA_HOST, name=DB_REPLICA_NAME),
+        "TEST": {"MIRROR": "default"},
     }
-}
 
-# DATABASES = {
-#     "default": {
-#         "ENGINE": "django.db.backends.postgresql",
-#         "NAME": os.getenv("POSTGRES_DB"),
-#         "USER": os.getenv("POSTGRES_USER"),
-#         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
-#         "HOST": os.getenv("POSTGRES_HOST", "db"),
-#         "PORT": os.getenv("POSTGRES_PORT", "5432"),
-#     }
-# }
+DATABASE_ROUTERS = ["core.db_routers.ReadReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# As invalidações (versões do VersionedCache, situação dos usuários do JWT)
+# precisam ser vistas por todos os workers: sem REDIS_URL o gunicorn sobe um só
+# worker (core.caching.allowed_workers). O LocMemCache fica para
+# desenvolvimento, testes e execuções com um só processo.
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "lacrei-api",
+        }
+    }
+
+# Tempo (s) das respostas de leitura de profissionais em cache
+PROFESSIONAL_CACHE_TIMEOUT = int(os.getenv("PROFESSIONAL_CACHE_TIMEOUT", "300"))
 
 
 # Password validation
@@ -241,12 +324,61 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
-REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
-    "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
-}
+# Acrescenta ao dicionário acima (antes ele era substituído por inteiro e os
+# renderers/parsers e o esquema do drf-spectacular não tinham efeito)
+REST_FRAMEWORK.update(
+    {
+        "DEFAULT_AUTHENTICATION_CLASSES": (
+            "core.authentication.CachedJWTAuthentication",
+        ),
+        "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    }
+)
+
+# Esquema OpenAPI (core.schema): gerado uma vez por processo, ou lido do arquivo
+# gravado no build por "manage.py build_api_schema". Em desenvolvimento,
+# API_SCHEMA_AUTORELOAD=True refaz o esquema quando o código muda.
+API_SCHEMA_CACHE = os.getenv("API_SCHEMA_CACHE", "True") == "True"
+API_SCHEMA_AUTORELOAD = os.getenv("API_SCHEMA_AUTORELOAD", "False") == "True"
+API_SCHEMA_DIR = Path(os.getenv("API_SCHEMA_DIR", BASE_DIR / "schema"))
+API_SCHEMA_MAX_AGE = int(os.getenv("API_SCHEMA_MAX_AGE", "86400"))
+
+# Paginação por cursor das listagens (padrão e limite superior de ?page_size=)
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "200"))
+
+# Tamanho máximo de um lote em POST /api/consultations/bulk/
+CONSULTATION_BULK_MAX_ITEMS = int(os.getenv("CONSULTATION_BULK_MAX_ITEMS", "500"))
+
+# Consultas mais antigas que N dias vão para a tabela de arquivo
+# (manage.py archive_consultations), em lotes de CONSULTATION_ARCHIVE_BATCH_SIZE
+CONSULTATION_ARCHIVE_AFTER_DAYS = int(
+    os.getenv("CONSULTATION_ARCHIVE_AFTER_DAYS", "365")
+)
+CONSULTATION_ARCHIVE_BATCH_SIZE = int(
+    os.getenv("CONSULTATION_ARCHIVE_BATCH_SIZE", "1000")
+)
+
+# Agenda: duração padrão de uma consulta e expediente usado na busca de horários livres
+CONSULTATION_DEFAULT_DURATION_MINUTES = int(
+    os.getenv("CONSULTATION_DEFAULT_DURATION_MINUTES", "30")
+)
+# Maior duração aceita; limita a busca por sobreposições (só deve aumentar)
+CONSULTATION_MAX_DURATION_MINUTES = int(
+    os.getenv("CONSULTATION_MAX_DURATION_MINUTES", "480")
+)
+AVAILABILITY_DAY_START = os.getenv("AVAILABILITY_DAY_START", "08:00")
+AVAILABILITY_DAY_END = os.getenv("AVAILABILITY_DAY_END", "18:00")
+AVAILABILITY_MAX_DAYS = 31
+AVAILABILITY_MAX_PROFESSIONALS = 50
+AVAILABILITY_CACHE_TIMEOUT = int(os.getenv("AVAILABILITY_CACHE_TIMEOUT", "600"))
+
+# Linhas por bloco na importação/exportação de profissionais
+PROFESSIONAL_BULK_CHUNK_SIZE = int(os.getenv("PROFESSIONAL_BULK_CHUNK_SIZE", "1000"))
+
+# Feed de alterações (/api/changes/): só entrega alterações gravadas há mais de
+# N segundos, para que nenhuma de id menor ainda esteja para ser confirmada
+CHANGE_FEED_SETTLE_SECONDS = int(os.getenv("CHANGE_FEED_SETTLE_SECONDS", "5"))
 
 
 SIMPLE_JWT = {
@@ -255,25 +387,90 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
-
-DRF_LOGGER_SIGNAL = True
-DRF_LOGGER_QUEUE_MAX_SIZE = 50
-DRF_LOGGER_INTERVAL = 10
-DRF_LOGGER_TIMEDELTA = 60
-DRF_LOGGER_PATH_TYPE = "ABSOLUTE"
-DRF_LOGGER_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
-DRF_LOGGER_EXCLUDE_PATHS = [
+# Cache de tokens JWT já verificados (por processo) e da situação dos usuários.
+# Com um cache local (sem REDIS_URL) a invalidação de um usuário desativado ou
+# removido não chega aos outros processos: lá a situação vale só
+# JWT_USER_CACHE_LOCAL_TIMEOUT segundos.
+JWT_CACHE_MAX_SIZE = int(os.getenv("JWT_CACHE_MAX_SIZE", "10000"))
+JWT_USER_CACHE_TIMEOUT = int(os.getenv("JWT_USER_CACHE_TIMEOUT", "300"))
+JWT_USER_CACHE_LOCAL_TIMEOUT = int(os.getenv("JWT_USER_CACHE_LOCAL_TIMEOUT", "5"))
+
+
+# Registro de requisições (core.api_logging): fila em memória + gravação em lote
+# na tabela do drf_api_logger, fora do caminho da requisição.
+API_LOG_ENABLED = os.getenv("API_LOG_ENABLED", "True") == "True"
+API_LOG_QUEUE_SIZE = int(os.getenv("API_LOG_QUEUE_SIZE", "10000"))
+API_LOG_BATCH_SIZE = int(os.getenv("API_LOG_BATCH_SIZE", "200"))
+API_LOG_FLUSH_INTERVAL = float(os.getenv("API_LOG_FLUSH_INTERVAL", "2"))
+# Sem a thread de gravação nos testes: ela gravaria fora da transação de cada
+# TestCase e os registros vazariam de um teste para outro
+API_LOG_WRITER_THREAD = os.getenv("API_LOG_WRITER_THREAD", str(not TESTING)) == "True"
+API_LOG_SAMPLE_RATE = float(os.getenv("API_LOG_SAMPLE_RATE", "1.0"))
+# Regras por prefixo/método; a primeira que casar define a taxa
+API_LOG_SAMPLING = [
+    # {"path": "/api/professionals/", "method": "GET", "rate": 0.1},
+]
+API_LOG_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+API_LOG_EXCLUDE_PATHS = [
     "/admin",
     "/swagger",
     "/healthcheck",
+    "/api/docs",
+    "/api/schema",
+    "/metrics",
 ]
+API_LOG_MAX_BODY_SIZE = 32768
+# Retenção da tabela drf_api_logs (manage.py prune_api_logs)
+API_LOG_RETENTION_DAYS = int(os.getenv("API_LOG_RETENTION_DAYS", "30"))
+API_LOG_PRUNE_BATCH_SIZE = int(os.getenv("API_LOG_PRUNE_BATCH_SIZE", "5000"))
+
+# Instrumentação por requisição (core.instrumentation): consultas SQL, tempo no
+# banco e de renderização no cabeçalho Server-Timing e em histogramas por rota.
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "True") == "True"
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "True") == "True"
+# Máximo de consultas por rota ("<rota>" ou "<MÉTODO> <rota>", com o nome da
+# rota do router); acima disso, aviso no log
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "20"))
+QUERY_BUDGETS = {
+    "GET professional-list": 3,
+    "GET professional-detail": 2,
+    "GET consultation-list": 3,
+    "GET consultation-detail": 2,
+    "GET consultation-by_professional": 3,
+}
+# Repetições do mesmo SQL numa requisição que caracterizam um N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+# Métricas Prometheus em /metrics (core.metrics). Com vários workers, aponte
+# METRICS_MULTIPROC_DIR para um diretório compartilhado e vazio a cada deploy.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+# Se definido, /metrics exige "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Logs (core.logs): os loggers só enfileiram; uma thread por processo formata
+# (JSON por linha, com o id da requisição) e grava no console e em arquivo.
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json ou verbose
+# Vazio: só console (o padrão sob o gunicorn, ver gunicorn.conf.py)
+LOG_FILE = os.getenv("LOG_FILE", os.path.join(BASE_DIR, "logs/app.log"))
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_FILE_BACKUP_COUNT = int(os.getenv("LOG_FILE_BACKUP_COUNT", "5"))
+# Um arquivo por processo (app.<pid>.log): workers não disputam a rotação, mas
+# cada worker reciclado deixa os seus arquivos para trás
+LOG_FILE_PER_PROCESS = os.getenv("LOG_FILE_PER_PROCESS", "False") == "True"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
 
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {
+        "request_id": {"()": "core.logs.RequestIDFilter"},
+    },
     "formatters": {
+        "json": {"()": "core.logs.JSONFormatter"},
         "verbose": {
-            "format": "[{levelname}] {asctime} {name}: {message}",
+            "format": "[{levelname}] {asctime} {request_id} {name}: {message}",
             "style": "{",
         },
         "simple": {
@@ -282,29 +479,35 @@ LOGGING = {
         },
     },
     "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "verbose",
-        },
-        "file": {
-            "class": "logging.FileHandler",
-            "filename": os.path.join(BASE_DIR, "logs/app.log"),
-            "formatter": "verbose",
+        "queue": {
+            "()": "core.logs.QueueLogHandler",
+            "filename": LOG_FILE or None,
+            "max_bytes": LOG_FILE_MAX_BYTES,
+            "backup_count": LOG_FILE_BACKUP_COUNT,
+            "per_process": LOG_FILE_PER_PROCESS,
+            "queue_size": LOG_QUEUE_SIZE,
+            "formatter": LOG_FORMAT,
+            "filters": ["request_id"],
         },
     },
     "loggers": {
         "django": {
-            "handlers": ["console", "file"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": True,
         },
         "django.request": {
-            "handlers": ["console", "file"],
+            "handlers": ["queue"],
             "level": "ERROR",
             "propagate": False,
         },
         "drf_logger": {
-            "handlers": ["console", "file"],
+            "handlers": ["queue"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "core": {
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False,
         },
@@ -0,0 +1,138 @@
+import os
+import queue
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.http import JsonResponse
+from drf_api_logger.models import APILogsModel
+
+from core.api_logging import APILoggingMiddleware, APILogWriter, get_sample_rate
+
+
+@override_settings(API_LOG_ENABLED=True)
+class APILogWriterTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.writer = APILogWriter()
+        # Fila pequena e sem thread: a gravação é disparada pelo próprio teste,
+        # dentro da transação do TestCase
+        self.writer._pid = os.getpid()
+        self.writer._thread = mock.Mock()
+        self.writer._queue = queue.Queue(maxsize=2)
+
+    def _call(self, request, response=None):
+        middleware = APILoggingMiddleware(
+            lambda req: response or JsonResponse({"ok": True})
+        )
+        with mock.patch("core.api_logging.writer", self.writer):
+            return middleware(request)
+
+    def test_entries_are_queued_and_written_in_batch(self):
+        request = self.factory.post(
+            "/api/log-test/",
+            {"username": "a", "password": "segredo"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer abc",
+        )
+        self._call(request)
+        logs = APILogsModel.objects.filter(api__endswith="/api/log-test/")
+        self.assertFalse(logs.exists())
+
+        self.writer.write(self.writer.drain())
+        log = logs.get()
+        self.assertEqual(log.method, "POST")
+        self.assertEqual(log.status_code, 200)
+        self.assertNotIn("segredo", log.body)
+        self.assertNotIn("Bearer abc", log.headers)
+
+    def test_sensitive_query_params_are_masked(self):
+        self._call(self.factory.get("/api/feed.ics", {"token": "segredo", "a": "1"}))
+        (entry,) = self.writer.drain()
+        self.assertNotIn("segredo", entry["api"])
+        self.assertTrue(entry["api"].endswith("?token=***FILTERED***&a=1"))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        for _ in range(3):
+            self._call(self.factory.get("/api/professionals/"))
+        self.assertEqual(self.writer.stats()["dropped"], 1)
+        self.assertEqual(len(self.writer.drain()), 2)
+
+    @override_settings(API_LOG_EXCLUDE_PATHS=["/admin"])
+    def test_excluded_paths_are_not_logged(self):
+        self._call(self.factory.get("/admin/login/"))
+        self.assertEqual(self.writer.drain(), [])
+
+    @override_settings(
+        API_LOG_SAMPLE_RATE=1.0,
+        API_LOG_SAMPLING=[{"path": "/api/professionals/", "method": "GET", "rate": 0}],
+    )
+    def test_sampling_rules_keep_server_errors(self):
+        self.assertEqual(get_sample_rate("/api/professionals/1/", "GET"), 0)
+        self.assertEqual(get_sample_rate("/api/professionals/1/", "POST"), 1.0)
+
+        self._call(self.factory.get("/api/professionals/"))
+        self.assertEqual(self.writer.drain(), [])
+
+        error = JsonResponse({"detail": "erro"}, status=500)
+        self._call(self.factory.get("/api/professionals/"), error)
+        self.assertEqual(len(self.writer.drain()), 1)
+
+    @override_settings(API_LOG_WRITER_THREAD=False)
+    def test_writer_thread_can_be_disabled(self):
+        writer = APILogWriter()
+        middleware = APILoggingMiddleware(lambda req: JsonResponse({"ok": True}))
+        with mock.patch("core.api_logging.writer", writer):
+            middleware(self.factory.get("/api/log-queued/"))
+
+        self.assertIsNone(writer._thread)
+        self.assertEqual(len(writer.drain()), 1)
+        self.assertFalse(
+            APILogsModel.objects.filter(api__endswith="/api/log-queued/").exists()
+        )
+
+
+class APILogSettingsTest(SimpleTestCase):
+    def test_only_the_project_middleware_logs_requests(self):
+        self.assertIn("core.api_logging.APILoggingMiddleware", settings.MIDDLEWARE)
+        self.assertFalse(
+            [name for name in settings.MIDDLEWARE if name.startswith("drf_api_logger")]
+        )
+        # Sem DRF_API_LOGGER_DATABASE a biblioteca não define o modelo
+        self.assertEqual(APILogsModel._meta.db_table, "drf_api_logs")
+
+
+class PruneAPILogsTest(TestCase):
+    def test_prunes_expired_logs_in_batches(self):
+        from datetime import timedelta
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        now = timezone.now()
+        # Fora de ordem, como quando workers diferentes gravam os seus lotes:
+        # o registro mais baixo ainda está na retenção
+        ages = [29, 40, 1, 35, 31]
+        for days in ages:
+            APILogsModel.objects.create(
+                api="/api/professionals/",
+                headers="{}",
+                body="",
+                method="GET",
+                client_ip_address="127.0.0.1",
+                response="",
+                status_code=200,
+                execution_time=0.01,
+                added_on=now - timedelta(days=days),
+            )
+
+        out = StringIO()
+        call_command("prune_api_logs", days=30, batch_size=2, stdout=out)
+        self.assertIn("3 registros", out.getvalue())
+        remaining = sorted(
+            (now - added_on).days
+            for added_on in APILogsModel.objects.values_list("added_on", flat=True)
+        )
+        self.assertEqual(remaining, [1, 29])
@@ -1,7 +1,22 @@
+from datetime import timedelta
+from unittest import mock
+
 from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from core.authentication import (
+    _user_cache_timeout,
+    _user_state_key,
+    token_cache,
+)
 
 
 class JWTAuthTest(APITestCase):
@@ -39,3 +54,80 @@ class JWTAuthTest(APITestCase):
             format="json",
         )
         self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+
+
+class CachedJWTAuthenticationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.professionals_url = reverse("professional-list")
+
+    def test_warm_request_does_not_touch_user_table(self):
+        self.client.get(self.professionals_url)
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(self.professionals_url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertFalse(any("auth_user" in q["sql"] for q in ctx.captured_queries))
+
+    def test_deleted_user_is_rejected_after_warm_up(self):
+        self.client.get(self.professionals_url)
+        self.user.delete()
+        r = self.client.get(self.professionals_url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user_is_rejected_after_warm_up(self):
+        self.client.get(self.professionals_url)
+        self.user.is_active = False
+        self.user.save()
+        r = self.client.get(self.professionals_url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_state_cached_before_commit_is_dropped_on_commit(self):
+        self.client.get(self.professionals_url)
+        stale = cache.get(_user_state_key(self.user.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # Leitura concorrente que ainda via o usuário ativo
+            cache.set(_user_state_key(self.user.pk), stale)
+        r = self.client.get(self.professionals_url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(JWT_USER_CACHE_TIMEOUT=300, JWT_USER_CACHE_LOCAL_TIMEOUT=5)
+    def test_local_cache_keeps_user_state_briefly(self):
+        self.assertEqual(_user_cache_timeout(), 5)
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(_user_cache_timeout(), 300)
+
+    def test_token_with_same_jti_and_bad_signature_is_rejected(self):
+        self.client.get(self.professionals_url)
+        header, payload, signature = self.token.split(".")
+        forged = f"{header}.{payload}.{signature[::-1]}"
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {forged}")
+        r = self.client.get(self.professionals_url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token_is_rejected_even_when_cached(self):
+        self.client.get(self.professionals_url)
+        later = aware_utcnow() + timedelta(days=1)
+        with mock.patch("core.authentication.aware_utcnow", return_value=later):
+            r = self.client.get(self.professionals_url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(JWT_CACHE_MAX_SIZE=2)
+    def test_cache_is_bounded(self):
+        for _ in range(4):
+            token = RefreshToken.for_user(self.user).access_token
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.client.get(self.professionals_url)
+        self.assertEqual(token_cache.stats()["size"], 2)
+
+    def test_admin_endpoint_loads_user_from_database(self):
+        url = reverse("professional-cache_stats")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
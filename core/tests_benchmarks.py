@@ -0,0 +1,47 @@
+from django.test import SimpleTestCase
+
+from benchmarks.run import compare, discover_routes, percentile
+
+
+def _report(**routes):
+    return {
+        "routes": {
+            name: {"queries": queries, "p95_ms": p95}
+            for name, (queries, p95) in routes.items()
+        }
+    }
+
+
+class BenchmarkReportTest(SimpleTestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_compare_flags_more_queries(self):
+        regressions = compare(
+            _report(**{"professional-list": (3, 10.0)}),
+            _report(**{"professional-list": (1, 10.0)}),
+        )
+        self.assertEqual(regressions, ["professional-list: consultas 1 -> 3"])
+
+    def test_compare_flags_slower_p95_above_tolerance(self):
+        baseline = _report(**{"consultation-list": (1, 10.0)})
+        self.assertEqual(
+            compare(_report(**{"consultation-list": (1, 11.5)}), baseline), []
+        )
+        self.assertEqual(
+            len(compare(_report(**{"consultation-list": (1, 13.0)}), baseline)), 1
+        )
+
+    def test_compare_ignores_new_routes_and_noise(self):
+        baseline = _report(**{"api-root": (1, 0.5)})
+        current = _report(**{"api-root": (1, 0.9), "consultation-list": (9, 50.0)})
+        self.assertEqual(compare(current, baseline), [])
+
+    def test_discover_routes_skips_admin_and_format_suffixes(self):
+        routes = dict(discover_routes())
+        self.assertEqual(routes["professional-detail"], ["pk"])
+        self.assertIn("consultation-list", routes)
+        self.assertFalse(any(name.startswith("admin") for name in routes))
@@ -0,0 +1,115 @@
+import warnings
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.db_routers import ReadReplicaRouter, read_from_replica
+from professionals.models import Professional
+
+
+class ReplicaTestMixin:
+    """
+    Declara o alias ``replica`` apontando para a mesma conexão do
+    ``default``: o roteamento é exercitado de ponta a ponta sem um segundo
+    banco.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with warnings.catch_warnings():
+            # O Django avisa que sobrescrever DATABASES não recria conexões
+            warnings.simplefilter("ignore")
+            override = override_settings(
+                DATABASES={
+                    **settings.DATABASES,
+                    "replica": settings.DATABASES["default"],
+                }
+            )
+            override.enable()
+        self.addCleanup(override.disable)
+        connections["replica"] = connections["default"]
+        self.addCleanup(delattr, connections._connections, "replica")
+
+
+class ReadReplicaRouterTest(ReplicaTestMixin, TestCase):
+    def test_reads_go_to_replica_only_inside_context(self):
+        self.assertEqual(Professional.objects.all().db, "default")
+        with read_from_replica():
+            self.assertEqual(Professional.objects.all().db, "replica")
+            self.assertEqual(Professional.objects.db_manager().db, "replica")
+        self.assertEqual(Professional.objects.all().db, "default")
+
+    def test_writes_always_go_to_default(self):
+        with read_from_replica():
+            professional = Professional.objects.create(
+                name_social="Ana", profession="Psicóloga"
+            )
+        self.assertEqual(professional._state.db, "default")
+
+    def test_relations_between_default_and_replica(self):
+        professional = Professional.objects.create(
+            name_social="Ana", profession="Psicóloga"
+        )
+        with read_from_replica():
+            replica_copy = Professional.objects.get(pk=professional.pk)
+        self.assertEqual(replica_copy._state.db, "replica")
+        self.assertTrue(ReadReplicaRouter().allow_relation(professional, replica_copy))
+
+    @override_settings(DB_REPLICA_ALIAS="missing")
+    def test_without_replica_reads_stay_on_default(self):
+        with read_from_replica():
+            self.assertEqual(Professional.objects.all().db, "default")
+
+
+class ReplicaReadMixinTest(ReplicaTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.professional = Professional.objects.create(
+            name_social="Ana", profession="Psicóloga"
+        )
+
+    def routed_reads(self, method, url, **kwargs):
+        aliases = []
+        original = ReadReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            alias = original(router, model, **hints)
+            aliases.append(alias)
+            return alias
+
+        with mock.patch.object(ReadReplicaRouter, "db_for_read", spy):
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, aliases
+
+    def test_viewset_gets_read_from_replica(self):
+        for url in (
+            reverse("professional-detail", args=[self.professional.pk]),
+            reverse("consultation-list"),
+        ):
+            response, aliases = self.routed_reads("get", url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(aliases)
+            self.assertEqual(set(aliases), {"replica"}, url)
+
+    def test_viewset_writes_read_from_default(self):
+        url = reverse("professional-detail", args=[self.professional.pk])
+        response, aliases = self.routed_reads(
+            "patch", url, data={"profession": "Psicanalista"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("replica", aliases)
+
+    def test_async_reads_use_replica(self):
+        url = reverse("async-professional-detail", args=[self.professional.pk])
+        response, aliases = self.routed_reads("get", url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("replica", aliases)
@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.instrumentation import Histogram, QueryStats, histograms
+from professionals.models import Professional
+
+
+class InstrumentationMiddlewareTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        histograms.reset()
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        Professional.objects.create(name_social="Alex", profession="Psicólogo")
+        self.url = reverse("professional-list")
+
+    def test_server_timing_header(self):
+        r = self.client.get(self.url)
+        timing = r["Server-Timing"]
+        for metric in ("db;dur=", "render;dur=", "app;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+        stats = r.wsgi_request.query_stats
+        self.assertIn(f'desc="{stats.count} queries"', timing)
+        self.assertGreater(stats.count, 0)
+        self.assertGreater(stats.render, 0)
+
+    def test_records_histograms_per_route(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        snapshot = histograms.snapshot()["professional-list"]
+        self.assertEqual(snapshot["duration_ms"]["count"], 2)
+        self.assertEqual(snapshot["queries"]["buckets"]["+Inf"], 2)
+
+    @override_settings(QUERY_BUDGETS={"GET professional-list": 0})
+    def test_warns_when_route_exceeds_query_budget(self):
+        with self.assertLogs("core.instrumentation", "WARNING") as logs:
+            self.client.get(self.url)
+        self.assertIn("GET professional-list", logs.output[0])
+        self.assertIn("orçamento: 0", logs.output[0])
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_header_can_be_disabled(self):
+        self.assertNotIn("Server-Timing", self.client.get(self.url))
+
+
+class QueryStatsTest(SimpleTestCase):
+    def test_counts_duplicates_and_repeated_statements(self):
+        stats = QueryStats()
+
+        def execute(sql, params, many, context):
+            return None
+
+        for pk in range(6):
+            stats(execute, "SELECT * FROM t WHERE id = %s", (pk,), False, {})
+        stats(execute, "SELECT 1", (), False, {})
+
+        self.assertEqual(stats.count, 7)
+        self.assertEqual(stats.duplicates, 5)
+        self.assertEqual(stats.repeated(5), [("SELECT * FROM t WHERE id = %s", 6)])
+        self.assertEqual(stats.repeated(7), [])
+
+    def test_histogram_buckets_are_cumulative(self):
+        h = Histogram((10, 100, float("inf")))
+        for value in (5, 50, 500):
+            h.observe(value)
+        snap = h.snapshot()
+        self.assertEqual(snap["buckets"], {"10": 1, "100": 2, "+Inf": 3})
+        self.assertEqual(snap["sum"], 555)
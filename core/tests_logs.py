@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core import logs
+from core.logs import (
+    JSONFormatter,
+    QueueLogHandler,
+    RequestIDFilter,
+    RequestIDMiddleware,
+    get_request_id,
+)
+
+
+class QueueLogHandlerTest(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "logs", "app.log")
+
+        self.logger = logging.getLogger("core.tests_logs")
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, "propagate", True)
+
+    def attach(self, **kwargs):
+        handler = QueueLogHandler(filename=self.path, console=False, **kwargs)
+        handler.setFormatter(JSONFormatter())
+        handler.addFilter(RequestIDFilter())
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        self.addCleanup(handler.close)
+        return handler
+
+    def lines(self):
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_writes_json_lines_from_background_thread(self):
+        handler = self.attach()
+        writers = []
+        target_emit = logging.FileHandler.emit
+
+        def emit(target, record):
+            writers.append(threading.current_thread())
+            target_emit(target, record)
+
+        with mock.patch.object(logging.FileHandler, "emit", emit):
+            self.logger.warning("consulta %s", 42, extra={"professional": 7})
+            try:
+                raise ValueError("falhou")
+            except ValueError:
+                self.logger.exception("erro")
+            handler.stop()
+
+        first, second = self.lines()
+        self.assertEqual(first["message"], "consulta 42")
+        self.assertEqual(first["level"], "WARNING")
+        self.assertEqual(first["logger"], "core.tests_logs")
+        self.assertEqual(first["professional"], 7)
+        self.assertIsNone(first["request_id"])
+        self.assertTrue(first["time"].endswith("Z"))
+        self.assertIn("ValueError: falhou", second["exc_info"])
+        self.assertNotIn(threading.current_thread(), writers)
+
+    def test_message_is_resolved_when_logged(self):
+        handler = self.attach()
+        data = {"status": "antes"}
+        self.logger.warning("dados %s", data)
+        data["status"] = "depois"
+        handler.stop()
+        self.assertEqual(self.lines()[0]["message"], "dados {'status': 'antes'}")
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = self.attach(queue_size=1)
+        handler._ensure_started()
+        # Sem a thread de escrita consumindo, só cabe um registro na fila
+        handler.listener.stop()
+        handler.listener = None
+        for i in range(3):
+            self.logger.warning("linha %d", i)
+        self.assertEqual(handler.stats()["dropped"], 2)
+        self.assertEqual(handler.stats()["pending"], 1)
+
+    def test_per_process_file(self):
+        handler = self.attach(per_process=True)
+        self.logger.warning("oi")
+        handler.stop()
+        root, ext = os.path.splitext(self.path)
+        self.assertTrue(os.path.exists(f"{root}.{os.getpid()}{ext}"))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_rotates_by_size(self):
+        handler = self.attach(max_bytes=300, backup_count=2)
+        for i in range(10):
+            self.logger.warning("linha %d", i)
+        handler.stop()
+        self.assertTrue(os.path.exists(f"{self.path}.1"))
+        self.assertLessEqual(os.path.getsize(self.path), 300)
+
+    def test_shutdown_stops_all_handlers(self):
+        handler = QueueLogHandler(console=False)
+        handler._ensure_started()
+        logs.shutdown()
+        self.assertIsNone(handler.listener)
+
+
+class RequestIDMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(get_request_id())
+            return HttpResponse()
+
+        self.middleware = RequestIDMiddleware(view)
+
+    def test_generates_and_returns_request_id(self):
+        response = self.middleware(self.factory.get("/"))
+        self.assertEqual(len(response["X-Request-ID"]), 32)
+        self.assertEqual(self.seen, [response["X-Request-ID"]])
+        self.assertIsNone(get_request_id())
+
+    def test_propagates_received_request_id(self):
+        request = self.factory.get("/", HTTP_X_REQUEST_ID="abc-123")
+        response = self.middleware(request)
+        self.assertEqual(response["X-Request-ID"], "abc-123")
+        self.assertEqual(self.seen, ["abc-123"])
+
+    def test_replaces_invalid_request_id(self):
+        request = self.factory.get("/", HTTP_X_REQUEST_ID="a\nb")
+        response = self.middleware(request)
+        self.assertNotEqual(response["X-Request-ID"], "a\nb")
+
+    def test_request_id_reaches_log_records(self):
+        record = logging.makeLogRecord({"msg": "x"})
+
+        def view(request):
+            RequestIDFilter().filter(record)
+            return HttpResponse()
+
+        response = RequestIDMiddleware(view)(self.factory.get("/"))
+        self.assertEqual(record.request_id, response["X-Request-ID"])
+        self.assertEqual(
+            json.loads(JSONFormatter().format(record))["request_id"],
+            response["X-Request-ID"],
+        )
+
+    def test_response_header_on_api(self):
+        response = self.client.get("/api/professionals/")
+        self.assertTrue(response["X-Request-ID"])
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core import metrics
+
+
+class MetricsEndpointTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.store.reset()
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def _scrape(self, **extra):
+        r = self.client.get(reverse("metrics"), **extra)
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return r.content.decode()
+
+    def test_counts_requests_by_router_name(self):
+        self.client.get(reverse("professional-list"))
+        self.client.get(reverse("professional-list"))
+        self.client.get(reverse("consultation-detail", args=[9999]))
+        body = self._scrape()
+
+        self.assertIn(
+            'http_requests_total{method="GET",route="professional-list",status="200"} 2',
+            body,
+        )
+        self.assertIn(
+            'http_requests_total{method="GET",route="consultation-detail",status="404"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",route="professional-list"} 2',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{method="GET",'
+            'route="professional-list",le="+Inf"} 2',
+            body,
+        )
+        self.assertIn(
+            'http_request_db_queries_count{method="GET",route="professional-list"} 2',
+            body,
+        )
+        self.assertIn("# TYPE http_requests_in_flight gauge", body)
+
+    @override_settings(METRICS_TOKEN="segredo")
+    def test_token_protects_endpoint(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self._scrape(HTTP_AUTHORIZATION="Bearer segredo")
+
+    def test_aggregates_all_worker_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other_worker = [
+                [
+                    "http_requests_total",
+                    [
+                        ["method", "GET"],
+                        ["route", "professional-list"],
+                        ["status", "200"],
+                    ],
+                    [5],
+                ],
+                ["http_requests_in_flight", [], [3]],
+            ]
+            metrics.write_file(directory, 999999, other_worker)
+
+            with override_settings(METRICS_MULTIPROC_DIR=directory):
+                self.client.get(reverse("professional-list"))
+                body = self._scrape()
+                self.assertIn(
+                    'http_requests_total{method="GET",route="professional-list",'
+                    'status="200"} 6',
+                    body,
+                )
+                # 3 do outro worker + a própria coleta em andamento
+                self.assertIn("http_requests_in_flight 4", body)
+
+                metrics.mark_process_dead(999999)
+                body = self._scrape()
+                self.assertIn("http_requests_in_flight 1", body)
+                self.assertIn('status="200"} 6', body)
+
+                # Outro worker reciclado soma ao mesmo arquivo consolidado
+                metrics.write_file(directory, 999998, other_worker)
+                metrics.mark_process_dead(999998)
+                self.assertIn('status="200"} 11', self._scrape())
+            self.assertEqual(
+                sorted(os.listdir(directory)),
+                sorted(["metrics-archive.json", f"metrics-{os.getpid()}.json"]),
+            )
+
+    def test_idle_worker_state_is_flushed_in_background(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+            with override_settings(
+                METRICS_MULTIPROC_DIR=directory, METRICS_FLUSH_INTERVAL=0.05
+            ):
+                self.client.get(reverse("professional-list"))
+                # Nenhuma requisição depois desta: só a thread pode gravá-la
+                metrics.store.inc("http_requests_total", {"route": "ocioso"})
+
+                deadline = time.monotonic() + 5
+                while time.monotonic() < deadline:
+                    try:
+                        with open(path) as fp:
+                            names = [labels for _, labels, _ in json.load(fp)]
+                    except (OSError, ValueError):
+                        names = []
+                    if [["route", "ocioso"]] in names:
+                        break
+                    time.sleep(0.05)
+                else:
+                    self.fail("estado do worker ocioso não foi gravado")
@@ -0,0 +1,70 @@
+import io
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+SAMPLE = {
+    "id": 1,
+    "name": "Ana — Psicóloga",
+    "when": datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+    "day": date(2025, 1, 2),
+    "price": Decimal("12.50"),
+    "duration": timedelta(minutes=30),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "label": gettext_lazy("Required"),
+    "notes": "linha\u2028separada\u2029",
+    "nested": [{"a": None, "b": True, "c": 1.5}],
+    3: "chave numérica",
+}
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    def test_matches_drf_renderer(self):
+        self.assertEqual(ORJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+    def test_indent_and_empty_bodies_use_drf_behaviour(self):
+        renderer = ORJSONRenderer()
+        self.assertEqual(renderer.render(None), b"")
+        media_type = "application/json; indent=4"
+        self.assertEqual(
+            renderer.render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type),
+        )
+
+    def test_without_orjson_falls_back_to_stdlib(self):
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(
+                ORJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE)
+            )
+
+
+class ORJSONParserTest(SimpleTestCase):
+    def parse(self, content, encoding="utf-8"):
+        return ORJSONParser().parse(
+            io.BytesIO(content), "application/json", {"encoding": encoding}
+        )
+
+    def test_parses_utf8_and_other_charsets(self):
+        self.assertEqual(self.parse('{"a": "Ção"}'.encode()), {"a": "Ção"})
+        self.assertEqual(
+            self.parse('{"a": "Ção"}'.encode("latin-1"), "latin-1"), {"a": "Ção"}
+        )
+
+    def test_invalid_json_and_constants_are_parse_errors(self):
+        for content in (b"{bad", b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                self.parse(content)
+
+    def test_rejects_non_text_charsets(self):
+        with self.assertRaises(ParseError):
+            self.parse(b"{}", "bz2_codec")
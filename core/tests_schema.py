@@ -0,0 +1,104 @@
+import gzip
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core import schema
+from core.schema import schema_store
+
+JSON = "application/vnd.oai.openapi+json"
+
+
+class CachedSchemaViewTest(SimpleTestCase):
+    def setUp(self):
+        self.url = reverse("schema")
+        self.schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.schema_dir.cleanup)
+        override = override_settings(API_SCHEMA_DIR=Path(self.schema_dir.name))
+        override.enable()
+        self.addCleanup(override.disable)
+        schema_store.clear()
+        self.addCleanup(schema_store.clear)
+
+    def get(self, **headers):
+        return self.client.get(self.url, headers={"Accept": JSON, **headers})
+
+    def test_schema_is_generated_once(self):
+        with mock.patch.object(
+            schema, "generate_schema", wraps=schema.generate_schema
+        ) as generate:
+            first = self.get()
+            second = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertIn("/api/consultations/", json.loads(first.content)["paths"])
+        self.assertEqual(first["Cache-Control"], "public, max-age=86400")
+        self.assertTrue(first["ETag"])
+
+    def test_matches_per_request_generation(self):
+        cached = self.get()
+        with override_settings(API_SCHEMA_CACHE=False):
+            generated = self.get()
+        self.assertEqual(json.loads(cached.content), json.loads(generated.content))
+
+    def test_yaml_is_the_default_format(self):
+        r = self.client.get(self.url)
+        self.assertEqual(
+            r["Content-Type"], "application/vnd.oai.openapi; charset=utf-8"
+        )
+        self.assertTrue(r.content.startswith(b"openapi:"))
+
+    def test_etag_returns_304(self):
+        etag = self.get()["ETag"]
+        r = self.get(**{"If-None-Match": etag})
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r.content, b"")
+
+    def test_gzip_variant(self):
+        plain = self.get()
+        r = self.get(**{"Accept-Encoding": "gzip, deflate, br"})
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", r["Vary"])
+        self.assertNotEqual(r["ETag"], plain["ETag"])
+        self.assertEqual(gzip.decompress(r.content), plain.content)
+
+    def test_serves_files_built_by_command(self):
+        call_command("build_api_schema", stdout=StringIO())
+        self.assertTrue(schema.schema_path("json", compressed=True).exists())
+
+        schema.schema_path("json").write_bytes(b'{"openapi": "pre-built"}')
+        schema.schema_path("json", compressed=True).unlink()
+        with mock.patch.object(schema, "generate_schema") as generate:
+            r = self.get(**{"Accept-Encoding": "gzip"})
+        generate.assert_not_called()
+        self.assertEqual(gzip.decompress(r.content), b'{"openapi": "pre-built"}')
+
+    def test_files_built_from_other_sources_are_regenerated(self):
+        call_command("build_api_schema", stdout=StringIO())
+        schema.schema_path("json").write_bytes(b'{"openapi": "stale"}')
+
+        with mock.patch.object(schema, "source_digest", return_value="outro"):
+            r = self.get()
+        self.assertIn("/api/consultations/", json.loads(r.content)["paths"])
+
+    @override_settings(API_SCHEMA_AUTORELOAD=True)
+    def test_autoreload_regenerates_when_sources_change(self):
+        schema.schema_path("json").parent.mkdir(parents=True, exist_ok=True)
+        schema.schema_path("json").write_bytes(b"{}")
+        with mock.patch.object(
+            schema, "source_fingerprint", side_effect=[1.0, 1.0, 2.0]
+        ), mock.patch.object(
+            schema, "generate_schema", side_effect=[b'{"v": 1}', b'{"v": 2}']
+        ):
+            self.assertEqual(self.get().content, b'{"v": 1}')
+            self.assertEqual(self.get().content, b'{"v": 1}')
+            r = self.get()
+        self.assertEqual(r.content, b'{"v": 2}')
+        self.assertEqual(r["Cache-Control"], "no-cache")
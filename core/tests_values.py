@@ -0,0 +1,119 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from consultations.models import Consultation
+from consultations.serializers import ConsultationSerializer
+from core.values import ValuesPlan
+from professionals.models import Professional
+from professionals.serializers import ProfessionalSerializer
+
+
+class ValuesPlanTest(TestCase):
+    def setUp(self):
+        self.professional = Professional.objects.create(
+            name_social="Ana Souza", profession="Psicóloga", address="Rua A"
+        )
+        start = timezone.now() + timedelta(days=1)
+        for i in range(3):
+            Consultation.objects.create(
+                professional=self.professional,
+                datetime=start + timedelta(hours=i),
+                notes="" if i else "primeira",
+            )
+
+    def assert_same_output(self, serializer_class, queryset):
+        plan = ValuesPlan.for_serializer(serializer_class())
+        self.assertIsNotNone(plan)
+        self.assertEqual(
+            plan.serialize(plan.values(queryset)),
+            serializer_class(queryset, many=True).data,
+        )
+
+    def test_matches_model_serializer(self):
+        self.assert_same_output(ProfessionalSerializer, Professional.objects.all())
+        self.assert_same_output(
+            ConsultationSerializer, Consultation.objects.order_by("id")
+        )
+
+    @override_settings(TIME_ZONE="America/Sao_Paulo")
+    def test_datetimes_follow_current_timezone(self):
+        self.assert_same_output(
+            ConsultationSerializer, Consultation.objects.order_by("id")
+        )
+
+    def test_no_plan_for_computed_or_nested_fields(self):
+        class WithMethod(serializers.ModelSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Professional
+                fields = ["id", "label"]
+
+            def get_label(self, obj):
+                return str(obj)
+
+        class Nested(serializers.ModelSerializer):
+            professional = ProfessionalSerializer()
+
+            class Meta:
+                model = Consultation
+                fields = ["id", "professional"]
+
+        class Custom(ProfessionalSerializer):
+            def to_representation(self, instance):
+                return {}
+
+        for serializer_class in (WithMethod, Nested, Custom):
+            self.assertIsNone(ValuesPlan.for_serializer(serializer_class()))
+
+
+class ValuesListViewTest(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.professional = Professional.objects.create(
+            name_social="Ana Souza", profession="Psicóloga"
+        )
+        start = timezone.now() + timedelta(days=1)
+        for i in range(5):
+            Consultation.objects.create(
+                professional=self.professional,
+                datetime=start + timedelta(hours=i),
+                notes=f"nota {i}",
+            )
+
+    def test_list_builds_rows_without_model_instances(self):
+        with mock.patch.object(
+            Consultation, "from_db", side_effect=AssertionError("instância criada")
+        ):
+            r = self.client.get(reverse("consultation-list"), {"page_size": 2})
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(len(r.data["results"]), 2)
+
+            # O cursor continua funcionando com linhas em dicionário, mesmo
+            # quando a ordenação fica fora da projeção
+            r = self.client.get(r.data["next"] + "&fields=id")
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(len(r.data["results"]), 2)
+            self.assertEqual(set(r.data["results"][0]), {"id"})
+
+    def test_list_body_matches_serializer(self):
+        r = self.client.get(reverse("consultation-list"))
+        expected = ConsultationSerializer(
+            Consultation.objects.order_by("datetime", "id"), many=True
+        ).data
+        self.assertEqual(r.json()["results"], expected)
+
+        r = self.client.get(
+            reverse("consultation-by_professional", args=[self.professional.id])
+        )
+        self.assertEqual(r.json()["results"], expected)
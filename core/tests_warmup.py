@@ -0,0 +1,85 @@
+import os
+import runpy
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from consultations.serializers import ConsultationSerializer
+from core import warmup
+from professionals.serializers import ProfessionalSerializer
+
+GUNICORN_CONF = Path(settings.BASE_DIR) / "gunicorn.conf.py"
+
+
+class WarmUpTest(SimpleTestCase):
+    def test_builds_routes_and_serializers(self):
+        summary = warmup.warm_up()
+
+        self.assertGreater(summary["modules"], 0)
+        self.assertGreater(summary["routes"], 0)
+        callbacks = warmup.compile_routes()
+        built = warmup.build_serializers(callbacks)
+        self.assertIn(ProfessionalSerializer, built)
+        self.assertIn(ConsultationSerializer, built)
+
+    def test_closes_connections_before_fork(self):
+        with mock.patch.object(warmup.connections, "close_all") as close_all:
+            warmup.warm_up()
+        close_all.assert_called_once_with()
+
+
+class GunicornConfigTest(SimpleTestCase):
+    def load(self, **env):
+        base = {k: v for k, v in os.environ.items() if not k.startswith("GUNICORN_")}
+        with mock.patch.dict(os.environ, {**base, **env}, clear=True):
+            return runpy.run_path(str(GUNICORN_CONF))
+
+    def test_gthread_defaults(self):
+        conf = self.load()
+
+        self.assertEqual(conf["wsgi_app"], "core.wsgi:application")
+        self.assertEqual(conf["workers"], conf["cpu_count"]() * 2 + 1)
+        self.assertTrue(conf["preload_app"])
+        self.assertGreater(conf["max_requests_jitter"], 0)
+
+    def test_uvicorn_workers_serve_asgi(self):
+        conf = self.load(GUNICORN_WORKER_CLASS="uvicorn", GUNICORN_WORKERS="3")
+
+        self.assertEqual(conf["wsgi_app"], "core.asgi:application")
+        self.assertIn("UvicornWorker", conf["worker_class"])
+        self.assertEqual(conf["workers"], 3)
+
+    def test_workers_log_to_the_console(self):
+        base = {k: v for k, v in os.environ.items() if k != "LOG_FILE"}
+        with mock.patch.dict(os.environ, base, clear=True):
+            runpy.run_path(str(GUNICORN_CONF))
+            self.assertEqual(os.environ["LOG_FILE"], "")
+
+        with mock.patch.dict(os.environ, {**base, "LOG_FILE": "/var/log/api.log"}):
+            runpy.run_path(str(GUNICORN_CONF))
+            self.assertEqual(os.environ["LOG_FILE"], "/var/log/api.log")
+
+    def test_rejects_unknown_worker_class(self):
+        with self.assertRaises(RuntimeError):
+            self.load(GUNICORN_WORKER_CLASS="eventlet")
+
+    def test_local_cache_falls_back_to_one_worker(self):
+        conf = self.load()
+        server = mock.Mock()
+        server.cfg.workers = 3
+        server.num_workers = 3
+
+        conf["on_starting"](server)
+        self.assertEqual(server.num_workers, 1)
+        server.log.warning.assert_called_once()
+
+        server = mock.Mock()
+        server.cfg.workers = 3
+        server.num_workers = 3
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        with override_settings(CACHES=redis):
+            conf["on_starting"](server)
+        self.assertEqual(server.num_workers, 3)
+        server.log.warning.assert_not_called()
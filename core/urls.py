@@ -21,12 +21,45 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from professionals.views import ProfessionalViewSet
 from consultations.views import ConsultationViewSet
+from changes.views import ChangeFeedView
+from core.metrics import metrics_view
+from consultations import async_views as consultation_async
+from professionals import async_views as professional_async
+from core.schema import CachedSchemaView
 from drf_spectacular.views import (
-    SpectacularAPIView,
     SpectacularSwaggerView,
     SpectacularRedocView,
 )
 
+# Leituras assíncronas (ASGI) com o mesmo corpo das rotas do router
+async_urlpatterns = [
+    path(
+        "professionals/",
+        professional_async.professional_list,
+        name="async-professional-list",
+    ),
+    path(
+        "professionals/<str:pk>/",
+        professional_async.professional_detail,
+        name="async-professional-detail",
+    ),
+    path(
+        "consultations/",
+        consultation_async.consultation_list,
+        name="async-consultation-list",
+    ),
+    path(
+        "consultations/professional/<int:professional_id>/",
+        consultation_async.by_professional,
+        name="async-consultation-by_professional",
+    ),
+    path(
+        "consultations/<str:pk>/",
+        consultation_async.consultation_detail,
+        name="async-consultation-detail",
+    ),
+]
+
 router = DefaultRouter()
 router.register(r"professionals", ProfessionalViewSet, basename="professional")
 router.register(r"consultations", ConsultationViewSet, basename="consultation")
@@ -36,12 +69,15 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/async/", include(async_urlpatterns)),
+    path("api/changes/", ChangeFeedView.as_view(), name="changes"),
     path("api/", include(router.urls)),
     path("debug-sentry/", lambda request: 1 / 0),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 urlpatterns = [
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/schema/", CachedSchemaView.as_view(), name="schema"),
     path(
         "api/docs/swagger/",
         SpectacularSwaggerView.as_view(url_name="schema"),
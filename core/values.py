@@ -0,0 +1,158 @@
+"""
+Listagens a partir de ``.values()``.
+
+Serializar uma lista com ``ModelSerializer`` custa, por linha, a criação da
+instância do modelo (``from_db``, sinais de carga) e uma chamada de
+``get_attribute``/``to_representation`` por campo. Quando todos os campos do
+serializer são colunas simples do modelo, ``ValuesPlan`` busca só essas
+colunas com ``.values()`` e monta os dicionários direto, convertendo apenas os
+tipos que precisam (datas, por exemplo) com o próprio campo do serializer — a
+saída é a mesma.
+
+Serializers com campos calculados, aninhados ou ``to_representation``
+próprio não têm plano e seguem pelo caminho normal.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .projection import ordering_columns
+
+# Campos cujo ``to_representation`` devolve o próprio valor vindo do banco
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+
+class ValuesPlan:
+    """Colunas de ``.values()`` e conversões que reproduzem um serializer."""
+
+    def __init__(self, columns):
+        # [(nome no JSON, coluna, campo do serializer)]
+        self.columns = columns
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """Plano para ``serializer`` (ou ``None`` se ele não tiver um)."""
+        if (
+            type(serializer).to_representation
+            is not serializers.Serializer.to_representation
+        ):
+            return None
+        model = getattr(getattr(serializer, "Meta", None), "model", None)
+        if model is None:
+            return None
+
+        columns = []
+        for field in serializer._readable_fields:
+            if field.source == "*" or "." in field.source:
+                return None
+            if isinstance(field, serializers.BaseSerializer) or (
+                isinstance(field, serializers.RelatedField)
+                and type(field) is not serializers.PrimaryKeyRelatedField
+            ):
+                # Aninhados e relacionamentos que precisam do objeto
+                return None
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.many_to_many:
+                return None
+            columns.append((field.field_name, model_field.name, field))
+        return cls(columns)
+
+    @property
+    def fields(self):
+        return [column for _, column, _ in self.columns]
+
+    def values(self, queryset, extra=()):
+        """``.values()`` das colunas do plano mais ``extra`` (ex.: ordenação)."""
+        fields = self.fields
+        return queryset.values(*fields, *(f for f in extra if f not in fields))
+
+    def serialize(self, rows):
+        # Conversões resolvidas uma vez por lista (o fuso atual, por exemplo)
+        columns = [
+            (name, column, converter(field)) for name, column, field in self.columns
+        ]
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in columns:
+                value = row[column]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            data.append(item)
+        return data
+
+
+def converter(field):
+    """Função que converte o valor do banco como ``field.to_representation``."""
+    if type(field) is serializers.PrimaryKeyRelatedField:
+        # ``.values()`` já traz a chave do relacionamento
+        return field.pk_field.to_representation if field.pk_field else None
+    if type(field) in PASSTHROUGH_FIELDS:
+        return None
+    if type(field) is serializers.DateTimeField:
+        return datetime_converter(field)
+    return field.to_representation
+
+
+def datetime_converter(field):
+    """
+    ``DateTimeField.to_representation`` em ISO 8601, com o fuso consultado uma
+    vez só (a consulta por valor é a maior parte do custo do campo).
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or tz is None:
+        return field.to_representation
+
+    def convert(value):
+        if not value or value.utcoffset() is None:
+            return field.to_representation(value)
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+    return convert
+
+
+class ValuesListMixin:
+    """
+    ``list`` pelo ``ValuesPlan`` do serializer da view, com a mesma
+    paginação. Vem depois dos mixins que também tratam ``list`` (cache,
+    busca), que caem nele quando não atendem a requisição.
+    """
+
+    def list(self, request, *args, **kwargs):
+        response = self.values_response(self.filter_queryset(self.get_queryset()))
+        if response is None:
+            return super().list(request, *args, **kwargs)
+        return response
+
+    def values_response(self, queryset):
+        """Resposta (paginada, se houver paginação) ou ``None`` sem plano."""
+        plan = self.get_values_plan()
+        if plan is None:
+            return None
+
+        rows = self.values_queryset(queryset, plan)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.serialize(page))
+        return Response(plan.serialize(rows))
+
+    def get_values_plan(self):
+        return ValuesPlan.for_serializer(self.get_serializer(many=True).child)
+
+    def values_queryset(self, queryset, plan):
+        # A paginação por cursor lê as colunas da ordenação de cada linha
+        ordering = ordering_columns(getattr(self.paginator, "ordering", None))
+        return plan.values(queryset, ordering)
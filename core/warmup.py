@@ -0,0 +1,111 @@
+"""
+Aquecimento do processo antes de atender a primeira requisição.
+
+Chamado pelo ``gunicorn.conf.py`` no processo mestre (com ``preload_app``,
+antes do fork) ou em cada worker: importa os módulos das apps, compila as
+expressões das rotas, monta o índice de ``reverse``, os campos dos
+serializers das views e o esquema OpenAPI. Com o preload, tudo isso fica nas
+páginas de memória compartilhadas (copy-on-write) pelos workers.
+"""
+
+import logging
+import time
+from importlib import import_module
+from importlib.util import find_spec
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+
+from .schema import schema_store
+
+logger = logging.getLogger(__name__)
+
+# Submódulos importados de cada app do projeto, quando existem
+MODULES = ("models", "serializers", "views", "async_views")
+
+
+def import_app_modules():
+    imported = 0
+    for config in apps.get_app_configs():
+        for name in MODULES:
+            module = f"{config.name}.{name}"
+            try:
+                found = find_spec(module) is not None
+            except ModuleNotFoundError:
+                found = False
+            if found:
+                import_module(module)
+                imported += 1
+    return imported
+
+
+def compile_routes(resolver=None):
+    """Compila os padrões de todas as rotas e devolve as views encontradas."""
+    resolver = resolver or get_resolver()
+    # Monta os dicionários de ``reverse`` (e de namespaces) de uma vez
+    resolver.reverse_dict
+    resolver.namespace_dict
+
+    callbacks = []
+
+    def walk(patterns):
+        for pattern in patterns:
+            pattern.pattern.regex
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            else:
+                callbacks.append(pattern.callback)
+
+    walk(resolver.url_patterns)
+    return callbacks
+
+
+def build_serializers(callbacks):
+    """Instancia os serializers das views DRF para montar os campos."""
+    built = set()
+    for callback in callbacks:
+        view = getattr(callback, "cls", None)
+        serializer_class = getattr(view, "serializer_class", None)
+        if serializer_class is None or serializer_class in built:
+            continue
+        try:
+            serializer_class().fields
+        except Exception:
+            # Serializer que exige contexto: fica para a primeira requisição
+            logger.debug("Serializer %s não aquecido", serializer_class.__name__)
+            continue
+        built.add(serializer_class)
+    return built
+
+
+def build_schema():
+    """Deixa o esquema OpenAPI pronto, se ele for servido do cache."""
+    if not settings.API_SCHEMA_CACHE or schema_store.autoreload:
+        return 0
+    return schema_store.warm()
+
+
+def warm_up():
+    """Aquece o processo atual; devolve um resumo do que foi feito."""
+    started = time.perf_counter()
+    modules = import_app_modules()
+    callbacks = compile_routes()
+    serializers = build_serializers(callbacks)
+    schemas = build_schema()
+    # Nenhuma conexão aberta aqui pode ser herdada pelos workers após o fork
+    connections.close_all()
+    summary = {
+        "modules": modules,
+        "routes": len(callbacks),
+        "serializers": len(serializers),
+        "schemas": schemas,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info(
+        "Aquecimento: %(modules)d módulos, %(routes)d rotas, "
+        "%(serializers)d serializers, %(schemas)d esquemas em %(elapsed_ms)sms",
+        summary,
+    )
+    return summary
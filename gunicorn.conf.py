@@ -0,0 +1,131 @@
+"""
+Configuração do gunicorn (carregada automaticamente a partir da raiz do projeto).
+
+    gunicorn                                  # workers gthread (WSGI)
+    GUNICORN_WORKER_CLASS=uvicorn gunicorn    # workers uvicorn (ASGI)
+
+Os valores padrão podem ser ajustados por variáveis de ambiente ``GUNICORN_*``
+(e ``PORT``). O app Django é carregado no processo mestre antes do fork
+(``preload_app``) e aquecido por ``core.warmup``: os workers compartilham essa
+memória (copy-on-write) e a primeira requisição de cada um não paga o custo de
+importar e montar as rotas.
+"""
+
+import os
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+# Sob o gunicorn os logs vão só para o console (stderr), recolhido pelo
+# contêiner: vários workers no mesmo RotatingFileHandler corrompem a rotação,
+# e um arquivo por pid deixaria arquivos para trás a cada worker reciclado.
+# Definido antes de carregar o app; LOG_FILE=<caminho> volta a gravar em disco.
+os.environ.setdefault("LOG_FILE", "")
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def cpu_count():
+    """CPUs disponíveis para o processo (respeita o ``taskset``/cpuset)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+WORKER_CLASS = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+
+if WORKER_CLASS == "uvicorn":
+    # Um event loop por núcleo; a concorrência vem do loop, não de threads
+    wsgi_app = "core.asgi:application"
+    # Dependência do projeto (uvicorn-worker, que traz o uvicorn)
+    worker_class = "uvicorn_worker.UvicornWorker"
+    workers = _env_int("GUNICORN_WORKERS", cpu_count())
+elif WORKER_CLASS == "gthread":
+    # (2 x núcleos) + 1 processos, cada um com algumas threads para esperar I/O
+    wsgi_app = "core.wsgi:application"
+    worker_class = "gthread"
+    workers = _env_int("GUNICORN_WORKERS", cpu_count() * 2 + 1)
+    threads = _env_int("GUNICORN_THREADS", 4)
+else:
+    raise RuntimeError(
+        f"GUNICORN_WORKER_CLASS inválido: {WORKER_CLASS!r} (use gthread ou uvicorn)"
+    )
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+# Recicla cada worker após N requisições (com variação, para não reiniciarem
+# todos juntos) e limita o crescimento de memória por vazamentos
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+
+timeout = _env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+# Heartbeat dos workers em memória: em contêineres, /tmp pode ser um disco lento
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    from core.caching import allowed_workers, get_cache_alias
+
+    # Caches e invalidações precisam valer para todos os workers: sem um cache
+    # compartilhado (REDIS_URL) o servidor sobe com um só, em vez de falhar
+    workers = allowed_workers(server.cfg.workers)
+    if workers < server.cfg.workers:
+        server.log.warning(
+            "Cache %r em memória local: usando 1 worker em vez de %d. "
+            "Defina REDIS_URL para rodar vários workers.",
+            get_cache_alias(),
+            server.cfg.workers,
+        )
+        server.num_workers = workers
+
+    # Arquivos de métricas de uma execução anterior não podem somar nesta
+    directory = os.getenv("METRICS_MULTIPROC_DIR")
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for filename in os.listdir(directory):
+        if filename.startswith("metrics-"):
+            os.remove(os.path.join(directory, filename))
+
+
+def when_ready(server):
+    # Com preload o app já foi carregado neste processo: aquece antes do fork
+    if server.cfg.preload_app:
+        from core.warmup import warm_up
+
+        warm_up()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        from core.warmup import warm_up
+
+        warm_up()
+
+
+def worker_exit(server, worker):
+    # Grava o que ainda estiver nas filas de log e o estado das métricas
+    from core import logs
+    from core.api_logging import writer
+    from core.metrics import store
+
+    writer.shutdown()
+    store.flush()
+    logs.shutdown()
+
+
+def child_exit(server, worker):
+    from core.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid, os.getenv("METRICS_MULTIPROC_DIR"))
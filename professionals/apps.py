@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ProfessionalsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "professionals"
+
+    def ready(self):
+        from changes import tracking
+        from core import search
+        from . import signals  # noqa: F401
+        from .models import Professional
+
+        search.register(Professional, ("name_social", "profession", "address"))
+        tracking.register(
+            Professional,
+            "professional",
+            "professionals.serializers.ProfessionalSerializer",
+        )
@@ -0,0 +1,20 @@
+"""Leituras assíncronas de profissionais (``/api/async/professionals/``)."""
+
+from core.async_views import async_api_view, cached_response, list_data, retrieve_data
+from .views import ProfessionalViewSet
+
+
+@async_api_view(ProfessionalViewSet, "list")
+async def professional_list(view):
+    """
+    Endpoint: GET /api/async/professionals/
+
+    Mesmo corpo de GET /api/professionals/, inclusive ``?search=``.
+    """
+    return await cached_response(view, lambda: list_data(view))
+
+
+@async_api_view(ProfessionalViewSet, "retrieve", detail=True)
+async def professional_detail(view, pk):
+    """Endpoint: GET /api/async/professionals/{id}/"""
+    return await cached_response(view, lambda: retrieve_data(view))
@@ -0,0 +1,136 @@
+"""
+Importação e exportação de profissionais em NDJSON/CSV.
+
+Tudo é feito em fluxo: a entrada é lida linha a linha, validada e gravada em
+blocos com ``bulk_create``; a saída percorre a tabela com ``iterator`` e gera
+as linhas sob demanda. O uso de memória depende do tamanho do bloco, não do
+tamanho do arquivo.
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from changes import tracking
+from core import search
+from .cache import professional_cache
+from .models import Professional
+from .serializers import ProfessionalSerializer
+
+FORMATS = ("ndjson", "csv")
+FIELDS = ("name_social", "profession", "address", "contact")
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# Quantos erros de linha são devolvidos no resumo da importação
+MAX_REPORTED_ERRORS = 100
+
+
+def get_chunk_size():
+    return getattr(settings, "PROFESSIONAL_BULK_CHUNK_SIZE", 1000)
+
+
+def format_from_content_type(content_type):
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type == "text/csv":
+        return "csv"
+    if media_type in ("application/x-ndjson", "application/jsonl", "application/json"):
+        return "ndjson"
+    return None
+
+
+def iter_records(lines, fmt):
+    """
+    Converte as linhas de entrada (bytes ou str) em pares ``(linha, registro)``.
+
+    Linhas que não puderem ser interpretadas geram ``(linha, None)``.
+    """
+    text_lines = (
+        line.decode("utf-8-sig") if isinstance(line, bytes) else line for line in lines
+    )
+    if fmt == "csv":
+        reader = csv.DictReader(text_lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for number, line in enumerate(text_lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def import_records(records, chunk_size=None):
+    """Valida e grava os registros em blocos; devolve um resumo da operação."""
+    chunk_size = chunk_size or get_chunk_size()
+    serializer = ProfessionalSerializer()
+    summary = {"created": 0, "failed": 0, "errors": []}
+
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+
+        objs = []
+        for line, record in chunk:
+            try:
+                if record is None:
+                    raise serializers.ValidationError("Linha inválida.")
+                data = serializer.run_validation(
+                    {field: record.get(field, "") or "" for field in FIELDS}
+                )
+            except serializers.ValidationError as exc:
+                summary["failed"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"line": line, "errors": exc.detail})
+                continue
+            objs.append(Professional(**data))
+
+        with transaction.atomic():
+            Professional.objects.bulk_create(objs)
+            search.index_instances(Professional, objs)
+            tracking.record(Professional, [obj.pk for obj in objs])
+        summary["created"] += len(objs)
+
+    if summary["created"]:
+        # bulk_create não dispara post_save
+        transaction.on_commit(professional_cache.bump)
+
+    return summary
+
+
+class _Echo:
+    """Buffer mínimo para o ``csv.writer`` devolver a linha em vez de gravá-la."""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(fmt, chunk_size=None):
+    """Gera o diretório de profissionais linha a linha, no formato pedido."""
+    rows = (
+        Professional.objects.order_by("id")
+        .values_list("id", *FIELDS)
+        .iterator(chunk_size=chunk_size or get_chunk_size())
+    )
+    columns = ("id",) + FIELDS
+
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
@@ -0,0 +1,6 @@
+from core.caching import VersionedCache
+
+# Respostas de leitura de /api/professionals/, invalidadas a cada escrita
+professional_cache = VersionedCache(
+    "professionals", timeout_setting="PROFESSIONAL_CACHE_TIMEOUT"
+)
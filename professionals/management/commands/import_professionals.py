@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from professionals import bulk_io
+
+
+class Command(BaseCommand):
+    help = "Importa profissionais de um arquivo NDJSON ou CSV, em blocos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo de entrada, ou '-' para stdin.")
+        parser.add_argument(
+            "--format",
+            choices=bulk_io.FORMATS,
+            help="Formato do arquivo (padrão: deduzido pela extensão).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Linhas validadas e gravadas por bloco.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or (
+            "csv" if path.lower().endswith(".csv") else "ndjson"
+        )
+
+        if path == "-":
+            summary = self._import(sys.stdin.buffer, fmt, options["chunk_size"])
+        else:
+            try:
+                with open(path, "rb") as stream:
+                    summary = self._import(stream, fmt, options["chunk_size"])
+            except OSError as exc:
+                raise CommandError(f"Não foi possível abrir {path}: {exc}")
+
+        for error in summary["errors"]:
+            self.stderr.write(f"Linha {error['line']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{summary['created']} profissionais importados, "
+                f"{summary['failed']} linhas rejeitadas."
+            )
+        )
+
+    def _import(self, stream, fmt, chunk_size):
+        return bulk_io.import_records(bulk_io.iter_records(stream, fmt), chunk_size)
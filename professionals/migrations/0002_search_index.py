@@ -0,0 +1,16 @@
+from django.db import migrations
+
+from core.search import create_index_operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("professionals", "0001_initial"),
+    ]
+
+    operations = [
+        create_index_operation(
+            "professionals_professional", ("name_social", "profession", "address")
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("professionals", "0002_search_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="professional",
+            name="profession",
+            field=models.CharField(db_index=True, max_length=150),
+        ),
+    ]
@@ -3,7 +3,8 @@ from django.db import models
 
 class Professional(models.Model):
     name_social = models.CharField(max_length=255)
-    profession = models.CharField(max_length=150)
+    # Indexada: filtro ?profession= das listagens de consultas
+    profession = models.CharField(max_length=150, db_index=True)
     address = models.TextField(blank=True)
     contact = models.CharField(max_length=100, blank=True)
 
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import professional_cache
+from .models import Professional
+
+
+@receiver(post_save, sender=Professional)
+@receiver(post_delete, sender=Professional)
+def invalidate_professional_cache(sender, **kwargs):
+    # Só depois do commit: antes disso uma leitura concorrente ainda vê a
+    # linha antiga e a gravaria em cache já com a versão nova
+    transaction.on_commit(professional_cache.bump)
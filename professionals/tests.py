@@ -1,7 +1,20 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 from .models import Professional
+from .views import ProfessionalViewSet
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -91,3 +104,328 @@ class ProfessionalCRUDTest(APITestCase):
         self.client.credentials()  # remove o token
         r = self.client.get(self.list_url)
         self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ProfessionalBulkIOTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.import_url = reverse("professional-import")
+        self.export_url = reverse("professional-export")
+
+    def test_import_ndjson(self):
+        body = "\n".join(
+            [
+                '{"name_social": "Ana Souza", "profession": "Psicóloga"}',
+                '{"name_social": "Jo", "profession": "Médico"}',
+                "não é json",
+                '{"name_social": "Bruno Lima", "profession": "Enfermeiro", "contact": "b@x.com"}',
+            ]
+        )
+        with self.settings(PROFESSIONAL_BULK_CHUNK_SIZE=2):
+            r = self.client.post(
+                self.import_url, body, content_type="application/x-ndjson"
+            )
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(r.data["created"], 2)
+        self.assertEqual(r.data["failed"], 2)
+        self.assertEqual([e["line"] for e in r.data["errors"]], [2, 3])
+        self.assertTrue(Professional.objects.filter(contact="b@x.com").exists())
+
+    def test_import_csv(self):
+        body = 'name_social,profession,address\nAna Souza,Psicóloga,"Rua A, 1"\n'
+        r = self.client.post(self.import_url, body, content_type="text/csv")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Professional.objects.get().address, "Rua A, 1")
+
+    def test_import_unsupported_content_type(self):
+        r = self.client.post(self.import_url, "x", content_type="text/plain")
+        self.assertEqual(r.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_export_ndjson_and_csv(self):
+        Professional.objects.create(name_social="Ana Souza", profession="Psicóloga")
+        Professional.objects.create(name_social="Bruno Lima", profession="Médico")
+
+        r = self.client.get(self.export_url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        lines = b"".join(r.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["name_social"] for line in lines],
+            ["Ana Souza", "Bruno Lima"],
+        )
+
+        r = self.client.get(self.export_url, {"type": "csv"})
+        rows = list(csv.reader(b"".join(r.streaming_content).decode().splitlines()))
+        self.assertEqual(
+            rows[0], ["id", "name_social", "profession", "address", "contact"]
+        )
+        self.assertEqual(len(rows), 3)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("name_social,profession\nAna Souza,Psicóloga\nBruno Lima,Médico\n")
+        self.addCleanup(os.remove, f.name)
+
+        out = io.StringIO()
+        call_command("import_professionals", f.name, chunk_size=1, stdout=out)
+        self.assertIn("2 profissionais importados", out.getvalue())
+        self.assertEqual(Professional.objects.count(), 2)
+
+
+class ProfessionalCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.obj = Professional.objects.create(
+            name_social="Alex", profession="Psicólogo"
+        )
+        self.list_url = reverse("professional-list")
+        self.detail_url = reverse("professional-detail", args=[self.obj.id])
+
+    def test_second_read_is_served_from_cache(self):
+        r = self.client.get(self.detail_url)
+        self.assertEqual(r["X-Cache"], "MISS")
+        # Usuário vem do token e a situação dele já está em cache
+        with self.assertNumQueries(0):
+            r = self.client.get(self.detail_url)
+        self.assertEqual(r["X-Cache"], "HIT")
+        self.assertEqual(r.data["name_social"], "Alex")
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        r = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(r.content, b"")
+
+    def test_write_invalidates_cache(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                self.detail_url, {"profession": "Enfermeiro"}, format="json"
+            )
+        r = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r["X-Cache"], "MISS")
+        self.assertEqual(r.data["profession"], "Enfermeiro")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.obj.delete()
+        r = self.client.get(self.list_url)
+        self.assertEqual(r.data, [])
+
+    def test_invalidation_waits_for_commit(self):
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.patch(
+                self.detail_url, {"profession": "Enfermeiro"}, format="json"
+            )
+            # Antes do commit a versão não muda
+            self.assertEqual(self.client.get(self.detail_url)["X-Cache"], "HIT")
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(self.detail_url)["X-Cache"], "MISS")
+
+    def test_cache_still_requires_authentication(self):
+        self.client.get(self.list_url)
+        self.client.credentials()
+        r = self.client.get(self.list_url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_stats_is_admin_only(self):
+        url = reverse("professional-cache_stats")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertIn("hits", r.data)
+
+
+class ProfessionalSearchTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.list_url = reverse("professional-list")
+
+        self.ana = Professional.objects.create(
+            name_social="Ana Psicóloga", profession="Psicóloga", address="Rua Azul"
+        )
+        self.bruno = Professional.objects.create(
+            name_social="Bruno Lima", profession="Psicólogo", address="Av. Paulista"
+        )
+        Professional.objects.create(
+            name_social="Carla Reis", profession="Enfermeira", address="Rua Verde"
+        )
+
+    def _search(self, term, **params):
+        r = self.client.get(self.list_url, {"search": term, **params})
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        return r
+
+    def test_search_is_ranked_and_accent_insensitive(self):
+        r = self._search("psicolog")
+        ids = [item["id"] for item in r.data["results"]]
+        # Ana casa no nome e na profissão; Bruno só pelo prefixo da profissão
+        self.assertEqual(ids, [self.ana.id, self.bruno.id])
+
+    def test_search_by_address_prefix(self):
+        r = self._search("paulis")
+        self.assertEqual([item["id"] for item in r.data["results"]], [self.bruno.id])
+
+    def test_search_is_paginated(self):
+        first = self._search("psicolog", page_size=1)
+        self.assertEqual(len(first.data["results"]), 1)
+        self.assertIsNotNone(first.data["next"])
+        second = self.client.get(first.data["next"])
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertIsNone(second.data["next"])
+
+    def test_index_follows_updates_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bruno.profession = "Nutricionista"
+            self.bruno.save()
+        self.assertEqual(len(self._search("nutri").data["results"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bruno.delete()
+        self.assertEqual(self._search("nutri").data["results"], [])
+
+    def test_imported_rows_are_indexed(self):
+        body = '{"name_social": "Diego Souza", "profession": "Fisioterapeuta"}\n'
+        self.client.post(
+            reverse("professional-import"), body, content_type="application/x-ndjson"
+        )
+        self.assertEqual(len(self._search("fisio").data["results"]), 1)
+
+
+class ProfessionalAsyncReadTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="123456")
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.obj = Professional.objects.create(
+            name_social="Alex Lima", profession="Psicólogo", address="Rua Azul"
+        )
+        Professional.objects.create(name_social="Bia Reis", profession="Médica")
+
+    async def test_list_matches_sync_endpoint(self):
+        r = await self.async_client.get(
+            reverse("async-professional-list"), headers=self.auth
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r["X-Cache"], "MISS")
+        # A instrumentação também enxerga as consultas do ORM assíncrono
+        self.assertNotIn('desc="0 queries"', r["Server-Timing"])
+        sync = await self._sync_get(reverse("professional-list"))
+        self.assertEqual(json.loads(r.content), sync)
+
+        again = await self.async_client.get(
+            reverse("async-professional-list"),
+            headers={**self.auth, "If-None-Match": r["ETag"]},
+        )
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_detail_and_not_found(self):
+        url = reverse("async-professional-detail", args=[self.obj.id])
+        r = await self.async_client.get(url, headers=self.auth)
+        self.assertEqual(json.loads(r.content)["name_social"], "Alex Lima")
+
+        for pk in (9999, "abc"):
+            url = reverse("async-professional-detail", args=[pk])
+            r = await self.async_client.get(url, headers=self.auth)
+            self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_search(self):
+        r = await self.async_client.get(
+            reverse("async-professional-list"), {"search": "psic"}, headers=self.auth
+        )
+        body = json.loads(r.content)
+        self.assertEqual([item["id"] for item in body["results"]], [self.obj.id])
+
+    async def test_requires_authentication_and_get(self):
+        url = reverse("async-professional-list")
+        r = await self.async_client.get(url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("Bearer", r["WWW-Authenticate"])
+
+        r = await self.async_client.post(url, {}, headers=self.auth)
+        self.assertEqual(r.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def _sync_get(self, url):
+        from asgiref.sync import sync_to_async
+
+        response = await sync_to_async(self.client.get)(url)
+        return json.loads(response.content)
+
+    def test_uses_the_viewset_permissions_and_user(self):
+        url = reverse("async-professional-list")
+        with mock.patch.object(
+            ProfessionalViewSet, "permission_classes", [IsAdminUser]
+        ):
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, status.HTTP_403_FORBIDDEN)
+
+            # IsAdminUser olha o usuário do banco, não as claims do token
+            User.objects.filter(pk=self.user.pk).update(is_staff=True)
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+
+class ProfessionalProjectionTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="123456")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.obj = Professional.objects.create(
+            name_social="Ana Souza", profession="Psicóloga", address="Rua A, 123"
+        )
+
+    def test_fields_limit_output_and_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(
+                reverse("professional-list"), {"fields": "id,name_social"}
+            )
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.json(), [{"id": self.obj.id, "name_social": "Ana Souza"}])
+        sql = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if "professionals_professional" in q["sql"]
+        ]
+        self.assertNotIn('"address"', sql[0])
+
+    def test_projections_are_cached_separately(self):
+        url = reverse("professional-detail", args=[self.obj.id])
+        full = self.client.get(url)
+        projected = self.client.get(url, {"exclude": "address,contact"})
+        self.assertIn("address", full.json())
+        self.assertEqual(
+            projected.json(),
+            {"id": self.obj.id, "name_social": "Ana Souza", "profession": "Psicóloga"},
+        )
+        self.assertEqual(projected["X-Cache"], "MISS")
+        self.assertNotEqual(projected["ETag"], full["ETag"])
+
+    def test_search_and_async_views_accept_projection(self):
+        r = self.client.get(
+            reverse("professional-list"), {"search": "ana", "fields": "name_social"}
+        )
+        self.assertEqual(r.json()["results"], [{"name_social": "Ana Souza"}])
+
+        r = self.client.get(
+            reverse("async-professional-detail", args=[self.obj.id]),
+            {"fields": "profession"},
+        )
+        self.assertEqual(r.json(), {"profession": "Psicóloga"})
+
+        r = self.client.get(reverse("async-professional-list"), {"fields": "nope"})
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,7 +1,24 @@
-from rest_framework import viewsets
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from core.caching import CachedReadMixin
+from core.db_routers import ReplicaReadMixin
+from core.projection import PROJECTION_PARAMETERS, SparseFieldsetMixin
+from core.search import FullTextSearchMixin, SEARCH_PARAMETERS
+from core.values import ValuesListMixin
+from .cache import professional_cache
 from .models import Professional
 from .serializers import ProfessionalSerializer
-from drf_spectacular.utils import extend_schema, OpenApiExample
+from . import bulk_io
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    OpenApiExample,
+    OpenApiParameter,
+    OpenApiTypes,
+)
 
 
 @extend_schema(
@@ -19,17 +36,121 @@ from drf_spectacular.utils import extend_schema, OpenApiExample
         )
     ],
 )
-class ProfessionalViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(parameters=SEARCH_PARAMETERS + PROJECTION_PARAMETERS),
+    retrieve=extend_schema(parameters=PROJECTION_PARAMETERS),
+)
+class ProfessionalViewSet(
+    ReplicaReadMixin,
+    CachedReadMixin,
+    SparseFieldsetMixin,
+    FullTextSearchMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet para gerenciar profissionais de saúde.
     Endpoints:
     - GET /api/professional/ - Lista todos os profissionais
+    - GET /api/professional/?search=termo - Busca por nome, profissão e endereço
+    - GET /api/professional/?fields=id,name_social - Só os campos pedidos
     - POST /api/professional/ - Cria novo profissional
     - GET /api/professional/{id}/ - Detalhe de um profissional
     - PUT /api/professional/{id}/ - Atualiza profissional
     - PATCH /api/professional/{id}/ - Atualiza parcialmente
     - DELETE /api/professional/{id}/ - Remove profissional
+    - POST /api/professional/import/ - Importa profissionais (NDJSON/CSV)
+    - GET /api/professional/export/ - Exporta profissionais (NDJSON/CSV)
+
+    Listagem e detalhe são servidos do cache (com ETag) e invalidados a cada
+    escrita em Professional.
     """
 
     queryset = Professional.objects.all()
     serializer_class = ProfessionalSerializer
+    read_cache = professional_cache
+    # Permissões só exigem autenticação: usuário montado a partir do token
+    token_user = True
+
+    @extend_schema(
+        summary="Importa profissionais em lote",
+        description=(
+            "Corpo em NDJSON (`application/x-ndjson`, um objeto por linha) ou CSV "
+            "(`text/csv`, com cabeçalho). O arquivo é lido em fluxo e gravado em "
+            "blocos; o retorno resume quantas linhas foram criadas ou rejeitadas."
+        ),
+        request={
+            "application/x-ndjson": OpenApiTypes.STR,
+            "text/csv": OpenApiTypes.STR,
+        },
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=["post"], url_path="import", url_name="import")
+    def import_(self, request):
+        """
+        Import professionals from an NDJSON or CSV stream.
+        Endpoint: POST /api/professionals/import/
+        """
+        fmt = bulk_io.format_from_content_type(request.content_type)
+        if fmt is None:
+            return Response(
+                {"detail": "Envie o arquivo como application/x-ndjson ou text/csv."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+        # Lê o corpo bruto linha a linha, sem passar pelos parsers do DRF
+        stream = request.stream or []
+        summary = bulk_io.import_records(bulk_io.iter_records(stream, fmt))
+        code = status.HTTP_201_CREATED if summary["created"] else status.HTTP_200_OK
+        if summary["failed"] and not summary["created"]:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response(summary, status=code)
+
+    @extend_schema(
+        summary="Exporta profissionais",
+        parameters=[
+            OpenApiParameter(
+                "type",
+                OpenApiTypes.STR,
+                enum=list(bulk_io.FORMATS),
+                description="Formato do arquivo (padrão: ndjson).",
+            )
+        ],
+        responses={200: OpenApiTypes.STR},
+    )
+    @action(detail=False, methods=["get"], url_path="export", url_name="export")
+    def export(self, request):
+        """
+        Stream every professional as NDJSON or CSV.
+        Endpoint: GET /api/professionals/export/?type=csv
+        """
+        fmt = request.query_params.get("type", "ndjson")
+        if fmt not in bulk_io.FORMATS:
+            return Response(
+                {"type": [f"Formato inválido. Use: {', '.join(bulk_io.FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = StreamingHttpResponse(
+            bulk_io.export_lines(fmt),
+            content_type=f"{bulk_io.CONTENT_TYPES[fmt]}; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="professionals.{fmt}"'
+        return response
+
+    @extend_schema(
+        summary="Estatísticas do cache de leitura", responses=OpenApiTypes.OBJECT
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="cache-stats",
+        url_name="cache_stats",
+        permission_classes=[IsAdminUser],
+    )
+    def cache_stats(self, request):
+        """
+        Hit/miss counters of this process for the professional read cache.
+        Endpoint: GET /api/professionals/cache-stats/
+        """
+        return Response(professional_cache.stats())